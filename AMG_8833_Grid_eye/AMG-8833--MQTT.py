@@ -1,7 +1,8 @@
-import json
 import time
+import numpy as np
 import paho.mqtt.client as mqtt
 from amg8833_i2c import AMG8833
+from thermal_payload import encode_payload
 import logging
 import socket
 
@@ -14,6 +15,8 @@ MQTT_CLIENT_ID = "rpi-thermal-camera"
 MQTT_TOPIC = "sensors/thermal/amg8833"
 MQTT_KEEPALIVE = 60
 PUBLISH_INTERVAL_MS = 500  # 500ms for thermal camera (slower than radar)
+PAYLOAD_FORMAT = "json"  # "json" or "binary" (150 bytes or less, see thermal_payload.py)
+PAYLOAD_COMPRESS = True  # zlib the binary pixel block when that makes it smaller
 
 # Logging setup
 logging.basicConfig(
@@ -41,14 +44,9 @@ def wait_for_network(max_retries=30):
     logger.error("Network connection failed")
     return False
 
-def grid_to_payload(pixels, thermistor_temp):
-    """Convert AMG8833 thermal grid to JSON payload"""
-    return {
-        "timestamp_ms": int(time.time() * 1000),
-        "thermistor_temp_c": round(thermistor_temp, 2),
-        "pixels": [round(p, 2) for p in pixels],
-        "grid_shape": [8, 8],
-    }
+def grid_to_payload(pixels, thermistor_temp, invalid_pixels=None):
+    """Convert AMG8833 thermal grid to a PAYLOAD_FORMAT payload (bytes)"""
+    return encode_payload(pixels, thermistor_temp, invalid_pixels, fmt=PAYLOAD_FORMAT, compress=PAYLOAD_COMPRESS)
 
 class ThermalMQTTClient:
     def __init__(self):
@@ -114,7 +112,7 @@ class ThermalMQTTClient:
         """Publish payload to MQTT topic"""
         try:
             if self.connected:
-                self.client.publish(MQTT_TOPIC, json.dumps(payload), qos=0)
+                self.client.publish(MQTT_TOPIC, payload, qos=0)
                 return True
         except Exception as exc:
             logger.error(f"MQTT publish error: {exc}")
@@ -187,18 +185,22 @@ class ThermalMQTTClient:
                             time.sleep(2)
                             continue
 
-                    # Read sensor data
-                    status, pixels = self.sensor.read_temp(64)
-                    if status:
+                    # Read sensor data; out-of-range pixels are interpolated instead of dropping the frame
+                    grid, valid = self.sensor.read_valid_frame(interpolate=True)
+                    if not valid.any():
                         logger.warning("Sensor read error, retrying...")
+                        time.sleep(0.05)
                         continue
+                    invalid = np.flatnonzero(~valid).tolist()
+                    if invalid:
+                        logger.debug(f"Interpolated {len(invalid)} out-of-range pixel(s)")
 
                     thermistor_temp = self.sensor.read_thermistor()
 
                     # Publish at interval
                     now = time.time() * 1000
                     if (now - self.last_pub) >= PUBLISH_INTERVAL_MS:
-                        payload = grid_to_payload(pixels, thermistor_temp)
+                        payload = grid_to_payload(grid, thermistor_temp, invalid)
                         if self.publish(payload):
                             self.last_pub = now
                             logger.debug(f"Published: {thermistor_temp:.2f}°C")
@@ -1,9 +1,9 @@
-import json
 import paho.mqtt.client as mqtt
 import matplotlib
 matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
 import numpy as np
+from thermal_payload import decode_payload
 
 MQTT_BROKER = "192.168.50.62"
 MQTT_PORT = 1883
@@ -45,9 +45,9 @@ class ThermalGridDisplay:
 
     def on_message(self, client, userdata, msg):
         try:
-            payload = json.loads(msg.payload.decode())
-            self.latest_pixels = payload.get("pixels", [])
-            self.latest_thermistor = payload.get("thermistor_temp_c", 0)
+            frame = decode_payload(msg.payload)  # JSON or binary
+            self.latest_pixels = frame.pixels
+            self.latest_thermistor = frame.thermistor_c
         except Exception as e:
             print(f"Error parsing message: {e}")
 
@@ -67,7 +67,7 @@ class ThermalGridDisplay:
         
         try:
             while self.running and plt.fignum_exists(self.fig.number):
-                if self.latest_pixels:
+                if self.latest_pixels is not None:
                     pixels_array = np.reshape(self.latest_pixels, pix_res)
                     self.im1.set_data(pixels_array)
                     self.fig.canvas.draw()
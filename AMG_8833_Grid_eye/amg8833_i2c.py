@@ -7,7 +7,11 @@
 #
 #######################################################
 #
-import smbus # i2c bus
+import numpy as np
+try:
+    import smbus # i2c bus
+except ImportError: # off the Pi (tests, benchmarks): pass a bus such as fake_smbus.FakeSMBus
+    smbus = None
 #
 #############################
 # Device/I2C Info
@@ -47,6 +51,17 @@ GE_INT7_REG              = 0x17 #///< Pixel 57->64 Interrupt Result
 GE_PIXEL_BASE            = 0x80 #///< Pixel 1 Output Value (Lower Level)
 #
 #############################
+# Frame Layout
+#############################
+#
+GE_PIXEL_COUNT           = 64   #///< 8x8 pixels, 2 bytes each (12-bit two's complement)
+GE_FRAME_SHAPE           = (8,8)
+GE_PIXEL_SCALE           = 0.25 #///< degC per pixel LSB
+I2C_BLOCK_MAX            = 32   #///< SMBus block transfers carry at most 32 bytes
+GE_TEMP_MIN              = -20  #///< Pixels outside [min, max] degC are treated as bad reads
+GE_TEMP_MAX              = 100
+#
+#############################
 # Base Write Registers
 #############################
 #
@@ -69,6 +84,47 @@ GE_INTC_OFF                    = 0b00000000
 GE_SCLR_CLR                   = 0b00000110
 #
 ##################################
+# Frame Decoding
+##################################
+#
+def pixel_counts(raw):
+    # raw pixel bytes (or 16-bit register values) -> signed 12-bit counts as int16, all pixels at once
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        raw = np.frombuffer(raw, dtype='<u2')
+    raw = np.asarray(raw).astype(np.int16)
+    return ((raw & 0xFFF) ^ 0x800) - 0x800 # sign-extend bit 11
+
+def decode_frame(raw, t_min=GE_TEMP_MIN, t_max=GE_TEMP_MAX):
+    # raw pixels -> (8x8 float32 degC with NaN for out-of-range pixels, validity mask)
+    grid = (pixel_counts(raw) * np.float32(GE_PIXEL_SCALE)).astype(np.float32).reshape(GE_FRAME_SHAPE)
+    valid = (grid >= t_min) & (grid <= t_max)
+    grid[~valid] = np.nan
+    return grid, valid
+
+def fill_invalid(grid, valid):
+    # replace bad pixels with the mean of their valid 8-neighbours, growing inwards
+    # for clusters; a frame with no valid pixel at all is returned unchanged (NaN)
+    grid = grid.copy()
+    known = valid.copy()
+    while not known.all():
+        values = np.pad(np.where(known, grid, 0), 1)
+        weights = np.pad(known.astype(np.float32), 1)
+        total = np.zeros(grid.shape, dtype=np.float32)
+        count = np.zeros(grid.shape, dtype=np.float32)
+        for dy in (0, 1, 2):
+            for dx in (0, 1, 2):
+                if dy == 1 and dx == 1:
+                    continue
+                total += values[dy:dy + grid.shape[0], dx:dx + grid.shape[1]]
+                count += weights[dy:dy + grid.shape[0], dx:dx + grid.shape[1]]
+        fillable = ~known & (count > 0)
+        if not fillable.any():
+            break
+        grid[fillable] = total[fillable] / count[fillable]
+        known |= fillable
+    return grid
+#
+##################################
 # I2C Bus Initializaiton and
 # Register Read/Write Commands
 ##################################
@@ -79,8 +135,13 @@ def get_i2c_device(address, busnum, i2c_interface=None, **kwargs):
 class i2c_driver(object):
     def __init__(self, address, busnum, i2c_interface=None):
         self._address = address
-        # specify smbus for RPi (smbus 1 for RPi 2,3,4)
-        self._bus = smbus.SMBus(busnum)
+        if i2c_interface is not None:
+            self._bus = i2c_interface # injected bus (e.g. FakeSMBus)
+        elif smbus is None:
+            raise ImportError("smbus is not installed; pass i2c_interface to use another bus")
+        else:
+            # specify smbus for RPi (smbus 1 for RPi 2,3,4)
+            self._bus = smbus.SMBus(busnum)
 
     def write8(self, register, value):
         # write 8-bits to specified register
@@ -93,10 +154,18 @@ class i2c_driver(object):
         if not little_endian:
             result = ((result << 8) & 0xFF00) + (result >> 8)
         return result
+
+    def read_block(self, register, length):
+        # read `length` bytes from consecutive registers in as few block transfers as SMBus allows
+        data = bytearray()
+        while len(data) < length:
+            chunk = min(I2C_BLOCK_MAX, length - len(data))
+            data += bytes(self._bus.read_i2c_block_data(self._address, register + len(data), chunk))
+        return bytes(data)
     
 class AMG8833(object):
-    def __init__(self,addr=GE_I2C_ADDRESS,bus_num=RPI_BUS):
-        self.device=get_i2c_device(addr,bus_num)
+    def __init__(self,addr=GE_I2C_ADDRESS,bus_num=RPI_BUS,bus=None):
+        self.device=get_i2c_device(addr,bus_num,bus)
 
         self.set_sensor_mode(GE_PCTL_NORMAL_MODE) # set sensor mode
         self.reset_flags(GE_RST_INITIAL_RST) # reset at startup
@@ -118,15 +187,27 @@ class AMG8833(object):
     def clear_status(self,value):
         self.device.write8(GE_SCLR_REG,value) # overflows
         
+    def read_raw_frame(self):
+        # all 128 pixel bytes in 4 block reads (instead of 64 word reads), as signed 12-bit counts
+        return pixel_counts(self.device.read_block(GE_PIXEL_BASE, 2 * GE_PIXEL_COUNT))
+
+    def read_frame(self):
+        # 8x8 float32 temperatures in degC, row-major as the sensor reports them
+        return (self.read_raw_frame() * np.float32(GE_PIXEL_SCALE)).astype(np.float32).reshape(GE_FRAME_SHAPE)
+
+    def read_valid_frame(self, interpolate=True):
+        # (8x8 float32 degC, validity mask); bad pixels are filled from neighbours or left NaN
+        grid, valid = decode_frame(self.device.read_block(GE_PIXEL_BASE, 2 * GE_PIXEL_COUNT))
+        if interpolate and not valid.all():
+            grid = fill_invalid(grid, valid)
+        return grid, valid
+
     def read_temp(self,PIXEL_NUM):
-        T_arr = [] # temp array
+        T_arr = self.read_frame().ravel()[:PIXEL_NUM].tolist() # temp array
         status = False # status boolean for errors
-        for i in range(0, PIXEL_NUM):
-            raw = self.device.read16(GE_PIXEL_BASE + (i << 1))		
-            converted = self.twos_compl(raw) * 0.25
+        for i,converted in enumerate(T_arr):
             if converted<-20 or converted>100:
-                return True,T_arr # return error if outside temp window
-            T_arr.append(converted)
+                return True,T_arr[:i] # return error if outside temp window
         return status,T_arr
     
     def read_thermistor(self):
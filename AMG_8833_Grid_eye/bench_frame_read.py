@@ -0,0 +1,51 @@
+"""Benchmark AMG8833 frame reads: 64 word reads vs 4 block reads, on a FakeSMBus.
+
+Run from AMG_8833_Grid_eye/:
+
+    python bench_frame_read.py [--frames 200] [--clock-hz 100000 400000 0]
+
+``--clock-hz 0`` measures Python overhead only; other values add the wire
+time each transfer would take on an I2C bus at that clock.
+"""
+import argparse
+import time
+
+from amg8833_i2c import GE_PIXEL_BASE, AMG8833
+from fake_smbus import FakeSMBus
+
+
+def word_reads(sensor):
+    # The previous read_temp path: one read_word_data plus a Python conversion per pixel.
+    return [sensor.twos_compl(sensor.device.read16(GE_PIXEL_BASE + (i << 1))) * 0.25 for i in range(64)]
+
+
+def block_reads(sensor):
+    return sensor.read_frame()
+
+
+def run(fn, sensor, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn(sensor)
+    return (time.perf_counter() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--clock-hz", type=int, nargs="+", default=[100_000, 400_000, 0])
+    args = parser.parse_args()
+
+    print(f"{'clock':>10} {'word ms':>9} {'block ms':>9} {'speedup':>8} {'max fps (block)':>16}")
+    for clock in args.clock_hz:
+        bus = FakeSMBus(clock_hz=clock or None)
+        bus.set_pixels([20.0 + 0.25 * (i % 16) for i in range(64)])
+        sensor = AMG8833(bus=bus)
+        word = run(word_reads, sensor, args.frames)
+        block = run(block_reads, sensor, args.frames)
+        label = f"{clock // 1000} kHz" if clock else "no wire"
+        print(f"{label:>10} {word * 1e3:9.3f} {block * 1e3:9.3f} {word / block:7.1f}x {1 / block:16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""Pytest setup: put this directory on sys.path so the scripts' flat imports resolve."""
+import sys
+from pathlib import Path
+
+PKG_ROOT = Path(__file__).resolve().parent
+if str(PKG_ROOT) not in sys.path:
+    sys.path.insert(0, str(PKG_ROOT))
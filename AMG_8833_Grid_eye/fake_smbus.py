@@ -0,0 +1,65 @@
+"""In-memory stand-in for ``smbus.SMBus`` with an AMG8833 register map, for tests and benchmarks.
+
+Pass it as ``AMG8833(bus=FakeSMBus())``. ``set_pixels`` loads temperatures
+the way the sensor encodes them (12-bit two's complement, 0.25 degC/LSB), and
+``transactions`` counts bus transfers. With ``clock_hz`` set, every transfer
+also sleeps for the time its bytes would take on a real I2C bus, so frame-read
+benchmarks reflect wire time as well as Python overhead.
+"""
+import time
+
+from amg8833_i2c import GE_PIXEL_BASE, GE_PIXEL_COUNT, GE_PIXEL_SCALE, GE_TTHL_REG, I2C_BLOCK_MAX
+
+# Address + register write, repeated-start address: bytes on the wire before any data.
+_TRANSFER_OVERHEAD_BYTES = 3
+
+
+class FakeSMBus:
+    def __init__(self, clock_hz=None):
+        self.registers = bytearray(256)
+        self.clock_hz = clock_hz
+        self.transactions = 0
+
+    def set_pixels(self, temps_c):
+        """Store 64 pixel temperatures (any iterable, row-major) as raw register values."""
+        temps_c = list(temps_c)
+        if len(temps_c) != GE_PIXEL_COUNT:
+            raise ValueError(f"expected {GE_PIXEL_COUNT} pixels, got {len(temps_c)}")
+        for i, t in enumerate(temps_c):
+            self.set_raw_pixel(i, round(t / GE_PIXEL_SCALE) & 0xFFF)
+
+    def set_raw_pixel(self, index, raw):
+        reg = GE_PIXEL_BASE + 2 * index
+        self.registers[reg:reg + 2] = (raw & 0xFFFF).to_bytes(2, "little")
+
+    def set_thermistor(self, temp_c):
+        raw = round(abs(temp_c) / 0.0625) | (0x800 if temp_c < 0 else 0)
+        self.registers[GE_TTHL_REG:GE_TTHL_REG + 2] = raw.to_bytes(2, "little")
+
+    def _transfer(self, data_bytes):
+        self.transactions += 1
+        if self.clock_hz:
+            time.sleep((_TRANSFER_OVERHEAD_BYTES + data_bytes) * 9 / self.clock_hz)
+
+    # -- smbus.SMBus interface ---------------------------------------------
+
+    def write_byte_data(self, addr, register, value):
+        self._transfer(1)
+        self.registers[register] = value & 0xFF
+
+    def read_byte_data(self, addr, register):
+        self._transfer(1)
+        return self.registers[register]
+
+    def read_word_data(self, addr, register):
+        self._transfer(2)
+        return int.from_bytes(self.registers[register:register + 2], "little")
+
+    def read_i2c_block_data(self, addr, register, length=I2C_BLOCK_MAX):
+        if length > I2C_BLOCK_MAX:
+            raise OSError(f"SMBus block reads are limited to {I2C_BLOCK_MAX} bytes")
+        self._transfer(length)
+        return list(self.registers[register:register + length])
+
+    def close(self):
+        pass
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from amg8833_i2c import AMG8833
+from fake_smbus import FakeSMBus
+
+
+def _sensor(temps=None):
+    bus = FakeSMBus()
+    bus.set_pixels(temps if temps is not None else [20.0 + 0.25 * i for i in range(64)])
+    bus.set_thermistor(23.5)
+    return AMG8833(bus=bus), bus
+
+
+def test_read_frame_uses_four_block_reads():
+    sensor, bus = _sensor()
+    before = bus.transactions
+    frame = sensor.read_frame()
+    assert bus.transactions - before == 4
+    assert frame.shape == (8, 8)
+    assert frame.dtype == np.float32
+    assert frame[0, 0] == 20.0
+    assert frame[7, 7] == 20.0 + 0.25 * 63
+
+
+def test_frame_decode_matches_scalar_twos_complement():
+    sensor, bus = _sensor()
+    raws = [0x000, 0x001, 0x7FF, 0x800, 0xFFF, 0xF9C, 0x190] + list(range(57))
+    for i, raw in enumerate(raws):
+        bus.set_raw_pixel(i, raw)
+    expected = [sensor.twos_compl(raw) * 0.25 for raw in raws]
+    assert sensor.read_frame().ravel().tolist() == expected
+    assert sensor.read_frame()[0, 4] == -0.25
+
+
+def test_read_temp_keeps_status_contract():
+    sensor, bus = _sensor()
+    status, pixels = sensor.read_temp(64)
+    assert status is False
+    assert len(pixels) == 64
+    assert sensor.read_thermistor() == 23.5
+
+    bus.set_raw_pixel(10, round(120 / 0.25))  # above the 100 degC window
+    status, pixels = sensor.read_temp(64)
+    assert status is True
+    assert len(pixels) == 10
+
+
+def test_fake_bus_rejects_oversized_block_reads():
+    bus = FakeSMBus()
+    with pytest.raises(OSError):
+        bus.read_i2c_block_data(0x69, 0x80, 64)
+
+
+def test_bad_pixels_are_masked_not_fatal():
+    temps = [22.0] * 64
+    sensor, bus = _sensor(temps)
+    bus.set_raw_pixel(9, round(150 / 0.25))  # (1, 1): too hot
+    bus.set_raw_pixel(63, round(-40 / 0.25) & 0xFFF)  # (7, 7): too cold
+
+    grid, valid = sensor.read_valid_frame(interpolate=False)
+    assert valid.sum() == 62
+    assert not valid[1, 1] and not valid[7, 7]
+    assert np.isnan(grid[1, 1])
+
+    grid, valid = sensor.read_valid_frame()
+    assert not np.isnan(grid).any()
+    assert grid[1, 1] == 22.0 and grid[7, 7] == 22.0
+
+
+def test_fill_invalid_uses_neighbour_mean_and_grows_into_clusters():
+    from amg8833_i2c import fill_invalid
+
+    grid = np.arange(64, dtype=np.float32).reshape(8, 8)
+    valid = np.ones((8, 8), dtype=bool)
+    valid[3, 3] = False
+    filled = fill_invalid(np.where(valid, grid, np.nan), valid)
+    assert filled[3, 3] == (grid[2:5, 2:5].sum() - grid[3, 3]) / 8
+
+    valid[:, :4] = False  # half the frame bad: filled column by column from the right half
+    filled = fill_invalid(np.where(valid, grid, np.nan), valid)
+    assert not np.isnan(filled).any()
+
+    nothing = fill_invalid(np.full((8, 8), np.nan, dtype=np.float32), np.zeros((8, 8), dtype=bool))
+    assert np.isnan(nothing).all()
@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pytest
+
+from thermal_payload import PAYLOAD_MAGIC, decode_payload, encode_payload
+
+PIXELS = np.array([20.0 + 0.25 * (i % 16) for i in range(64)], dtype=np.float32)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_binary_round_trip(compress):
+    data = encode_payload(PIXELS, 23.5, [3, 63], fmt="binary", compress=compress, timestamp_ms=1700000000123)
+    assert data.startswith(PAYLOAD_MAGIC)
+    assert len(data) <= 150
+
+    frame = decode_payload(data)
+    assert frame.timestamp_ms == 1700000000123
+    assert frame.thermistor_c == 23.5
+    assert frame.pixels.shape == (8, 8)
+    assert frame.pixels.dtype == np.float32
+    assert np.array_equal(frame.pixels.ravel(), PIXELS)
+    assert np.flatnonzero(frame.invalid).tolist() == [3, 63]
+
+
+def test_binary_is_much_smaller_than_json():
+    noisy = PIXELS + np.random.default_rng(0).normal(0, 0.5, 64).astype(np.float32)
+    as_json = encode_payload(noisy, 23.5, fmt="json")
+    as_binary = encode_payload(noisy, 23.5, fmt="binary")
+    assert len(as_binary) * 3 < len(as_json)
+
+
+def test_json_mode_stays_compatible():
+    data = encode_payload(PIXELS, 23.456, [5], fmt="json", timestamp_ms=1)
+    payload = json.loads(data)
+    assert payload["grid_shape"] == [8, 8]
+    assert payload["thermistor_temp_c"] == 23.46
+    assert payload["invalid_pixels"] == [5]
+
+    frame = decode_payload(data)
+    assert np.array_equal(frame.pixels.ravel(), PIXELS)
+    assert frame.invalid.ravel()[5]
+
+    # Payloads from publishers predating the binary format decode too.
+    legacy = json.dumps({"timestamp_ms": 1, "thermistor_temp_c": 22.0, "pixels": PIXELS.tolist(), "grid_shape": [8, 8]})
+    assert not decode_payload(legacy.encode()).invalid.any()
+
+
+def test_rejects_bad_payloads():
+    with pytest.raises(ValueError):
+        encode_payload(PIXELS[:10], 20.0, fmt="binary")
+    with pytest.raises(ValueError):
+        encode_payload(PIXELS, 20.0, fmt="xml")
+    with pytest.raises(ValueError):
+        decode_payload(PAYLOAD_MAGIC + b"\x01")
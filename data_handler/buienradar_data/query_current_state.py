@@ -3,6 +3,10 @@
 from __future__ import annotations
 
 import argparse
+import json
+import threading
+import time
+from pathlib import Path
 from typing import Any, Iterable, Optional, Tuple
 
 import requests
@@ -12,6 +16,12 @@ from buienradar.constants import CONTENT, RAINCONTENT, SUCCESS
 DEFAULT_ADDRESS = "Achtseweg Zuid 151 C Eindhoven"
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 
+# Address -> coordinates cache shared by the CLI and weather_service; addresses do not move,
+# so entries stay fresh for a long time and a stale one still beats waiting on Nominatim.
+GEOCODE_CACHE_PATH = Path(__file__).resolve().parent / "geocode_cache.json"
+GEOCODE_TTL_S = 90 * 24 * 3600
+_geocode_lock = threading.Lock()
+
 
 def geocode(address: str, session: Optional[requests.Session] = None) -> Tuple[float, float]:
 	"""Resolve an address to latitude and longitude using Nominatim."""
@@ -31,6 +41,56 @@ def geocode(address: str, session: Optional[requests.Session] = None) -> Tuple[f
 	return float(location["lat"]), float(location["lon"])
 
 
+def _load_geocode_cache(cache_path: Path) -> dict[str, Any]:
+	try:
+		with cache_path.open("r") as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+
+def _store_geocode(address: str, coords: Tuple[float, float], cache_path: Path) -> None:
+	with _geocode_lock:
+		cache = _load_geocode_cache(cache_path)
+		cache[address.strip().lower()] = {"lat": coords[0], "lon": coords[1], "ts": time.time()}
+		tmp = cache_path.with_suffix(".tmp")
+		with tmp.open("w") as f:
+			json.dump(cache, f, indent=1)
+		tmp.replace(cache_path)
+
+
+def cached_geocode(
+	address: str,
+	session: Optional[requests.Session] = None,
+	cache_path: Path = GEOCODE_CACHE_PATH,
+	ttl: float = GEOCODE_TTL_S,
+) -> Tuple[float, float]:
+	"""Like ``geocode`` but answered from the on-disk cache when possible.
+
+	A fresh entry needs no request. A stale entry is returned immediately and
+	refreshed in the background, so a slow or failing Nominatim never delays
+	the caller. Only an address that was never resolved blocks on Nominatim.
+	"""
+
+	entry = _load_geocode_cache(cache_path).get(address.strip().lower())
+	if entry is None:
+		coords = geocode(address, session)
+		_store_geocode(address, coords, cache_path)
+		return coords
+
+	coords = (float(entry["lat"]), float(entry["lon"]))
+	if time.time() - float(entry.get("ts", 0)) >= ttl:
+
+		def _refresh() -> None:
+			try:
+				_store_geocode(address, geocode(address), cache_path)
+			except Exception as exc:  # keep serving the stale coordinates
+				print(f"Geocode refresh failed for {address}: {exc}")
+
+		threading.Thread(target=_refresh, daemon=True).start()
+	return coords
+
+
 def fetch_current_state(latitude: float, longitude: float, timeframe: int) -> dict[str, Any]:
 	"""Call buienradar, parse the API response, and return structured data."""
 
@@ -82,7 +142,7 @@ def fetch_weather_summary(
 	"""Geocode once (if needed) and return a concise weather dict."""
 
 	session = session or requests.Session()
-	lat, lon = geocode(address, session)
+	lat, lon = cached_geocode(address, session)
 	state = fetch_current_state(lat, lon, timeframe)
 	return weather_summary_from_state(state)
 
@@ -162,7 +222,7 @@ def main() -> None:
 	if args.latitude is not None and args.longitude is not None:
 		latitude, longitude = args.latitude, args.longitude
 	else:
-		latitude, longitude = geocode(args.address)
+		latitude, longitude = cached_geocode(args.address)
 
 	state = fetch_current_state(latitude, longitude, args.timeframe)
 	if args.raw:
@@ -0,0 +1,433 @@
+"""Day-partitioned columnar store for sensor history.
+
+Layout on disk::
+
+    <root>/
+        categories.json            # vocabulary for "category" columns
+        2025-12-15/
+            timestamp.f8           # one raw little-endian NumPy array per column
+            co2_ppm.i4
+            temperature_c.f4
+            ...
+
+Each column file is a headerless NumPy array (``np.fromfile``/``np.memmap``
+compatible) so rows can be appended without rewriting anything. Range reads
+only open the day partitions and column files they need and slice them by a
+binary search on the timestamp column.
+"""
+from __future__ import annotations
+
+import json
+import shutil
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+COLUMNAR_ROOT = Path(__file__).resolve().parent / "metrics_store"
+
+# Logical column types: "datetime" is stored as float64 epoch seconds and
+# "category" as int16 codes into categories.json; everything else is a NumPy dtype.
+INDOOR_SCHEMA: Dict[str, str] = {
+    "timestamp": "datetime",
+    "co2_ppm": "i4",
+    "people": "i4",
+    "temperature_c": "f4",
+    "humidity_pct": "f4",
+    "pressure_hpa": "f4",
+    "gas_kohms": "f4",
+    "pmv": "f4",
+    "ppd": "f4",
+    "utci": "f4",
+    "device_id": "category",
+    "room": "category",
+}
+
+# One row per Buienradar reading, keyed on its measured time (see weather_history.py).
+WEATHER_SCHEMA: Dict[str, str] = {
+    "timestamp": "datetime",
+    "weather_temperature_c": "f4",
+    "weather_feel_temperature_c": "f4",
+    "weather_humidity_pct": "f4",
+    "weather_pressure_hpa": "f4",
+    "weather_wind_speed_ms": "f4",
+    "weather_wind_gust_ms": "f4",
+    "weather_precip_total_mm": "f4",
+    "weather_precip_timeframe_min": "i4",
+    "weather_condition": "category",
+}
+
+# The wide row shape of state.snapshot_to_row (CSV and SQLite backends).
+METRICS_SCHEMA: Dict[str, str] = {
+    **INDOOR_SCHEMA,
+    **{c: kind for c, kind in WEATHER_SCHEMA.items() if c != "timestamp"},
+    "weather_measured_iso": "datetime",
+}
+
+INT_MISSING = -1  # sentinel for missing values in integer columns
+FLUSH_ROWS = 50
+FLUSH_INTERVAL_S = 2.0
+
+
+def _storage_dtype(kind: str) -> np.dtype:
+    if kind == "datetime":
+        return np.dtype("<f8")
+    if kind == "category":
+        return np.dtype("<i2")
+    return np.dtype(kind).newbyteorder("<")
+
+
+def to_epoch(value: Any) -> float | None:
+    """Convert an ISO string, datetime, or number to epoch seconds."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float, np.floating, np.integer)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time()).timestamp()
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def _to_number(value: Any) -> float | None:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def encode_values(kind: str, values: Iterable[Any]) -> np.ndarray:
+    """Convert raw row values (numbers, strings, None) to the storage dtype of ``kind``."""
+    dtype = _storage_dtype(kind)
+    if kind == "datetime":
+        epochs = [to_epoch(v) for v in values]
+        return np.array([np.nan if v is None else v for v in epochs], dtype=dtype)
+    numbers = [_to_number(v) for v in values]
+    if dtype.kind in "iu":
+        return np.array([INT_MISSING if n is None or n != n else round(n) for n in numbers], dtype=dtype)
+    return np.array([np.nan if n is None else n for n in numbers], dtype=dtype)
+
+
+def asof_join(
+    left_ts: np.ndarray,
+    right_ts: np.ndarray,
+    right: Mapping[str, np.ndarray],
+    max_age: float | None = None,
+) -> Dict[str, np.ndarray]:
+    """Attach to every ``left_ts`` the newest ``right`` row with ``right_ts <= left_ts``.
+
+    ``right_ts`` must be sorted. One ``searchsorted`` finds all matches, so
+    the cost is O(n log m) with no Python loop. Rows with no match (before the
+    first right row, or older than ``max_age`` seconds) get NaN, ``INT_MISSING``
+    or None depending on the column dtype.
+    """
+    left_ts = np.asarray(left_ts, dtype="f8")
+    right_ts = np.asarray(right_ts, dtype="f8")
+    idx = np.searchsorted(right_ts, left_ts, side="right") - 1
+    matched = idx >= 0
+    if max_age is not None and len(right_ts):
+        matched &= left_ts - right_ts[np.maximum(idx, 0)] <= max_age
+    take = np.maximum(idx, 0)
+    out: Dict[str, np.ndarray] = {}
+    for column, values in right.items():
+        values = np.asarray(values)
+        if not len(values):
+            values = np.empty(1, dtype=values.dtype)
+        joined = values[take]
+        if values.dtype.kind == "f":
+            joined[~matched] = np.nan
+        elif values.dtype.kind in "iu":
+            joined[~matched] = INT_MISSING
+        else:
+            joined[~matched] = None
+        out[column] = joined
+    return out
+
+
+class ColumnarMetricsStore:
+    """Append rows into typed per-day column files and read them back by time range."""
+
+    def __init__(
+        self,
+        root: Path = COLUMNAR_ROOT,
+        schema: Mapping[str, str] = INDOOR_SCHEMA,
+        flush_rows: int = FLUSH_ROWS,
+        flush_interval: float = FLUSH_INTERVAL_S,
+    ) -> None:
+        if "timestamp" not in schema:
+            raise ValueError("schema needs a timestamp column")
+        self.root = Path(root)
+        self.schema = dict(schema)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._buffer: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        # Another process (ingestd) may add codes; reloaded when the file's (mtime, size) changes.
+        self._categories_key: Optional[tuple] = None
+        self._categories: Dict[str, List[str]] = {}
+        self._refresh_categories()
+
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    # -- writing -----------------------------------------------------------
+
+    def append(self, row: Mapping[str, Any]) -> None:
+        ts = to_epoch(row.get("timestamp"))
+        if ts is None:
+            return
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._buffer.append({**row, "timestamp": ts})
+            if len(self._buffer) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._closed.is_set():
+                self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+            self._flush_locked()
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+
+        by_day: Dict[date, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_day.setdefault(datetime.fromtimestamp(row["timestamp"]).date(), []).append(row)
+
+        encoded: Dict[date, Dict[str, np.ndarray]] = {}
+        categories_changed = False
+        for day, day_rows in by_day.items():
+            encoded[day] = {}
+            for column, kind in self.schema.items():
+                values, changed = self._encode(column, kind, [r.get(column) for r in day_rows])
+                encoded[day][column] = values
+                categories_changed |= changed
+        # Persist new category codes before any column references them.
+        if categories_changed:
+            self._save_categories()
+
+        for day, arrays in encoded.items():
+            part = self._partition_dir(day)
+            part.mkdir(parents=True, exist_ok=True)
+            self._truncate_partial_rows(part)
+            self._pad_new_columns(part)
+            # Write timestamp last so readers never see a row whose other columns are missing.
+            for column in sorted(arrays, key=lambda c: c == "timestamp"):
+                with self._column_path(part, column).open("ab") as f:
+                    f.write(arrays[column].tobytes())
+
+    def _encode(self, column: str, kind: str, values: List[Any]) -> tuple[np.ndarray, bool]:
+        if kind != "category":
+            return encode_values(kind, values), False
+        vocab = self._categories.setdefault(column, [])
+        changed = False
+        codes = []
+        for v in values:
+            if v is None or v == "":
+                codes.append(INT_MISSING)
+                continue
+            v = str(v)
+            if v not in vocab:
+                vocab.append(v)
+                changed = True
+            codes.append(vocab.index(v))
+        return np.array(codes, dtype=_storage_dtype(kind)), changed
+
+    # -- reading -----------------------------------------------------------
+
+    def partitions(self) -> List[date]:
+        days = []
+        for child in self.root.iterdir():
+            if child.is_dir():
+                try:
+                    days.append(date.fromisoformat(child.name))
+                except ValueError:
+                    continue
+        return sorted(days)
+
+    def read_range(
+        self,
+        start: Any = None,
+        end: Any = None,
+        columns: Optional[Iterable[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Return ``{column: array}`` for rows with ``start <= timestamp < end``.
+
+        ``start``/``end`` accept datetimes, ISO strings, or epoch seconds; None
+        leaves that side open. Timestamps come back as float64 epoch seconds,
+        integer columns keep ``INT_MISSING`` for gaps and category columns are
+        int16 codes (see ``categories()``).
+        """
+        self.flush()
+        wanted = ["timestamp"] + [c for c in (columns or self.schema) if c != "timestamp"]
+        unknown = [c for c in wanted if c not in self.schema]
+        if unknown:
+            raise KeyError(f"Unknown columns: {unknown}")
+        start_ts = to_epoch(start)
+        end_ts = to_epoch(end)
+        first_day = datetime.fromtimestamp(start_ts).date() if start_ts is not None else None
+        last_day = datetime.fromtimestamp(end_ts).date() if end_ts is not None else None
+
+        chunks: Dict[str, List[np.ndarray]] = {c: [] for c in wanted}
+        for day in self.partitions():
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            part = self._partition_dir(day)
+            n = self._partition_rows(part, wanted)
+            if n == 0:
+                continue
+            ts = self._load_column(part, "timestamp", n)
+            lo = int(np.searchsorted(ts, start_ts, side="left")) if start_ts is not None else 0
+            hi = int(np.searchsorted(ts, end_ts, side="left")) if end_ts is not None else n
+            if hi <= lo:
+                continue
+            for column in wanted:
+                arr = ts if column == "timestamp" else self._load_column(part, column, n)
+                chunks[column].append(np.array(arr[lo:hi]))
+
+        return {
+            c: np.concatenate(parts) if parts else np.empty(0, dtype=_storage_dtype(self.schema[c]))
+            for c, parts in chunks.items()
+        }
+
+    def latest(self) -> Dict[str, Any] | None:
+        """Return the newest stored row decoded back into plain Python values."""
+        self.flush()
+        for day in reversed(self.partitions()):
+            part = self._partition_dir(day)
+            n = self._partition_rows(part, self.schema)
+            if n == 0:
+                continue
+            return {c: self._decode(c, self._load_column(part, c, n)[n - 1]) for c in self.schema}
+        return None
+
+    def drop_partitions_before(self, day: date) -> List[date]:
+        """Delete whole day partitions older than ``day`` (retention); returns the days removed."""
+        removed = []
+        with self._lock:
+            for old in self.partitions():
+                if old >= day:
+                    break
+                shutil.rmtree(self._partition_dir(old))
+                removed.append(old)
+        return removed
+
+    def categories(self, column: str) -> List[str]:
+        self._refresh_categories()
+        return list(self._categories.get(column, []))
+
+    def _decode(self, column: str, value: Any) -> Any:
+        kind = self.schema[column]
+        if kind == "datetime":
+            return None if np.isnan(value) else datetime.fromtimestamp(float(value)).isoformat()
+        if kind == "category":
+            vocab = self._categories.get(column, [])
+            if int(value) >= len(vocab):
+                self._refresh_categories()
+                vocab = self._categories.get(column, [])
+            return vocab[int(value)] if 0 <= int(value) < len(vocab) else None
+        if np.issubdtype(type(value), np.integer):
+            return None if value == INT_MISSING else int(value)
+        return None if np.isnan(value) else round(float(value), 4)
+
+    # -- files -------------------------------------------------------------
+
+    def _partition_dir(self, day: date) -> Path:
+        return self.root / day.isoformat()
+
+    def _column_path(self, part: Path, column: str) -> Path:
+        return part / f"{column}.{_storage_dtype(self.schema[column]).str[1:]}"
+
+    def _partition_rows(self, part: Path, columns: Iterable[str]) -> int:
+        # Columns can differ in length after a crash mid-flush; only whole rows count.
+        # A column file that does not exist at all was added to the schema after
+        # this partition was written and reads as all-missing (see _load_column).
+        counts = []
+        for column in set(columns) | {"timestamp"}:
+            path = self._column_path(part, column)
+            if not path.exists():
+                if column == "timestamp":
+                    return 0
+                continue
+            counts.append(path.stat().st_size // _storage_dtype(self.schema[column]).itemsize)
+        return min(counts) if counts else 0
+
+    def _pad_new_columns(self, part: Path) -> None:
+        # Give columns added since this partition started one missing value per existing row.
+        n = self._partition_rows(part, self.schema)
+        if n == 0:
+            return
+        for column, kind in self.schema.items():
+            path = self._column_path(part, column)
+            if not path.exists():
+                path.write_bytes(encode_values(kind, [None] * n).tobytes())
+
+    def _truncate_partial_rows(self, part: Path) -> None:
+        n = self._partition_rows(part, self.schema)
+        for column in self.schema:
+            path = self._column_path(part, column)
+            size = n * _storage_dtype(self.schema[column]).itemsize
+            if path.exists() and path.stat().st_size > size:
+                with path.open("r+b") as f:
+                    f.truncate(size)
+
+    def _load_column(self, part: Path, column: str, n: int) -> np.ndarray:
+        path = self._column_path(part, column)
+        if not path.exists():
+            return encode_values(self.schema[column], [None] * n)
+        return np.memmap(self._column_path(part, column), dtype=_storage_dtype(self.schema[column]), mode="r", shape=(n,))
+
+    def _refresh_categories(self) -> None:
+        # Vocabularies only ever grow, so keep whichever copy of a column is longer.
+        path = self.root / "categories.json"
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return
+        key = (st.st_mtime_ns, st.st_size)
+        if key == self._categories_key:
+            return
+        with path.open("r") as f:
+            loaded = json.load(f)
+        with self._lock:
+            for column, vocab in loaded.items():
+                if len(vocab) > len(self._categories.get(column, [])):
+                    self._categories[column] = vocab
+            self._categories_key = key
+
+    def _save_categories(self) -> None:
+        path = self.root / "categories.json"
+        tmp = self.root / "categories.json.tmp"
+        with tmp.open("w") as f:
+            json.dump(self._categories, f)
+        tmp.replace(path)
+        st = path.stat()
+        self._categories_key = (st.st_mtime_ns, st.st_size)
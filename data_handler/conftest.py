@@ -0,0 +1,7 @@
+"""Pytest setup: mirror CI's PYTHONPATH so app modules resolve their flat imports."""
+import sys
+from pathlib import Path
+
+PKG_ROOT = Path(__file__).resolve().parent
+if str(PKG_ROOT) not in sys.path:
+    sys.path.insert(0, str(PKG_ROOT))
@@ -0,0 +1,181 @@
+"""Per-device, per-room sensor state for setups with several Picos.
+
+Devices are identified by the second topic level (``sensors/<device>/...``).
+Each device has its own lock and publishes immutable snapshots like
+``state.latest`` does, so ingest threads for different Picos never contend and
+readers never lock. The registry lock is only taken when a device first
+appears or is evicted; ``wait_for_update`` lets a persister block on a
+registry-wide version counter instead of the global ``state_lock``.
+"""
+from __future__ import annotations
+
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from state import FrozenDict, freeze
+
+DEFAULT_ROOM = "default"
+
+# The one device whose readings are mirrored into the global ``state.latest``
+# (Live Metrics, LLM prompt); None mirrors nothing. Every device is persisted
+# per device from the registry either way.
+PRIMARY_DEVICE: Optional[str] = "pico"
+
+# Optional device -> room assignment; a "room" key in the payload wins over this.
+ROOM_MAP: Dict[str, str] = {}
+
+# Memory bounds: devices tracked at once (least recently updated is evicted)
+# and recent messages kept per device.
+MAX_DEVICES = 64
+DEVICE_HISTORY = 600
+
+# Topic suffix after "sensors/<device>/" -> stream name.
+DEVICE_STREAMS = {
+    "air_mmwave": "air_mmwave",
+    "mtp40f/co2": "co2",
+}
+
+
+def parse_device_topic(topic: str) -> Tuple[str, str] | None:
+    """Split ``sensors/<device>/<stream...>`` into ``(device_id, stream)``."""
+    parts = topic.split("/", 2)
+    if len(parts) != 3 or parts[0] != "sensors" or not parts[1]:
+        return None
+    stream = DEVICE_STREAMS.get(parts[2])
+    return (parts[1], stream) if stream else None
+
+
+def room_for(device_id: str, payload: Any = None) -> str:
+    if isinstance(payload, dict) and payload.get("room"):
+        return str(payload["room"])
+    return ROOM_MAP.get(device_id, DEFAULT_ROOM)
+
+
+class DeviceState:
+    """Latest readings of one device plus a bounded message history."""
+
+    __slots__ = ("device_id", "snapshot", "history", "_lock")
+
+    def __init__(self, device_id: str, room: str, history: int = DEVICE_HISTORY) -> None:
+        self.device_id = device_id
+        self._lock = threading.Lock()
+        self.history: Deque[Tuple[float, FrozenDict]] = deque(maxlen=history)
+        self.snapshot = FrozenDict({
+            "device_id": device_id,
+            "room": room,
+            "co2_ppm": None,
+            "radar": None,
+            "environment": None,
+            "comfort": None,
+            "last_updated": None,
+        })
+
+    def update(self, **fields: Any) -> FrozenDict:
+        """Apply ``fields``; an explicit None clears a reading (e.g. a failed BME680 read) like ``update_state``."""
+        changes = {k: freeze(v) for k, v in fields.items()}
+        now = time.time()
+        with self._lock:
+            self.snapshot = FrozenDict({**self.snapshot, **changes, "last_updated": now})
+            self.history.append((now, FrozenDict(changes)))
+            return self.snapshot
+
+
+class DeviceRegistry:
+    """All known devices, bounded to ``max_devices``, with room-level aggregates."""
+
+    def __init__(self, max_devices: int = MAX_DEVICES, history: int = DEVICE_HISTORY) -> None:
+        self.max_devices = max_devices
+        self.history = history
+        self._devices: Dict[str, DeviceState] = {}
+        self._lock = threading.Lock()
+        # Bumped after every device update; only held to bump and notify.
+        self.version = 0
+        self._changed = threading.Condition(threading.Lock())
+
+    def _device(self, device_id: str, room: str) -> DeviceState:
+        device = self._devices.get(device_id)
+        if device is not None:
+            return device
+        with self._lock:
+            device = self._devices.get(device_id)
+            if device is None:
+                if len(self._devices) >= self.max_devices:
+                    stale = min(self._devices.values(), key=lambda d: d.snapshot["last_updated"] or 0)
+                    del self._devices[stale.device_id]
+                device = DeviceState(device_id, room, self.history)
+                self._devices[device_id] = device
+            return device
+
+    def update(self, device_id: str, room: Optional[str] = None, **fields: Any) -> FrozenDict:
+        """Apply ``fields`` to one device (created on first sight) and return its new snapshot."""
+        device = self._device(device_id, room or ROOM_MAP.get(device_id, DEFAULT_ROOM))
+        if room:
+            fields["room"] = room
+        snapshot = device.update(**fields)
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+        return snapshot
+
+    def wait_for_update(self, last_version: int, timeout: float | None = None) -> int:
+        """Block until any device changed since ``last_version``; returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != last_version, timeout)
+            return self.version
+
+    def get(self, device_id: str) -> FrozenDict | None:
+        device = self._devices.get(device_id)
+        return device.snapshot if device else None
+
+    def history_of(self, device_id: str) -> List[Tuple[float, FrozenDict]]:
+        device = self._devices.get(device_id)
+        return list(device.history) if device else []
+
+    def devices(self) -> Dict[str, FrozenDict]:
+        return {device_id: d.snapshot for device_id, d in list(self._devices.items())}
+
+    def rooms(self) -> Dict[str, List[str]]:
+        grouped: Dict[str, List[str]] = {}
+        for device_id, snap in self.devices().items():
+            grouped.setdefault(snap["room"], []).append(device_id)
+        return grouped
+
+    def values(self, stream: str, key: Optional[str] = None) -> Dict[str, List[float]]:
+        """Numeric readings per room, e.g. ``values("comfort", "pmv")`` or ``values("co2_ppm")``."""
+        grouped: Dict[str, List[float]] = {}
+        for snap in self.devices().values():
+            value = snap.get(stream)
+            if key is not None:
+                value = value.get(key) if isinstance(value, dict) else None
+            if isinstance(value, (int, float)) and value == value:
+                grouped.setdefault(snap["room"], []).append(float(value))
+        return grouped
+
+    def aggregate(
+        self,
+        stream: str,
+        key: Optional[str] = None,
+        reducer: Callable[[Iterable[float]], float] = statistics.fmean,
+    ) -> Dict[str, float]:
+        """Reduce readings per room, e.g. the mean PMV of every room."""
+        return {room: reducer(vals) for room, vals in self.values(stream, key).items()}
+
+    def overall(
+        self,
+        stream: str,
+        key: Optional[str] = None,
+        reducer: Callable[[Iterable[float]], float] = statistics.fmean,
+    ) -> float | None:
+        """Reduce the per-room results once more, e.g. the average PMV across rooms."""
+        per_room = self.aggregate(stream, key, reducer)
+        return reducer(per_room.values()) if per_room else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._devices.clear()
+
+
+devices = DeviceRegistry()
@@ -0,0 +1,45 @@
+"""Largest-Triangle-Three-Buckets downsampling for chart series."""
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+
+def lttb(x, y, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce ``(x, y)`` to ``threshold`` points that keep the visual shape.
+
+    NaN points are dropped first; series already at or below ``threshold``
+    come back unchanged. The first and last points are always kept. Bucket
+    means are computed in one ``reduceat`` pass and each bucket's triangle
+    areas in one vector op, so the Python loop runs once per output point.
+    """
+    x = np.asarray(x, dtype="f8")
+    y = np.asarray(y, dtype="f8")
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    buckets = threshold - 2
+    # Inner points 1..n-2 split into `buckets` contiguous, non-empty ranges.
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[: n - 1], edges[:-1]) / sizes
+    mean_y = np.add.reduceat(y[: n - 1], edges[:-1]) / sizes
+    # Third triangle vertex for bucket b is the mean of bucket b + 1 (the last point for the final bucket).
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = n - 1
+    a = 0
+    for b in range(buckets):
+        lo, hi = edges[b], edges[b + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[b]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[b] - ay))
+        a = lo + int(np.argmax(area))
+        picked[b + 1] = a
+    return x[picked], y[picked]
@@ -0,0 +1,148 @@
+"""Headless ingestion daemon: MQTT + comfort + weather + persistence, no browser needed.
+
+Run from the repository root with ``python -m data_handler.ingestd`` (or as a
+systemd service, see README). The Streamlit dashboard then only reads what
+this process records and the live snapshot it shares (``state.SHARED_SNAPSHOT_PATH``).
+"""
+from __future__ import annotations
+
+import argparse
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+
+PKG_ROOT = Path(__file__).resolve().parent
+if str(PKG_ROOT) not in sys.path:
+    sys.path.insert(0, str(PKG_ROOT))
+
+import mqtt_service  # noqa: E402
+import state  # noqa: E402
+from device_state import DeviceRegistry, devices  # noqa: E402
+from mqtt_monitor import HOST, ensure_host_resolvable  # noqa: E402
+from rollups import RollupEngine  # noqa: E402
+from thermal_comfort_model.comfort_calc import fast_comfort_model  # noqa: E402
+from weather_service import ensure_weather_thread, stop_weather_thread  # noqa: E402
+
+# The persistence loop wakes on every state update; this bounds how long a stop request waits.
+PERSIST_POLL_S = 0.1
+# History trends (24 h rolling stats over the ring buffer) are recomputed at most this often.
+TRENDS_INTERVAL_S = 5.0
+
+
+def persist_loop(
+    stop_event: threading.Event,
+    rollup_engine: RollupEngine | None = None,
+    registry: DeviceRegistry = devices,
+) -> None:
+    """Write one row per device update (with ``device_id``/``room``) until ``stop_event`` is set.
+
+    Rows carry the current outdoor weather from the shared state. Each
+    persisted row is also folded into ``rollup_engine`` when given.
+    """
+    last_written: dict[str, float] = {}
+    version = registry.version
+    while not stop_event.is_set():
+        new_version = registry.wait_for_update(version, timeout=PERSIST_POLL_S)
+        if new_version == version:
+            continue
+        version = new_version
+        weather = state.get_snapshot().get("weather")
+        # Write in timestamp order: columnar partitions and rollup buckets expect ascending rows.
+        pending = sorted(
+            (
+                (snapshot["last_updated"], device_id, snapshot)
+                for device_id, snapshot in registry.devices().items()
+                if snapshot.get("last_updated") and snapshot["last_updated"] != last_written.get(device_id)
+            ),
+            key=lambda item: item[0],
+        )
+        for updated, device_id, snapshot in pending:
+            snapshot = {**snapshot, "weather": weather}
+            state.persist_snapshot(snapshot)
+            if rollup_engine is not None:
+                rollup_engine.add(state.snapshot_to_row(snapshot))
+            last_written[device_id] = updated
+
+
+def _shared_state(trends: dict | None = None) -> dict:
+    # The backend lets the dashboard flag a THERMAL_GRACE_BACKEND mismatch.
+    return {**state.get_snapshot(), "metrics_backend": state.METRICS_BACKEND, "trends": trends}
+
+
+def publish_loop(stop_event: threading.Event) -> None:
+    """Share the live state and history trends with the dashboard, at most every ``SHARED_SNAPSHOT_INTERVAL_S``."""
+    version = -1
+    trends, trends_at = None, 0.0
+    while not stop_event.is_set():
+        new_version = state.wait_for_update(version, timeout=PERSIST_POLL_S)
+        if new_version == version:
+            continue
+        version = new_version
+        if time.monotonic() - trends_at >= TRENDS_INTERVAL_S:
+            trends, trends_at = state.history_trends(), time.monotonic()
+        state.write_shared_snapshot(_shared_state(trends))
+        stop_event.wait(state.SHARED_SNAPSHOT_INTERVAL_S)
+
+
+def shutdown() -> None:
+    """Stop ingestion and flush whatever the active backend still buffers."""
+    mqtt_service.stop_mqtt_thread()
+    stop_weather_thread()
+    # Tell the dashboard its live values are no longer being refreshed.
+    state.write_shared_snapshot({**_shared_state(state.history_trends()), "status": "ingestd stopped"})
+    state.get_rollup_engine().close()
+    if state.METRICS_BACKEND == "csv":
+        state.close_metrics_writer()
+    else:
+        state.get_metrics_store().close()
+    if state.METRICS_BACKEND == "columnar":
+        state.get_weather_history().close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record Thermal Grace sensor data without the dashboard.")
+    parser.add_argument(
+        "--backend",
+        choices=["csv", "columnar", "sqlite"],
+        default=state.METRICS_BACKEND,
+        help="Where to persist snapshots (default: $THERMAL_GRACE_BACKEND, else columnar). "
+        "The dashboard only reads THERMAL_GRACE_BACKEND, so prefer setting that.",
+    )
+    parser.add_argument("--quiet", action="store_true", help="Do not print every MQTT message")
+    args = parser.parse_args()
+
+    if args.backend != state.METRICS_BACKEND:
+        print(f"Warning: --backend {args.backend} differs from THERMAL_GRACE_BACKEND ({state.METRICS_BACKEND}); "
+              "the dashboard will not see this history")
+    state.METRICS_BACKEND = args.backend
+    mqtt_service.VERBOSE_LOG = not args.quiet
+
+    if not ensure_host_resolvable(HOST):
+        print(f"Cannot resolve MQTT host {HOST}")
+        sys.exit(1)
+
+    stop_event = threading.Event()
+    # systemd sends SIGTERM on stop/restart; treat it like Ctrl+C so buffers get flushed.
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+
+    mqtt_service.ensure_mqtt_thread()
+    ensure_weather_thread({})
+    # Prebuild the fast-mode PMV grid here so the dashboard never has to (it falls back to exact meanwhile).
+    fast_comfort_model.start_build()
+    threading.Thread(target=publish_loop, args=(stop_event,), daemon=True).start()
+    print(f"Ingestion running: MQTT {HOST}, backend={state.METRICS_BACKEND}")
+    if state.METRICS_BACKEND == "csv":
+        print(f"Raw retention is off for the CSV backend; {state.SENSOR_CSV.name} grows until rotated by hand.")
+
+    try:
+        persist_loop(stop_event, state.get_rollup_engine())
+    finally:
+        shutdown()
+        print("Ingestion stopped")
+
+
+if __name__ == "__main__":
+    main()
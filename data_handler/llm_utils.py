@@ -1,45 +1,215 @@
 """Utilities for building LLM prompts and calling the GitHub Models endpoint."""
 from __future__ import annotations
 
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Tuple
+
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
 
+LLM_URL = "https://models.github.ai/inference/chat/completions"
+LLM_MODEL = "openai/gpt-4.1"
+LLM_TIMEOUT_S = 60
+SYSTEM_PROMPT = "You are a concise HVAC/thermal comfort assistant. Use provided sensor and user context to interpret comfort and give actionable, brief advice."
+
+# Answers for an identical prompt (same snapshot + question) are reused for this long.
+LLM_CACHE_TTL_S = 300
+# Background threads for LLM calls; also the size of the pooled connection set.
+LLM_WORKERS = 2
+
+_session: requests.Session | None = None
+_executor: ThreadPoolExecutor | None = None
+_llm_lock = threading.Lock()
+_response_cache: Dict[str, Tuple[float, str]] = {}
+_inflight: Dict[str, "LLMJob"] = {}
+
+
+class LLMJob(Future):
+    """Future for one LLM answer that also exposes the text streamed so far."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[str] = []
+        self._chunks_lock = threading.Lock()
+
+    def append(self, delta: str) -> None:
+        with self._chunks_lock:
+            self._chunks.append(delta)
+
+    @property
+    def partial(self) -> str:
+        with self._chunks_lock:
+            return "".join(self._chunks)
 
-def call_github_llm(prompt: str) -> str:
-    token = st.secrets.get("github_models_token")
-    if not token:
-        return "Missing github_models_token in .streamlit/secrets.toml"
 
-    url = "https://models.github.ai/inference/chat/completions"
+def get_llm_token() -> str | None:
+    return st.secrets.get("github_models_token")
+
+
+def _get_session() -> requests.Session:
+    """One keep-alive session per process so repeated calls skip the TCP/TLS handshake."""
+    global _session
+    with _llm_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LLM_WORKERS)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _llm_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+        return _executor
+
+
+def iter_sse_deltas(lines: Iterable[str]) -> Iterator[str]:
+    """Yield content deltas from chat-completions server-sent event lines until ``[DONE]``."""
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue  # blank separators, ": keep-alive" comments, "event:" fields
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        chunk = json.loads(data)
+        for choice in chunk.get("choices") or []:
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                yield delta
+
+
+def request_completion(
+    prompt: str,
+    token: str,
+    url: str = LLM_URL,
+    timeout: float = LLM_TIMEOUT_S,
+    stream: bool = False,
+    on_delta: Callable[[str], None] | None = None,
+) -> str:
+    """POST one chat completion and return the answer text; raises on HTTP or network errors.
+
+    With ``stream=True`` the endpoint's SSE mode is used and ``on_delta`` is
+    called with each piece of text as it arrives.
+    """
     headers = {
-        "Accept": "application/vnd.github+json",
+        "Accept": "text/event-stream" if stream else "application/vnd.github+json",
         "Authorization": f"Bearer {token}",
         "X-GitHub-Api-Version": "2022-11-28",
         "Content-Type": "application/json",
     }
     payload = {
-        "model": "openai/gpt-4.1",
+        "model": LLM_MODEL,
         "messages": [
-            {
-                "role": "system",
-                "content": "You are a concise HVAC/thermal comfort assistant. Use provided sensor and user context to interpret comfort and give actionable, brief advice.",
-            },
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ],
     }
-
-    # Basic GitHub Models inference call; keep timeout short for UI responsiveness.
-    try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
+    if not stream:
+        resp = _get_session().post(url, headers=headers, json=payload, timeout=timeout)
         resp.raise_for_status()
         data = resp.json()
         choice = data.get("choices", [{}])[0]
         msg = choice.get("message", {})
         return msg.get("content", "No content returned")
+
+    payload["stream"] = True
+    parts = []
+    with _get_session().post(url, headers=headers, json=payload, timeout=timeout, stream=True) as resp:
+        resp.raise_for_status()
+        resp.encoding = "utf-8"
+        # chunk_size=None hands over each transfer chunk as it arrives instead of waiting for 512 bytes.
+        for delta in iter_sse_deltas(resp.iter_lines(chunk_size=None, decode_unicode=True)):
+            parts.append(delta)
+            if on_delta is not None:
+                on_delta(delta)
+    return "".join(parts) or "No content returned"
+
+
+def call_github_llm(
+    prompt: str,
+    token: str | None = None,
+    url: str = LLM_URL,
+    stream: bool = False,
+    on_delta: Callable[[str], None] | None = None,
+) -> str:
+    """Blocking call that returns the answer or a readable error message."""
+    token = token or get_llm_token()
+    if not token:
+        return "Missing github_models_token in .streamlit/secrets.toml"
+    try:
+        return request_completion(prompt, token, url, stream=stream, on_delta=on_delta)
     except Exception as exc:  # pragma: no cover - UI feedback only
         return f"LLM call failed: {exc}"
 
 
+def prompt_key(prompt: str, url: str = LLM_URL) -> str:
+    return hashlib.sha256(f"{url}\n{LLM_MODEL}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def cached_answer(prompt: str, url: str = LLM_URL) -> str | None:
+    with _llm_lock:
+        hit = _response_cache.get(prompt_key(prompt, url))
+    if hit and time.monotonic() - hit[0] < LLM_CACHE_TTL_S:
+        return hit[1]
+    return None
+
+
+def _run_job(job: LLMJob, prompt: str, token: str, url: str, stream: bool) -> None:
+    if not job.set_running_or_notify_cancel():
+        return
+    try:
+        job.set_result(request_completion(prompt, token, url, stream=stream, on_delta=job.append))
+    except Exception as exc:
+        job.set_exception(exc)
+
+
+def submit_llm_request(prompt: str, token: str, url: str = LLM_URL, stream: bool = False) -> LLMJob:
+    """Run the completion on the background executor; returns an ``LLMJob`` future.
+
+    With ``stream=True``, ``job.partial`` grows as tokens arrive. Fresh cached
+    answers come back as an already completed job, and an identical prompt
+    still in flight shares the existing job. Failures are not cached;
+    ``job.exception()`` carries them.
+    """
+    key = prompt_key(prompt, url)
+    answer = cached_answer(prompt, url)
+    if answer is not None:
+        done = LLMJob()
+        done.append(answer)
+        done.set_result(answer)
+        return done
+    executor = _get_executor()
+    with _llm_lock:
+        job = _inflight.get(key)
+        # A finished job may linger here until its done-callback runs; only reuse successes.
+        if job is not None and not (job.done() and job.exception() is not None):
+            return job
+        job = _inflight[key] = LLMJob()
+    executor.submit(_run_job, job, prompt, token, url, stream)
+
+    def _store(f: Future) -> None:
+        with _llm_lock:
+            if _inflight.get(key) is f:
+                del _inflight[key]
+            if not f.cancelled() and f.exception() is None:
+                _response_cache[key] = (time.monotonic(), f.result())
+                # Drop expired answers so the cache stays small.
+                now = time.monotonic()
+                for k in [k for k, (ts, _) in _response_cache.items() if now - ts >= LLM_CACHE_TTL_S]:
+                    del _response_cache[k]
+
+    job.add_done_callback(_store)
+    return job
+
+
 def build_prompt_from_snapshot(snapshot: dict, user_ctx) -> str:
     radar = snapshot.get("radar") or {}
     env = snapshot.get("environment") or {}
@@ -11,9 +11,10 @@ HOST = "192.168.50.176"
 PORT = 1883
 
 # Topics consumed by the CLI monitor; mirrors what the Streamlit app listens to.
+# The "+" level is the device id, so every Pico publishing under sensors/<id>/ is picked up.
 TOPICS = [
-    ("sensors/pico/mtp40f/co2", 0),
-    ("sensors/pico/air_mmwave", 0),
+    ("sensors/+/mtp40f/co2", 0),
+    ("sensors/+/air_mmwave", 0),
 ]
 
 CLIENT_ID = "pico-data-monitor"
@@ -40,11 +41,11 @@ def format_message(topic, payload_bytes):
         pretty = payload
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    if topic == "sensors/pico/mtp40f/co2":
+    if topic.endswith("/mtp40f/co2"):
         co2 = data.get("co2_ppm") if isinstance(data, dict) else None
         return f"[{timestamp}] CO2 → topic={topic}, co2_ppm={co2}, raw={pretty}"
 
-    if topic == "sensors/pico/air_mmwave":
+    if topic.endswith("/air_mmwave"):
         radar = data.get("radar") if isinstance(data, dict) else None
         env = data.get("environment") if isinstance(data, dict) else None
         target_count = radar.get("target_count") if isinstance(radar, dict) else None
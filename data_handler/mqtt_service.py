@@ -2,20 +2,98 @@
 from __future__ import annotations
 
 import json
+import os
+import socket
 import threading
-import time
-from typing import MutableMapping
+from typing import Dict, MutableMapping
 
 import paho.mqtt.client as mqtt
 
+from device_state import PRIMARY_DEVICE, devices, parse_device_topic, room_for
 from mqtt_monitor import HOST, PORT, TOPICS
-from thermal_comfort_model.comfort_calc import compute_comfort, latest_user_context, parse_env_from_payload
+from thermal_comfort_model.comfort_calc import EnvReading, compute_comfort, latest_user_context, parse_env_from_payload
 
 from state import update_state
 
 # Print MQTT messages to terminal for debugging. Set to False to silence.
 VERBOSE_LOG = True
 
+# One connection per process; host/pid keep the id unique when the dashboard and
+# another consumer run side by side, so the broker never kicks a duplicate id.
+CLIENT_ID = f"pico-streamlit-{socket.gethostname()}-{os.getpid()}"
+
+_mqtt_lock = threading.Lock()
+_mqtt_thread: threading.Thread | None = None
+_mqtt_client: mqtt.Client | None = None
+_stop_event = threading.Event()
+
+
+class ComfortWorker:
+    """Background comfort calculator with one latest-wins slot per device.
+
+    ``submit`` never blocks: if a device's reading is still waiting when a
+    newer one from the same device arrives, the older one is dropped (counted
+    as ``coalesced``). Comfort is only ever computed for the freshest
+    environment sample of each device.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._pending: Dict[str, EnvReading] = {}
+        self._thread: threading.Thread | None = None
+        self._submitted = 0
+        self._processed = 0
+        self._coalesced = 0
+        self._errors = 0
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="comfort-worker", daemon=True)
+                self._thread.start()
+
+    def submit(self, env: EnvReading, device_id: str = "pico") -> None:
+        with self._cond:
+            self._submitted += 1
+            if device_id in self._pending:
+                self._coalesced += 1
+            self._pending[device_id] = env
+            self._cond.notify()
+
+    def metrics(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "queue_depth": len(self._pending),
+                "submitted": self._submitted,
+                "processed": self._processed,
+                "coalesced": self._coalesced,
+                "errors": self._errors,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Oldest waiting device first, so a chatty Pico cannot starve the others.
+                device_id = next(iter(self._pending))
+                env = self._pending.pop(device_id)
+            try:
+                comfort = compute_comfort(env, latest_user_context())
+            except Exception as exc:  # keep the worker alive on bad inputs
+                with self._cond:
+                    self._errors += 1
+                print(f"Comfort computation failed: {exc}")
+                continue
+            with self._cond:
+                self._processed += 1
+            devices.update(device_id, comfort=comfort)
+            if device_id == PRIMARY_DEVICE:
+                update_state(comfort=comfort, comfort_worker=self.metrics())
+
+
+comfort_worker = ComfortWorker()
+
 
 def on_connect(client, userdata, flags, rc, properties=None):
     if rc == 0:
@@ -36,52 +114,90 @@ def on_message(client, userdata, msg):
     if VERBOSE_LOG:
         print(f"MQTT {msg.topic}: {data}")
 
-    # Route messages by topic; compute comfort only when we have environment payloads.
-    if msg.topic == "sensors/pico/mtp40f/co2" and isinstance(data, dict):
-        update_state(
-            co2_ppm=data.get("co2_ppm"),
-            last_topic=msg.topic,
-            last_payload=data,
-        )
-    elif msg.topic == "sensors/pico/air_mmwave" and isinstance(data, dict):
-        env_reading = parse_env_from_payload(data)
-        comfort = None
-        if env_reading:
-            user_ctx = latest_user_context()
-            comfort = compute_comfort(env_reading, user_ctx)
-        update_state(
+    # Route messages by device and stream; compute comfort only when we have environment payloads.
+    # Every device lives in `devices`; only PRIMARY_DEVICE is mirrored into the global state.
+    route = parse_device_topic(msg.topic)
+    stream = route[1] if route and isinstance(data, dict) else None
+    if stream == "co2":
+        device_id = route[0]
+        devices.update(device_id, room=room_for(device_id, data), co2_ppm=data.get("co2_ppm"))
+        if device_id == PRIMARY_DEVICE:
+            update_state(
+                co2_ppm=data.get("co2_ppm"),
+                last_topic=msg.topic,
+                last_payload=data,
+            )
+    elif stream == "air_mmwave":
+        device_id = route[0]
+        devices.update(
+            device_id,
+            room=room_for(device_id, data),
             radar=data.get("radar"),
             environment=data.get("environment"),
-            comfort=comfort,
-            last_topic=msg.topic,
-            last_payload=data,
         )
+        if device_id == PRIMARY_DEVICE:
+            update_state(
+                radar=data.get("radar"),
+                environment=data.get("environment"),
+                last_topic=msg.topic,
+                last_payload=data,
+            )
+        # PMV/UTCI are too slow for the network thread; the worker picks up the newest reading.
+        env_reading = parse_env_from_payload(data)
+        if env_reading:
+            comfort_worker.submit(env_reading, device_id)
     else:
         update_state(last_topic=msg.topic, last_payload=data)
 
 
-def _mqtt_loop():
+def _mqtt_loop(stop_event: threading.Event) -> None:
+    global _mqtt_client
     client = mqtt.Client(
-        client_id="pico-streamlit",
+        client_id=CLIENT_ID,
         protocol=mqtt.MQTTv311,
         callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
     )
     client.on_connect = on_connect
     client.on_message = on_message
+    _mqtt_client = client
 
-    while True:
+    while not stop_event.is_set():
         try:
             client.connect(HOST, PORT)
             client.loop_forever()
         except Exception as exc:  # keep retrying on disconnect or network error
             update_state(status=f"disconnected: {exc}")
-            time.sleep(2)
-
-
-def ensure_mqtt_thread(session_state: MutableMapping[str, object]) -> None:
-    """Start the MQTT listener only once per Streamlit session."""
-    if session_state.get("mqtt_thread"):
-        return
-    t = threading.Thread(target=_mqtt_loop, daemon=True)
-    t.start()
-    session_state["mqtt_thread"] = t
+            stop_event.wait(2)
+    update_state(status="disconnected")
+
+
+def ensure_mqtt_thread(session_state: MutableMapping[str, object] | None = None) -> threading.Thread:
+    """Start the process-wide MQTT listener if it is not running yet.
+
+    Every Streamlit session shares this one connection and reads the results from
+    ``state``; ``session_state`` only records the thread for callers that want it.
+    """
+    global _mqtt_thread
+    comfort_worker.start()
+    with _mqtt_lock:
+        if _mqtt_thread is None or not _mqtt_thread.is_alive():
+            _stop_event.clear()
+            _mqtt_thread = threading.Thread(target=_mqtt_loop, args=(_stop_event,), name="mqtt-ingest", daemon=True)
+            _mqtt_thread.start()
+        t = _mqtt_thread
+    if session_state is not None:
+        session_state["mqtt_thread"] = t
+    return t
+
+
+def stop_mqtt_thread(timeout: float = 5.0) -> None:
+    """Disconnect the shared MQTT client and wait for its thread to exit."""
+    global _mqtt_thread
+    with _mqtt_lock:
+        t = _mqtt_thread
+        _stop_event.set()
+        if _mqtt_client is not None:
+            _mqtt_client.disconnect()
+        _mqtt_thread = None
+    if t is not None:
+        t.join(timeout)
@@ -0,0 +1,241 @@
+"""Incremental multi-resolution rollups (1 min -> 15 min -> 1 h) with retention.
+
+``RollupEngine.add`` takes the same wide rows the raw store receives. Only the
+finest tier sees raw rows; each closed bucket is folded into the next coarser
+tier, so a 10 Hz feed costs one accumulator update per row. Every tier is a
+``ColumnarMetricsStore`` under ``ROLLUP_ROOT/<tier>`` with columns
+``<metric>_count``/``_mean``/``_min``/``_max``/``_last`` keyed on the bucket
+start, and old day partitions are dropped per ``RETENTION_DAYS``.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from columnar_store import COLUMNAR_ROOT, ColumnarMetricsStore, to_epoch
+from sqlite_store import SqliteMetricsStore
+
+ROLLUP_ROOT = COLUMNAR_ROOT.parent / "metrics_rollups"
+
+# Numeric indoor columns that get rolled up.
+ROLLUP_METRICS = ("co2_ppm", "people", "temperature_c", "humidity_pct", "pressure_hpa", "gas_kohms", "pmv", "ppd", "utci")
+
+# Tier name -> bucket width in seconds, finest first.
+TIERS: Dict[str, int] = {"1min": 60, "15min": 15 * 60, "1h": 3600}
+
+# Days of data kept per tier ("raw" is the columnar or SQLite raw store); None keeps forever.
+RETENTION_DAYS: Dict[str, Optional[int]] = {"raw": 7, "1min": 90, "15min": 400, "1h": None}
+
+STATS = ("count", "mean", "min", "max", "last")
+
+
+def rollup_schema(metrics: Iterable[str] = ROLLUP_METRICS) -> Dict[str, str]:
+    schema = {"timestamp": "datetime"}
+    for m in metrics:
+        for stat in STATS:
+            schema[f"{m}_{stat}"] = "i4" if stat == "count" else "f4"
+    return schema
+
+
+def _number(value: Any) -> float | None:
+    if value is None or value == "":
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+
+class _Bucket:
+    """Running count/sum/min/max/last per metric for one open time bucket."""
+
+    __slots__ = ("start", "stats")
+
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.stats: Dict[str, List[float]] = {}
+
+    def add(self, metric: str, count: int, total: float, lo: float, hi: float, last: float) -> None:
+        acc = self.stats.get(metric)
+        if acc is None:
+            self.stats[metric] = [count, total, lo, hi, last]
+        else:
+            acc[0] += count
+            acc[1] += total
+            acc[2] = min(acc[2], lo)
+            acc[3] = max(acc[3], hi)
+            acc[4] = last
+
+    def row(self) -> Dict[str, Any]:
+        row: Dict[str, Any] = {"timestamp": self.start}
+        for metric, (count, total, lo, hi, last) in self.stats.items():
+            row[f"{metric}_count"] = count
+            row[f"{metric}_mean"] = total / count
+            row[f"{metric}_min"] = lo
+            row[f"{metric}_max"] = hi
+            row[f"{metric}_last"] = last
+        return row
+
+
+class RollupEngine:
+    """Aggregate raw rows into every tier, persist closed buckets, and prune old partitions."""
+
+    def __init__(
+        self,
+        root=ROLLUP_ROOT,
+        metrics: Iterable[str] = ROLLUP_METRICS,
+        tiers: Mapping[str, int] = TIERS,
+        retention_days: Mapping[str, Optional[int]] = RETENTION_DAYS,
+        raw_store: Optional[ColumnarMetricsStore | SqliteMetricsStore] = None,
+    ) -> None:
+        self.metrics = tuple(metrics)
+        self.tiers = dict(sorted(tiers.items(), key=lambda item: item[1]))
+        self.retention_days = dict(retention_days)
+        self.raw_store = raw_store
+        schema = rollup_schema(self.metrics)
+        self.stores = {name: ColumnarMetricsStore(root / name, schema) for name in self.tiers}
+        self._open: Dict[str, Optional[_Bucket]] = {name: None for name in self.tiers}
+        self._lock = threading.Lock()
+        self._last_retention: Optional[date] = None
+
+    # -- ingest ------------------------------------------------------------
+
+    def add(self, row: Mapping[str, Any]) -> None:
+        """Fold one raw row (``state.snapshot_to_row`` shape) into the finest tier."""
+        ts = to_epoch(row.get("timestamp"))
+        if ts is None:
+            return
+        values = {m: v for m in self.metrics if (v := _number(row.get(m))) is not None}
+        with self._lock:
+            bucket = self._bucket(next(iter(self.tiers)), ts)
+            for m, v in values.items():
+                bucket.add(m, 1, v, v, v, v)
+        self.apply_retention()
+
+    def _bucket(self, tier: str, ts: float) -> _Bucket:
+        width = self.tiers[tier]
+        start = ts - ts % width
+        bucket = self._open[tier]
+        if bucket is not None and bucket.start != start:
+            self._close(tier, bucket)
+            bucket = None
+        if bucket is None:
+            bucket = self._open[tier] = _Bucket(start)
+        return bucket
+
+    def _close(self, tier: str, bucket: _Bucket) -> None:
+        self.stores[tier].append(bucket.row())
+        names = list(self.tiers)
+        i = names.index(tier)
+        if i + 1 < len(names):
+            coarser = self._bucket(names[i + 1], bucket.start)
+            for m, (count, total, lo, hi, last) in bucket.stats.items():
+                coarser.add(m, count, total, lo, hi, last)
+
+    def flush(self) -> None:
+        """Write every still-open bucket (partial) and flush the tier stores.
+
+        Open buckets are closed finest first, so coarser partials include all
+        data seen so far. A later bucket with the same start is merged back at
+        read time.
+        """
+        with self._lock:
+            for tier in self.tiers:
+                bucket, self._open[tier] = self._open[tier], None
+                if bucket is not None and bucket.stats:
+                    self._close(tier, bucket)
+        for store in self.stores.values():
+            store.flush()
+
+    def close(self) -> None:
+        self.flush()
+        for store in self.stores.values():
+            store.close()
+
+    def apply_retention(self, today: Optional[date] = None) -> Dict[str, List[date]]:
+        """Drop expired day partitions; runs at most once per calendar day unless ``today`` is given."""
+        current = today or date.today()
+        if today is None and self._last_retention == current:
+            return {}
+        self._last_retention = current
+        removed: Dict[str, List[date]] = {}
+        for tier, days in self.retention_days.items():
+            store = self.raw_store if tier == "raw" else self.stores.get(tier)
+            if days is None or store is None:
+                continue
+            removed[tier] = store.drop_partitions_before(current - timedelta(days=days))
+        return removed
+
+    # -- query -------------------------------------------------------------
+
+    def pick_tier(self, start: Any, end: Any, points: int) -> Optional[str]:
+        """Coarsest tier that still yields ``points`` buckets over the range, or None for raw."""
+        start_ts = to_epoch(start)
+        end_ts = to_epoch(end) or time.time()
+        if start_ts is None:
+            days = self.stores[next(iter(self.tiers))].partitions()
+            if not days:
+                return None
+            start_ts = datetime.combine(days[0], datetime.min.time()).timestamp()
+        span = end_ts - start_ts
+        for tier, width in reversed(self.tiers.items()):
+            if span / width >= points:
+                return tier
+        return None
+
+    def read(
+        self,
+        tier: str,
+        start: Any = None,
+        end: Any = None,
+        metrics: Optional[Iterable[str]] = None,
+        stats: Iterable[str] = STATS,
+    ) -> Dict[str, np.ndarray]:
+        """``{timestamp, <metric>_<stat>...}`` arrays of one tier, one row per bucket."""
+        metrics = tuple(metrics or self.metrics)
+        stats = tuple(stats)
+        # Merging split buckets needs count (for means) even when not asked for.
+        wanted = {f"{m}_{s}" for m in metrics for s in set(stats) | {"count"}}
+        data = self.stores[tier].read_range(start, end, sorted(wanted))
+        data = _merge_split_buckets(data, metrics)
+        return {k: v for k, v in data.items() if k == "timestamp" or k.rsplit("_", 1)[1] in stats}
+
+
+def _merge_split_buckets(data: Dict[str, np.ndarray], metrics: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+    """Combine rows sharing a bucket start (partial buckets written by ``flush``)."""
+    ts = data["timestamp"]
+    if len(ts) < 2 or np.all(np.diff(ts) > 0):
+        return data
+    order = np.argsort(ts, kind="stable")
+    data = {k: v[order] for k, v in data.items()}
+    uniq, first, inverse = np.unique(data["timestamp"], return_index=True, return_inverse=True)
+    out: Dict[str, np.ndarray] = {"timestamp": uniq}
+    for m in metrics:
+        count = np.clip(data[f"{m}_count"].astype("f8"), 0, None)
+        merged_count = np.bincount(inverse, weights=count, minlength=len(uniq))
+        out[f"{m}_count"] = merged_count.astype("i4")
+        if f"{m}_mean" in data:
+            total = np.bincount(inverse, weights=np.nan_to_num(data[f"{m}_mean"].astype("f8")) * count, minlength=len(uniq))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[f"{m}_mean"] = (total / merged_count).astype("f4")
+        if f"{m}_min" in data:
+            lo = np.full(len(uniq), np.nan)
+            np.fmin.at(lo, inverse, data[f"{m}_min"])
+            out[f"{m}_min"] = lo.astype("f4")
+        if f"{m}_max" in data:
+            hi = np.full(len(uniq), np.nan)
+            np.fmax.at(hi, inverse, data[f"{m}_max"])
+            out[f"{m}_max"] = hi.astype("f4")
+        if f"{m}_last" in data:
+            # Take the newest row of each group that actually saw this metric.
+            last_vals = data[f"{m}_last"]
+            seen = np.where(count > 0, np.arange(len(order)), -1)
+            newest = np.full(len(uniq), -1)
+            np.maximum.at(newest, inverse, seen)
+            out[f"{m}_last"] = np.where(newest >= 0, last_vals[np.maximum(newest, 0)], np.nan).astype("f4")
+    return out
@@ -0,0 +1,374 @@
+"""SQLite (WAL) store for sensor history, split into one table per sensor stream.
+
+Writes are queued and applied by a single background thread with batched
+``executemany`` calls, so the MQTT ingest thread never waits on disk. Readers
+use their own per-thread connections; WAL mode lets them run concurrently with
+the writer. Every table is keyed on ``ts`` (epoch seconds), plus ``device_id``
+for per-device streams, so ``latest()`` and ``range()`` are index lookups.
+
+A stream row is only written when that stream's values change for a device
+(at least every ``REPEAT_AFTER_S``), so a 10 Hz feed whose CO2 or radar value
+holds steady does not repeat it in every table.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import queue
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+from columnar_store import METRICS_SCHEMA, encode_values, to_epoch
+
+SQLITE_PATH = Path(__file__).resolve().parent / "metrics.sqlite3"
+
+# Row columns stored by each stream table.
+STREAMS: Dict[str, List[str]] = {
+    "co2": ["co2_ppm"],
+    "environment": ["temperature_c", "humidity_pct", "pressure_hpa", "gas_kohms"],
+    "radar": ["people"],
+    "comfort": ["pmv", "ppd", "utci"],
+    "weather": [
+        "weather_temperature_c",
+        "weather_feel_temperature_c",
+        "weather_humidity_pct",
+        "weather_pressure_hpa",
+        "weather_wind_speed_ms",
+        "weather_wind_gust_ms",
+        "weather_precip_total_mm",
+        "weather_precip_timeframe_min",
+        "weather_condition",
+        "weather_measured_iso",
+    ],
+    # Room of each Pico; the device itself is part of every per-device table's key.
+    "device": ["room"],
+}
+
+# Per-device tables are keyed on (ts, DEVICE_KEY) so two Picos reporting at the
+# same instant never overwrite each other; outdoor weather is shared by all.
+DEVICE_KEY = "device_id"
+SHARED_STREAMS = ("weather",)
+
+# Unchanged values are written again after this many seconds, so charts and
+# retention always see recent rows. Shared streams are never repeated.
+REPEAT_AFTER_S = 60.0
+
+BATCH_ROWS = 200
+FLUSH_INTERVAL_S = 2.0
+_STOP = object()
+
+
+def _sql_type(column: str) -> str:
+    kind = METRICS_SCHEMA[column]
+    if kind in ("category", "datetime"):
+        return "TEXT"
+    return "INTEGER" if kind.startswith("i") else "REAL"
+
+
+def _create_table(conn: sqlite3.Connection, stream: str) -> None:
+    cols = ", ".join(f"{c} {_sql_type(c)}" for c in STREAMS[stream])
+    if stream in SHARED_STREAMS:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {stream} (ts REAL PRIMARY KEY, {cols}) WITHOUT ROWID")
+        return
+    info = conn.execute(f"PRAGMA table_info({stream})").fetchall()
+    legacy = info and DEVICE_KEY not in [r[1] for r in info if r[5]]
+    if legacy:
+        # Tables of earlier releases were keyed on ts alone; rebuild them with the device in the key.
+        conn.execute(f"ALTER TABLE {stream} RENAME TO {stream}_old")
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {stream} "
+        f"(ts REAL NOT NULL, {DEVICE_KEY} TEXT NOT NULL, {cols}, PRIMARY KEY (ts, {DEVICE_KEY})) WITHOUT ROWID"
+    )
+    if legacy:
+        old = [r[1] for r in info]
+        copied = ", ".join(c for c in STREAMS[stream] if c in old)
+        device = f"COALESCE({DEVICE_KEY}, '')" if DEVICE_KEY in old else "''"
+        conn.execute(
+            f"INSERT OR REPLACE INTO {stream} (ts, {DEVICE_KEY}, {copied}) "
+            f"SELECT ts, {device}, {copied} FROM {stream}_old"
+        )
+        conn.execute(f"DROP TABLE {stream}_old")
+
+
+def _sql_value(column: str, value: Any) -> Any:
+    if value is None or value == "":
+        return None
+    kind = METRICS_SCHEMA[column]
+    if kind in ("category", "datetime"):
+        return str(value)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != number:
+        return None
+    return int(round(number)) if kind.startswith("i") else number
+
+
+class SqliteMetricsStore:
+    """Batched, WAL-mode SQLite history with indexed ``latest()``/``range()`` reads."""
+
+    def __init__(
+        self,
+        path: Path = SQLITE_PATH,
+        batch_rows: int = BATCH_ROWS,
+        flush_interval: float = FLUSH_INTERVAL_S,
+    ) -> None:
+        self.path = Path(path)
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._local = threading.local()
+        self._closed = False
+        # (stream, device) -> (ts, values) last written; only touched by the writer thread.
+        self._last_rows: Dict[tuple, tuple] = {}
+        self.dropped_rows = 0
+
+        conn = self._connect()
+        with conn:
+            for stream in STREAMS:
+                _create_table(conn, stream)
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # -- writing -----------------------------------------------------------
+
+    def append(self, row: Mapping[str, Any]) -> None:
+        """Queue one wide row (``state.snapshot_to_row`` shape) for the writer thread."""
+        ts = to_epoch(row.get("timestamp"))
+        if ts is None or self._closed:
+            return
+        self._queue.put((ts, dict(row)))
+
+    def flush(self) -> None:
+        """Block until every queued row is committed."""
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+
+    def drop_partitions_before(self, day: date) -> List[date]:
+        """Delete rows from before local midnight of ``day`` (retention); returns the days removed.
+
+        Same contract as ``ColumnarMetricsStore.drop_partitions_before``, so the
+        rollup engine prunes either raw store. Each ``ts`` index makes this a range delete.
+        """
+        cutoff = datetime.combine(day, datetime.min.time()).timestamp()
+        removed = set()
+        conn = self._connect()
+        try:
+            with conn:
+                for stream in STREAMS:
+                    removed.update(
+                        r[0] for r in conn.execute(
+                            f"SELECT DISTINCT date(ts, 'unixepoch', 'localtime') FROM {stream} WHERE ts < ?", (cutoff,)
+                        )
+                    )
+                    conn.execute(f"DELETE FROM {stream} WHERE ts < ?", (cutoff,))
+        finally:
+            conn.close()
+        return sorted(date.fromisoformat(d) for d in removed)
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while True:
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_rows:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._last_rows = self._insert_batch(conn, batch, self._last_rows)
+            except Exception as exc:  # e.g. disk full or a locked/corrupt file; keep the writer alive
+                self.dropped_rows += len(batch)
+                print(f"SQLite write failed, dropped {len(batch)} rows: {exc}")
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+        conn.close()
+
+    def _insert_batch(
+        self, conn: sqlite3.Connection, batch: List[tuple], last_rows: Dict[tuple, tuple]
+    ) -> Dict[tuple, tuple]:
+        """Write the stream rows of ``batch`` that changed; returns the updated ``last_rows``.
+
+        ``last_rows`` is not modified, so a failed commit leaves the caller's copy intact.
+        """
+        last_rows = dict(last_rows)
+        params: Dict[str, List[tuple]] = {stream: [] for stream in STREAMS}
+        for ts, row in batch:
+            device = str(row.get(DEVICE_KEY) or "")
+            for stream, columns in STREAMS.items():
+                values = tuple(_sql_value(c, row.get(c)) for c in columns)
+                if all(v is None for v in values):
+                    continue
+                shared = stream in SHARED_STREAMS
+                key = (stream, None if shared else device)
+                last = last_rows.get(key)
+                # Buienradar refreshes every few minutes; store each observation once.
+                if last is not None and last[1] == values and (shared or ts - last[0] < REPEAT_AFTER_S):
+                    continue
+                last_rows[key] = (ts, values)
+                params[stream].append((ts, *values) if shared else (ts, device, *values))
+        with conn:
+            for stream, rows in params.items():
+                if rows:
+                    names = ["ts"] + ([] if stream in SHARED_STREAMS else [DEVICE_KEY]) + STREAMS[stream]
+                    placeholders = ", ".join("?" * len(names))
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO {stream} ({', '.join(names)}) VALUES ({placeholders})", rows
+                    )
+        return last_rows
+
+    def import_csv(self, csv_path: Path) -> int:
+        """One-shot import of an existing ``live_metrics.csv``; returns rows read."""
+        count = 0
+        last_rows: Dict[tuple, tuple] = {}
+        batch: List[tuple] = []
+        conn = self._connect()
+        try:
+            with Path(csv_path).open("r", newline="") as f:
+                for row in csv.DictReader(f):
+                    ts = to_epoch(row.get("timestamp"))
+                    if ts is None:
+                        continue
+                    batch.append((ts, row))
+                    count += 1
+                    if len(batch) >= 10_000:
+                        last_rows = self._insert_batch(conn, batch, last_rows)
+                        batch = []
+            if batch:
+                self._insert_batch(conn, batch, last_rows)
+        finally:
+            conn.close()
+        return count
+
+    # -- reading -----------------------------------------------------------
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def latest(self, stream: Optional[str] = None) -> Dict[str, Any] | None:
+        """Return the newest row of one stream, or all streams merged into one wide row."""
+        streams = [stream] if stream else list(STREAMS)
+        merged: Dict[str, Any] = {}
+        newest = None
+        for name in streams:
+            rec = self._reader().execute(f"SELECT * FROM {name} ORDER BY ts DESC LIMIT 1").fetchone()
+            if rec is None:
+                continue
+            newest = rec["ts"] if newest is None else max(newest, rec["ts"])
+            merged.update({c: rec[c] for c in STREAMS[name]})
+            if name == "device":
+                merged[DEVICE_KEY] = rec[DEVICE_KEY] or None
+        if newest is None:
+            return None
+        return {"timestamp": datetime.fromtimestamp(newest).isoformat(), **merged}
+
+    def range(self, stream: str, start: Any = None, end: Any = None) -> List[Dict[str, Any]]:
+        """Return rows of ``stream`` with ``start <= ts < end`` in time order."""
+        if stream not in STREAMS:
+            raise KeyError(f"Unknown stream {stream!r}")
+        start_ts = to_epoch(start)
+        end_ts = to_epoch(end)
+        rows = self._reader().execute(
+            f"SELECT * FROM {stream} WHERE ts >= ? AND ts < ? ORDER BY ts",
+            (start_ts if start_ts is not None else float("-inf"), end_ts if end_ts is not None else float("inf")),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def read_range(
+        self,
+        start: Any = None,
+        end: Any = None,
+        columns: Optional[Iterable[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Wide ``{column: array}`` view aligned on the union of stream timestamps.
+
+        Matches ``ColumnarMetricsStore.read_range`` dtypes; gaps are NaN or
+        ``INT_MISSING`` and category columns come back as strings.
+        """
+        self.flush()
+        wanted = [c for c in (columns or METRICS_SCHEMA) if c != "timestamp"]
+        per_stream: Dict[str, List[Dict[str, Any]]] = {}
+        for stream in {_stream_of(c) for c in wanted}:
+            per_stream[stream] = self.range(stream, start, end)
+
+        stamps = [np.array([r["ts"] for r in rows], dtype="f8") for rows in per_stream.values()]
+        ts = np.unique(np.concatenate(stamps)) if stamps else np.empty(0, dtype="f8")
+        out: Dict[str, np.ndarray] = {"timestamp": ts}
+        for column in wanted:
+            rows = per_stream[_stream_of(column)]
+            idx = np.searchsorted(ts, np.array([r["ts"] for r in rows], dtype="f8"))
+            if METRICS_SCHEMA[column] == "category":
+                filled = np.full(len(ts), None, dtype=object)
+                filled[idx] = [r[column] or None for r in rows]
+                out[column] = filled
+                continue
+            filled = encode_values(METRICS_SCHEMA[column], [None] * len(ts))
+            if rows:
+                filled[idx] = encode_values(METRICS_SCHEMA[column], [r[column] for r in rows])
+            out[column] = filled
+        return out
+
+
+def _stream_of(column: str) -> str:
+    if column == DEVICE_KEY:
+        return "device"
+    stream = next((s for s, cols in STREAMS.items() if column in cols), None)
+    if stream is None:
+        raise KeyError(f"Unknown column {column!r}")
+    return stream
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import live_metrics.csv into the SQLite metrics store.")
+    parser.add_argument("--csv", type=Path, default=Path(__file__).resolve().parent / "live_metrics.csv")
+    parser.add_argument("--db", type=Path, default=SQLITE_PATH)
+    args = parser.parse_args()
+
+    store = SqliteMetricsStore(args.db)
+    try:
+        count = store.import_csv(args.csv)
+    finally:
+        store.close()
+    print(f"Imported {count} rows from {args.csv} into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
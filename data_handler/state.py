@@ -1,43 +1,194 @@
 """Shared sensor state and CSV persistence helpers for the Streamlit app."""
 from __future__ import annotations
 
+import atexit
 import csv
+import json
+import os
 import threading
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from downsample import lttb
+from rollups import ROLLUP_ROOT, RollupEngine
+from columnar_store import COLUMNAR_ROOT, METRICS_SCHEMA, ColumnarMetricsStore, encode_values, to_epoch
+from sqlite_store import SQLITE_PATH, SqliteMetricsStore
+from weather_history import WEATHER_COLUMNS, WEATHER_ROOT, WeatherHistory
 
 SENSOR_CSV = Path(__file__).resolve().parent / "live_metrics.csv"
 
-# Shared state guarded by a lock so the Streamlit thread can read safely.
-# Shared dict mirrors the most recent MQTT payloads plus derived comfort metrics.
-latest: Dict[str, Any] = {
+METRICS_HEADERS = [
+    "timestamp",
+    "co2_ppm",
+    "people",
+    "temperature_c",
+    "humidity_pct",
+    "pressure_hpa",
+    "gas_kohms",
+    "pmv",
+    "ppd",
+    "utci",
+    "weather_temperature_c",
+    "weather_feel_temperature_c",
+    "weather_humidity_pct",
+    "weather_pressure_hpa",
+    "weather_wind_speed_ms",
+    "weather_wind_gust_ms",
+    "weather_precip_total_mm",
+    "weather_precip_timeframe_min",
+    "weather_condition",
+    "weather_measured_iso",
+    # Added with per-device persistence; kept last so rows of older files stay aligned.
+    "device_id",
+    "room",
+]
+
+# Batched CSV writes: flush every N rows or every few seconds, whichever comes first.
+FLUSH_ROWS = 50
+FLUSH_INTERVAL_S = 2.0
+WRITE_BUFFER_BYTES = 64 * 1024
+
+# Persistence backend: "columnar" (default) writes typed day-partitioned column
+# files under COLUMNAR_ROOT (see columnar_store.py), "sqlite" writes per-stream
+# WAL tables to SQLITE_PATH (see sqlite_store.py) and "csv" appends to
+# SENSOR_CSV. CSV has no index, so History range reads on it parse the whole file.
+# Read from the THERMAL_GRACE_BACKEND environment variable so ingestd and the
+# dashboard (separate processes) always use the same store.
+# The columnar store keeps no weather columns itself and records each weather
+# reading once under WEATHER_ROOT instead (see weather_history.py); the CSV and
+# SQLite backends keep weather in their own rows/table.
+METRICS_BACKEND = os.environ.get("THERMAL_GRACE_BACKEND", "columnar")
+
+# In-memory history of recent readings: 24 h at the Pico's 10 Hz publish rate
+# (PUBLISH_INTERVAL_MS = 100 in air_quality_mmWave_mqtt/main.py). Buffers start
+# at HISTORY_INITIAL_ROWS and double as rows arrive, so a process that never
+# ingests (or only briefly) does not pay for the full ~28 MB. ingestd fills it
+# and shares history_trends() with the dashboard in the shared snapshot.
+HISTORY_METRICS = ("co2_ppm", "temperature_c", "humidity_pct", "pmv", "ppd", "people")
+HISTORY_CAPACITY = 24 * 3600 * 10
+HISTORY_INITIAL_ROWS = 4096
+
+# history_trends(): rolling stats per window, plus the last TREND_SERIES_S
+# seconds LTTB-downsampled to TREND_POINTS for the Live Metrics charts.
+TREND_WINDOWS_S = {"1h": 3600, "24h": 24 * 3600}
+TREND_SERIES_S = 3600
+TREND_POINTS = 120
+
+# read_history answers from a rollup tier once it still gives at least this many points.
+HISTORY_POINTS = 2000
+
+# latest_sensor_row reads the CSV tail in blocks this size and caches by file identity.
+TAIL_BLOCK_BYTES = 8 * 1024
+_latest_row_cache: Dict[str, Any] = {}
+_latest_row_lock = threading.Lock()
+
+# Live snapshot shared by ingestd with the dashboard, which runs no MQTT or
+# weather threads of its own. ingestd rewrites it atomically at most every
+# SHARED_SNAPSHOT_INTERVAL_S. In each reader process one SharedSnapshotWatcher
+# thread stats it every SHARED_SNAPSHOT_POLL_S and wakes sessions through a
+# condition variable, so idle sessions block without using CPU.
+SHARED_SNAPSHOT_PATH = Path(__file__).resolve().parent / "live_snapshot.json"
+SHARED_SNAPSHOT_INTERVAL_S = 0.5
+SHARED_SNAPSHOT_POLL_S = 0.1
+_shared_snapshot_cache: Dict[str, Any] = {}
+_shared_snapshot_watcher: Optional["SharedSnapshotWatcher"] = None
+
+class FrozenDict(dict):
+    """Read-only dict: still a ``dict`` for ``.get``/JSON/Streamlit, but mutation raises."""
+
+    __slots__ = ()
+
+    def _readonly(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("state snapshots are read-only; use update_state()")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """Read-only list, so ``isinstance(value, list)`` checks on payloads keep working."""
+
+    __slots__ = ()
+
+    def _readonly(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("state snapshots are read-only; use update_state()")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts to ``FrozenDict`` and lists to ``FrozenList``; tuples stay tuples."""
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(v) for v in value)
+    if isinstance(value, tuple):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+# Most recent MQTT payloads plus derived comfort metrics, as an immutable
+# snapshot. update_state publishes a new one by swapping this reference, so
+# readers never lock or copy; state_lock only serializes writers.
+latest: FrozenDict = FrozenDict({
     "co2_ppm": None,
     "radar": None,
     "environment": None,
     "comfort": None,
+    "comfort_worker": None,
     "weather": None,
     "weather_error": None,
     "last_topic": None,
     "last_payload": None,
     "last_updated": None,
     "status": "disconnected",
-}
+})
 state_lock = threading.Lock()
+# Bumped on every update_state; readers block on state_changed instead of polling.
+state_version = 0
+state_changed = threading.Condition(state_lock)
 
 
 def update_state(**kwargs: Any) -> None:
-    """Update shared state while keeping last_updated in sync."""
-    with state_lock:
-        latest.update(kwargs)
-        latest["last_updated"] = time.time()
+    """Publish a new snapshot with ``kwargs`` applied and wake waiting readers."""
+    global latest, state_version
+    changes = {k: freeze(v) for k, v in kwargs.items()}
+    with state_changed:
+        now = time.time()
+        latest = FrozenDict({**latest, **changes, "last_updated": now})
+        if _HISTORY_SOURCES.intersection(changes):
+            row = snapshot_to_row(changes)
+            history.append(now, {m: row[m] for m in HISTORY_METRICS})
+        state_version += 1
+        state_changed.notify_all()
+
+
+def wait_for_update(last_version: int, timeout: float | None = None) -> int:
+    """Block until ``state_version`` differs from ``last_version`` or ``timeout`` passes.
+
+    Returns the current version; it equals ``last_version`` only on timeout.
+    """
+    with state_changed:
+        state_changed.wait_for(lambda: state_version != last_version, timeout)
+        return state_version
 
 
-def get_snapshot() -> Dict[str, Any]:
-    """Return a shallow copy of the latest state for safe reads."""
-    with state_lock:
-        return latest.copy()
+def get_snapshot() -> FrozenDict:
+    """Return the current point-in-time snapshot (immutable, safe to share across threads)."""
+    return latest
 
 
 def snapshot_to_row(snapshot: Dict[str, Any]) -> Dict[str, Any]:
@@ -76,64 +227,558 @@ def snapshot_to_row(snapshot: Dict[str, Any]) -> Dict[str, Any]:
         "weather_precip_timeframe_min": weather.get("precip_timeframe_min") if isinstance(weather, dict) else None,
         "weather_condition": weather.get("condition") if isinstance(weather, dict) else None,
         "weather_measured_iso": weather.get("measured_iso") if isinstance(weather, dict) else None,
+        "device_id": snapshot.get("device_id"),
+        "room": snapshot.get("room"),
     }
 
 
+def _as_float(value: Any) -> float:
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class MetricHistory:
+    """Bounded ring buffer of numeric readings backed by NumPy arrays.
+
+    Storage starts at ``initial_rows`` and doubles (amortized O(1) appends)
+    until it reaches ``capacity``; from then on ``append`` overwrites the
+    oldest row, so memory never grows with uptime. A metric missing from an
+    appended row, or one that is not numeric, is stored as NaN: each metric
+    keeps its own native rate. ``segments`` hands out zero-copy views (oldest
+    first); they alias live storage, so copy them if they must outlive the
+    next ``capacity`` appends.
+    """
+
+    def __init__(
+        self,
+        metrics: Iterable[str] = HISTORY_METRICS,
+        capacity: int = HISTORY_CAPACITY,
+        initial_rows: int = HISTORY_INITIAL_ROWS,
+    ) -> None:
+        self.metrics = tuple(metrics)
+        self.capacity = capacity
+        # _count guards unread slots.
+        size = max(1, min(initial_rows, capacity))
+        self.timestamps = np.empty(size, dtype="f8")
+        self.values = {m: np.empty(size, dtype="f4") for m in self.metrics}
+        self._head = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, ts: float, row: Dict[str, Any]) -> None:
+        with self._lock:
+            i = self._head
+            if i == len(self.timestamps) and i < self.capacity:
+                self._grow(min(2 * i, self.capacity))
+            self.timestamps[i] = ts
+            for m in self.metrics:
+                self.values[m][i] = _as_float(row.get(m))
+            self._head = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def _grow(self, size: int) -> None:
+        # Only called before the first wrap, so the filled rows are the prefix [0, _count).
+        n = self._count
+        timestamps = np.empty(size, dtype="f8")
+        timestamps[:n] = self.timestamps[:n]
+        values = {}
+        for m, old in self.values.items():
+            values[m] = np.empty(size, dtype="f4")
+            values[m][:n] = old[:n]
+        self.timestamps, self.values = timestamps, values
+
+    def clear(self) -> None:
+        with self._lock:
+            self._head = 0
+            self._count = 0
+
+    def segments(self, since: float | None = None) -> List[tuple[np.ndarray, Dict[str, np.ndarray]]]:
+        """Chronological ``(timestamps, {metric: values})`` views, at most two (before/after wrap)."""
+        with self._lock:
+            head, count = self._head, self._count
+            timestamps, values = self.timestamps, self.values
+        if count < self.capacity:
+            bounds = [(0, count)]
+        else:
+            bounds = [(head, self.capacity), (0, head)]
+        out = []
+        for lo, hi in bounds:
+            if since is not None:
+                lo += int(np.searchsorted(timestamps[lo:hi], since, side="left"))
+            if hi > lo:
+                out.append((timestamps[lo:hi], {m: v[lo:hi] for m, v in values.items()}))
+        return out
+
+    def series(self, metric: str, since: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Copy of ``(timestamps, values)`` for one metric with its gaps (NaN rows) dropped."""
+        parts = self.segments(since)
+        if not parts:
+            return np.empty(0, dtype="f8"), np.empty(0, dtype="f4")
+        ts = np.concatenate([p[0] for p in parts])
+        vals = np.concatenate([p[1][metric] for p in parts])
+        keep = ~np.isnan(vals)
+        return ts[keep], vals[keep]
+
+    def stats(self, metric: str, window_s: float | None = None, now: float | None = None) -> Dict[str, float | int | None]:
+        """Rolling count/mean/min/max/last of ``metric`` over the last ``window_s`` seconds."""
+        since = None if window_s is None else (now if now is not None else time.time()) - window_s
+        count = 0
+        total = 0.0
+        lo = hi = last = None
+        for _, values in self.segments(since):
+            vals = values[metric]
+            vals = vals[~np.isnan(vals)]
+            if not len(vals):
+                continue
+            count += len(vals)
+            total += float(vals.sum(dtype="f8"))
+            lo = float(vals.min()) if lo is None else min(lo, float(vals.min()))
+            hi = float(vals.max()) if hi is None else max(hi, float(vals.max()))
+            last = float(vals[-1])
+        return {
+            "count": count,
+            "mean": total / count if count else None,
+            "min": lo,
+            "max": hi,
+            "last": last,
+        }
+
+
+def history_trends(now: float | None = None) -> Dict[str, Dict[str, Any]]:
+    """JSON-ready ``{metric: {"stats": {window: stats}, "series": [[ts, value], ...]}}`` from ``history``."""
+    now = time.time() if now is None else now
+    trends = {}
+    for metric in history.metrics:
+        x, y = lttb(*history.series(metric, since=now - TREND_SERIES_S), TREND_POINTS)
+        trends[metric] = {
+            "stats": {name: history.stats(metric, window, now) for name, window in TREND_WINDOWS_S.items()},
+            "series": [[float(t), float(v)] for t, v in zip(x, y)],
+        }
+    return trends
+
+
+# update_state only records history for changes to these shared-state keys.
+_HISTORY_SOURCES = {"co2_ppm", "environment", "radar", "comfort"}
+history = MetricHistory()
+
+
+class MetricsWriter:
+    """Append-only CSV writer that keeps one handle open and flushes in batches.
+
+    The header is validated once when the writer opens the file; afterwards each
+    row costs a single buffered write. Buffered rows reach disk every
+    ``flush_rows`` rows, every ``flush_interval`` seconds, or on ``close()``.
+    """
+
+    def __init__(
+        self,
+        path: Path = SENSOR_CSV,
+        headers: List[str] = METRICS_HEADERS,
+        flush_rows: int = FLUSH_ROWS,
+        flush_interval: float = FLUSH_INTERVAL_S,
+    ) -> None:
+        self.path = Path(path)
+        self.headers = list(headers)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+
+        _ensure_csv_header(self.path, self.headers)
+        self._file = self.path.open("a", newline="", buffering=WRITE_BUFFER_BYTES)
+        self._writer = csv.DictWriter(self._file, fieldnames=self.headers)
+
+        # Timer flush so a quiet sensor does not leave rows sitting in the buffer.
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._writer.writerow(row)
+            self._pending += 1
+            if self._pending >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._closed.is_set():
+                self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+            self._flush_locked()
+            self._file.close()
+
+    def _flush_locked(self) -> None:
+        if self._pending:
+            self._file.flush()
+            self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+
+def _ensure_csv_header(path: Path, headers: List[str]) -> None:
+    """Make sure the CSV starts with ``headers`` and ends on a complete line."""
+    if not path.exists() or path.stat().st_size == 0:
+        with path.open("w", newline="") as f:
+            csv.writer(f).writerow(headers)
+        return
+
+    with path.open("r", newline="") as f:
+        first_row = next(csv.reader(f), [])
+    if first_row and first_row != headers and headers[: len(first_row)] == first_row:
+        # Header of an older release: columns were only ever appended, so just swap the header line.
+        with path.open("r", newline="") as f:
+            f.readline()
+            rest = f.read()
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("w", newline="") as f:
+            csv.writer(f).writerow(headers)
+            f.write(rest)
+        tmp.replace(path)
+    elif first_row != headers:
+        # Rewrite file with header + existing rows preserved as-is.
+        with path.open("r", newline="") as f:
+            existing = list(csv.reader(f))
+        with path.open("w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            writer.writerows(existing)
+        return
+
+    # A crash mid-write can leave a partial last line; terminate it so new rows start cleanly.
+    with path.open("rb+") as f:
+        f.seek(-1, 2)
+        if f.read(1) != b"\n":
+            f.write(b"\r\n")
+
+
+_metrics_writer: MetricsWriter | None = None
+_metrics_writer_lock = threading.Lock()
+_metrics_store: ColumnarMetricsStore | SqliteMetricsStore | None = None
+_rollup_engine: RollupEngine | None = None
+_weather_history: WeatherHistory | None = None
+
+
+def get_metrics_writer() -> MetricsWriter:
+    """Return the process-wide writer for ``SENSOR_CSV``, opening it on first use."""
+    global _metrics_writer
+    with _metrics_writer_lock:
+        if _metrics_writer is None:
+            _metrics_writer = MetricsWriter(SENSOR_CSV)
+            atexit.register(_metrics_writer.close)
+        return _metrics_writer
+
+
+def close_metrics_writer() -> None:
+    """Flush and close the shared writer; the next append reopens it."""
+    global _metrics_writer
+    with _metrics_writer_lock:
+        if _metrics_writer is not None:
+            _metrics_writer.close()
+            _metrics_writer = None
+
+
 def append_snapshot_to_csv(snapshot: Dict[str, Any]) -> None:
     row = snapshot_to_row(snapshot)
     if not row.get("timestamp"):
         return
-    headers = [
-        "timestamp",
-        "co2_ppm",
-        "people",
-        "temperature_c",
-        "humidity_pct",
-        "pressure_hpa",
-        "gas_kohms",
-        "pmv",
-        "ppd",
-        "utci",
-        "weather_temperature_c",
-        "weather_feel_temperature_c",
-        "weather_humidity_pct",
-        "weather_pressure_hpa",
-        "weather_wind_speed_ms",
-        "weather_wind_gust_ms",
-        "weather_precip_total_mm",
-        "weather_precip_timeframe_min",
-        "weather_condition",
-        "weather_measured_iso",
-    ]
-    exists = SENSOR_CSV.exists()
-
-    # Ensure header exists even if the file was created earlier without one.
-    if exists and SENSOR_CSV.stat().st_size > 0:
-        with SENSOR_CSV.open("r", newline="") as f:
-            first_row = next(csv.reader(f), [])
-        if first_row != headers:
-            # Rewrite file with header + existing rows preserved as-is.
-            with SENSOR_CSV.open("r", newline="") as f:
-                existing = list(csv.reader(f))
-            with SENSOR_CSV.open("w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(headers)
-                writer.writerows(existing)
-    with SENSOR_CSV.open("a", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        if not exists or SENSOR_CSV.stat().st_size == 0:
-            writer.writeheader()
-        writer.writerow(row)
+    get_metrics_writer().write(row)
+
+
+def _rfind_newline(f, lo: int, hi: int) -> int:
+    """Return the offset of the last newline in ``[lo, hi)``, scanning backwards in blocks."""
+    block_end = hi
+    while block_end > lo:
+        block_start = max(lo, block_end - TAIL_BLOCK_BYTES)
+        f.seek(block_start)
+        nl = f.read(block_end - block_start).rfind(b"\n")
+        if nl != -1:
+            return block_start + nl
+        block_end = block_start
+    return -1
+
+
+def _read_last_line(f, size: int, skip: int) -> bytes | None:
+    """Return the last newline-terminated line after byte offset ``skip``, or None."""
+    # Ignore a trailing partial line that a writer has not finished yet.
+    end_nl = _rfind_newline(f, skip, size)
+    if end_nl == -1:
+        return None
+    start = _rfind_newline(f, skip, end_nl) + 1 or skip
+    if start >= end_nl:
+        return None
+    f.seek(start)
+    return f.read(end_nl + 1 - start)
 
 
 def latest_sensor_row() -> Dict[str, Any] | None:
-    if not SENSOR_CSV.exists():
+    """Return the most recently persisted row from the configured backend.
+
+    For the CSV backend only the header and the last complete line are parsed,
+    and the result is cached on the file's (inode, size, mtime) so repeated
+    calls on an unchanged file cost a single ``stat``.
+    """
+    if METRICS_BACKEND == "columnar":
+        row = get_metrics_store().latest()
+        weather = get_weather_history().latest()
+        return {**row, **weather} if row and weather else row
+    if METRICS_BACKEND != "csv":
+        return get_metrics_store().latest()
+    try:
+        st = SENSOR_CSV.stat()
+    except FileNotFoundError:
         return None
-    with SENSOR_CSV.open("r", newline="") as f:
-        reader = list(csv.DictReader(f))
-        if not reader:
-            return None
-        return reader[-1]
+    key = (str(SENSOR_CSV), st.st_ino, st.st_size, st.st_mtime_ns)
+    with _latest_row_lock:
+        if _latest_row_cache.get("key") == key:
+            cached = _latest_row_cache.get("row")
+            return dict(cached) if cached is not None else None
+
+    row = None
+    with SENSOR_CSV.open("rb") as f:
+        header_line = f.readline()
+        if header_line.endswith(b"\n") and st.st_size > len(header_line):
+            last_line = _read_last_line(f, st.st_size, len(header_line))
+            if last_line:
+                header = next(csv.reader([header_line.decode("utf-8", errors="replace")]), [])
+                row = next(csv.DictReader([last_line.decode("utf-8", errors="replace")], fieldnames=header), None)
+
+    with _latest_row_lock:
+        _latest_row_cache["key"] = key
+        _latest_row_cache["row"] = row
+    return dict(row) if row is not None else None
+
+
+def _json_default(value: Any) -> Any:
+    # NumPy scalars from the comfort model; anything else is shown as text.
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def write_shared_snapshot(snapshot: Dict[str, Any]) -> None:
+    """Atomically replace ``SHARED_SNAPSHOT_PATH`` with ``snapshot`` as JSON."""
+    tmp = SHARED_SNAPSHOT_PATH.with_suffix(".tmp")
+    with tmp.open("w") as f:
+        json.dump(snapshot, f, default=_json_default)
+    os.replace(tmp, SHARED_SNAPSHOT_PATH)
+
+
+def shared_snapshot_version() -> int:
+    """Modification time (ns) of the shared snapshot, or 0 when ingestd has not written one."""
+    try:
+        return SHARED_SNAPSHOT_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+class SharedSnapshotWatcher:
+    """Turns changes of the shared snapshot file into a condition-variable wakeup.
+
+    There is no portable cross-process notification in the standard library, so
+    one daemon thread per process does the polling (a single ``stat`` every
+    ``poll_s``) and every session waits on ``changed`` instead.
+    """
+
+    def __init__(self, poll_s: float = SHARED_SNAPSHOT_POLL_S) -> None:
+        self.poll_s = poll_s
+        self.version = shared_snapshot_version()
+        self.changed = threading.Condition(threading.Lock())
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def wait(self, last_version: int, timeout: float | None = None) -> int:
+        """Block until the version differs from ``last_version`` or ``timeout`` passes; returns it."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != last_version, timeout)
+            return self.version
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            version = shared_snapshot_version()
+            if version != self.version:
+                with self.changed:
+                    self.version = version
+                    self.changed.notify_all()
+
+
+def get_shared_snapshot_watcher() -> SharedSnapshotWatcher:
+    """Return the process-wide watcher of ``SHARED_SNAPSHOT_PATH``."""
+    global _shared_snapshot_watcher
+    with _metrics_writer_lock:
+        if _shared_snapshot_watcher is None:
+            _shared_snapshot_watcher = SharedSnapshotWatcher()
+        return _shared_snapshot_watcher
+
+
+def wait_for_shared_snapshot(last_version: int, timeout: float | None = None) -> int:
+    """Block until ingestd publishes a new snapshot or ``timeout`` passes; returns its version."""
+    return get_shared_snapshot_watcher().wait(last_version, timeout)
+
+
+def read_shared_snapshot() -> FrozenDict:
+    """Return the snapshot last published by ingestd (empty if none), cached on its mtime."""
+    version = shared_snapshot_version()
+    key = (str(SHARED_SNAPSHOT_PATH), version)
+    if _shared_snapshot_cache.get("key") == key:
+        return _shared_snapshot_cache["snapshot"]
+    try:
+        with SHARED_SNAPSHOT_PATH.open("r") as f:
+            snapshot = freeze(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        snapshot = FrozenDict()
+    _shared_snapshot_cache.update(key=key, snapshot=snapshot)
+    return snapshot
+
+
+def get_metrics_store() -> ColumnarMetricsStore | SqliteMetricsStore:
+    """Return the process-wide store for the non-CSV ``METRICS_BACKEND``."""
+    global _metrics_store
+    with _metrics_writer_lock:
+        if _metrics_store is None:
+            if METRICS_BACKEND == "columnar":
+                _metrics_store = ColumnarMetricsStore(COLUMNAR_ROOT)
+            elif METRICS_BACKEND == "sqlite":
+                _metrics_store = SqliteMetricsStore(SQLITE_PATH)
+            else:
+                raise ValueError(f"Unknown METRICS_BACKEND {METRICS_BACKEND!r}")
+            atexit.register(_metrics_store.close)
+        return _metrics_store
+
+
+def get_rollup_engine() -> RollupEngine:
+    """Return the process-wide rollup engine; it also prunes the raw columnar/SQLite store."""
+    global _rollup_engine
+    with _metrics_writer_lock:
+        engine = _rollup_engine
+    if engine is None:
+        # The CSV backend has no raw retention; ingestd says so once at startup.
+        raw = None if METRICS_BACKEND == "csv" else get_metrics_store()
+        with _metrics_writer_lock:
+            if _rollup_engine is None:
+                _rollup_engine = RollupEngine(ROLLUP_ROOT, raw_store=raw)
+                atexit.register(_rollup_engine.close)
+            engine = _rollup_engine
+    return engine
+
+
+def get_weather_history() -> WeatherHistory:
+    """Return the process-wide weather series (one row per Buienradar reading)."""
+    global _weather_history
+    with _metrics_writer_lock:
+        if _weather_history is None:
+            _weather_history = WeatherHistory(WEATHER_ROOT)
+            atexit.register(_weather_history.close)
+        return _weather_history
+
+
+def persist_snapshot(snapshot: Dict[str, Any]) -> None:
+    """Persist one snapshot to the configured ``METRICS_BACKEND``.
+
+    On the columnar backend the weather summary is recorded separately and only
+    when its measured time is new, so a 10 Hz indoor feed adds one weather row
+    per Buienradar update.
+    """
+    if METRICS_BACKEND == "columnar":
+        get_weather_history().record(snapshot.get("weather"))
+    if METRICS_BACKEND == "csv":
+        append_snapshot_to_csv(snapshot)
+        return
+    row = snapshot_to_row(snapshot)
+    if row.get("timestamp"):
+        get_metrics_store().append(row)
+
+
+def read_metrics_range(start: Any = None, end: Any = None, columns: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+    """Return ``{column: array}`` for persisted rows with ``start <= timestamp < end``.
+
+    Array types follow ``columnar_store.METRICS_SCHEMA``. The columnar backend
+    attaches weather columns at query time with an as-of join on the weather
+    series. The CSV backend has no index, so it falls back to a full parse of
+    ``SENSOR_CSV``.
+    """
+    if METRICS_BACKEND == "columnar":
+        wanted = list(columns or METRICS_HEADERS)
+        indoor = [c for c in wanted if c not in WEATHER_COLUMNS]
+        data = get_metrics_store().read_range(start, end, indoor or ["timestamp"])
+        weather = [c for c in wanted if c in WEATHER_COLUMNS]
+        if weather:
+            data.update(get_weather_history().attach(data["timestamp"], weather))
+        return data
+    if METRICS_BACKEND != "csv":
+        return get_metrics_store().read_range(start, end, columns)
+
+    wanted = ["timestamp"] + [c for c in (columns or METRICS_HEADERS) if c != "timestamp"]
+    start_ts, end_ts = to_epoch(start), to_epoch(end)
+    values: Dict[str, List[Any]] = {c: [] for c in wanted}
+    if SENSOR_CSV.exists():
+        with SENSOR_CSV.open("r", newline="") as f:
+            for row in csv.DictReader(f):
+                ts = to_epoch(row.get("timestamp"))
+                if ts is None or (start_ts is not None and ts < start_ts) or (end_ts is not None and ts >= end_ts):
+                    continue
+                for c in wanted:
+                    values[c].append(row.get(c))
+
+    # Category columns have no code table in the CSV, so they come back as strings.
+    return {
+        c: np.array(values[c], dtype=object) if METRICS_SCHEMA[c] == "category" else encode_values(METRICS_SCHEMA[c], values[c])
+        for c in wanted
+    }
+
+
+def read_history(
+    start: Any = None,
+    end: Any = None,
+    columns: Optional[Iterable[str]] = None,
+    points: int = HISTORY_POINTS,
+) -> tuple[str, Dict[str, np.ndarray]]:
+    """Range read that picks the coarsest rollup tier still giving ``points`` buckets.
+
+    Returns ``(tier, data)``: ``tier`` is ``"raw"`` or a ``rollups.TIERS`` name,
+    and rollup columns carry the bucket means under the plain metric names.
+    On the columnar backend weather-only reads return the stored weather series
+    itself (``tier`` is ``"weather"``) and mixed reads attach weather to the
+    indoor timestamps. The CSV and SQLite backends keep weather in their own
+    rows, so any read that includes it is answered raw.
+    """
+    engine = get_rollup_engine()
+    columns = [c for c in (columns or engine.metrics) if c != "timestamp"]
+    indoor = [c for c in columns if c not in WEATHER_COLUMNS]
+    weather = [c for c in columns if c in WEATHER_COLUMNS]
+    weather_series = METRICS_BACKEND == "columnar"
+    if not indoor and weather_series:
+        return "weather", get_weather_history().read_range(start, end, weather)
+    rolled = indoor if weather_series else columns
+    tier = engine.pick_tier(start, end, points) if indoor and all(c in engine.metrics for c in rolled) else None
+    if tier is None:
+        return "raw", read_metrics_range(start, end, columns)
+    means = engine.read(tier, start, end, indoor, stats=("mean",))
+    data = {"timestamp": means["timestamp"], **{c: means[f"{c}_mean"] for c in indoor}}
+    if weather:
+        data.update(get_weather_history().attach(data["timestamp"], weather))
+    return tier, data
 
 
 def format_ts(ts: float | None) -> str:
@@ -1,14 +1,15 @@
-"""Streamlit launcher that wires together MQTT state, Live Metrics, and the LLM page."""
+"""Streamlit launcher for Live Metrics, History and the LLM page.
+
+The dashboard is a pure reader: ingestd runs MQTT, comfort, weather and
+persistence, and shares its live state through ``state.read_shared_snapshot``.
+"""
 from __future__ import annotations
 
 import sys
-import time
 from pathlib import Path
 
 import streamlit as st
 
-from mqtt_monitor import HOST, ensure_host_resolvable
-
 # Allow running via `streamlit run streamlit_app.py` without installing as a package.
 PKG_ROOT = Path(__file__).resolve().parent
 REPO_ROOT = PKG_ROOT.parent
@@ -16,12 +17,17 @@ for entry in (PKG_ROOT, REPO_ROOT):
     if str(entry) not in sys.path:
         sys.path.append(str(entry))
 
-from mqtt_service import ensure_mqtt_thread  # noqa: E402
-from weather_service import ensure_weather_thread  # noqa: E402
+from uicomponents.history import render_history  # noqa: E402
 from uicomponents.live_metrics import render_live_metrics  # noqa: E402
 from uicomponents.llm_assistant import render_llm_assistant  # noqa: E402
 from uicomponents.multi_user_comfort import render_multi_user_comfort  # noqa: E402
-from state import append_snapshot_to_csv, format_ts, get_snapshot  # noqa: E402
+from state import METRICS_BACKEND, format_ts, read_shared_snapshot, wait_for_shared_snapshot  # noqa: E402
+
+# Upper bound on how long the render loop blocks without touching the page;
+# Streamlit only notices reruns (navigation, button clicks) on the next write.
+IDLE_HEARTBEAT_S = 1.0
+# Redraw interval while the LLM page waits for a background answer.
+LLM_POLL_S = 0.2
 
 
 def main():
@@ -29,17 +35,15 @@ def main():
     st.title("Thermal Grace - Perceived Thermal Comfort App")
     st.caption("Comfort-as-a-Service: Live view of CO₂ and mmWave sensor data via MQTT")
 
-    page = st.sidebar.radio("Navigation", ["Live Metrics", "Adaptive Multi-User", "LLM Assistant"], index=0)
+    page = st.sidebar.radio("Navigation", ["Live Metrics", "History", "Adaptive Multi-User", "LLM Assistant"], index=0)
 
-    if not ensure_host_resolvable(HOST):
-        st.error(f"Cannot resolve MQTT host {HOST}")
+    if page == "History":
+        # Historical charts do not follow live updates; widget changes rerun the script.
+        render_history()
         return
 
-    ensure_mqtt_thread(st.session_state)
-    ensure_weather_thread(st.session_state)
-
     status_placeholder = st.empty()
-    table_placeholder = raw_placeholder = None
+    table_placeholder = raw_placeholder = trend_placeholder = None
     sensor_box = user_box = llm_status = llm_output = None
     question = ""
     ask_button = False
@@ -47,6 +51,7 @@ def main():
     multi_user_placeholder = None
     if page == "Live Metrics":
         table_placeholder = st.empty()
+        trend_placeholder = st.empty()
         raw_placeholder = st.expander("Last raw payload", expanded=False)
     elif page == "Adaptive Multi-User":
         multi_user_placeholder = st.empty()
@@ -64,27 +69,35 @@ def main():
         llm_status = st.empty()
         llm_output = st.empty()
 
-    # Simple heartbeat loop; Streamlit reruns the script so we poll state and render.
+    # Redraw only when ingestd publishes a new snapshot; idle waits just refresh the status line.
+    version = -1
+    status_line = ""
+    llm_pending = False
     while True:
-        snapshot = get_snapshot()
-
-        status = snapshot.get("status", "unknown")
+        new_version = wait_for_shared_snapshot(version, timeout=LLM_POLL_S if llm_pending else IDLE_HEARTBEAT_S)
+        if new_version == version and not llm_pending:
+            status_placeholder.write(status_line)
+            continue
+        version = new_version
+        snapshot = read_shared_snapshot()
+
+        status = snapshot.get("status", "waiting for ingestd")
         last_updated = format_ts(snapshot.get("last_updated"))
-        status_placeholder.write(f"Status: `{status}` · Last update: `{last_updated}`")
-
-        # Persist to CSV only when we observe a new MQTT message.
-        if snapshot.get("last_updated") and st.session_state.get("last_write_ts") != snapshot.get("last_updated"):
-            append_snapshot_to_csv(snapshot)
-            st.session_state["last_write_ts"] = snapshot.get("last_updated")
-
+        status_line = f"Status: `{status}` · Last update: `{last_updated}`"
+        backend = snapshot.get("metrics_backend")
+        if backend and backend != METRICS_BACKEND:
+            status_line += (
+                f" · ingestd writes `{backend}` but this dashboard reads `{METRICS_BACKEND}` (THERMAL_GRACE_BACKEND)"
+            )
+        status_placeholder.write(status_line)
+
+        # Ingestion and persistence live in ingestd; the dashboard only reads its snapshot and the store.
         if page == "Live Metrics":
-            render_live_metrics(snapshot, table_placeholder, raw_placeholder)
+            render_live_metrics(snapshot, table_placeholder, raw_placeholder, trend_placeholder)
         elif page == "Adaptive Multi-User":
             render_multi_user_comfort(snapshot, multi_user_placeholder)
         else:
-            render_llm_assistant(question, ask_button, sensor_box, user_box, llm_status, llm_output)
-
-        time.sleep(1)
+            llm_pending = render_llm_assistant(question, ask_button, sensor_box, user_box, llm_status, llm_output)
 
 
 if __name__ == "__main__":
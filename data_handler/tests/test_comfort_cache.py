@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+from thermal_comfort_model import comfort_calc
+from thermal_comfort_model.comfort_calc import (
+    ComfortCache,
+    EnvReading,
+    UserContext,
+    compute_comfort,
+    configure_comfort_cache,
+    get_multi_user_results,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(comfort_calc, "comfort_cache", ComfortCache())
+
+
+def _user(uid, activity="sitting relaxed"):
+    return UserContext(uid=uid, activity=activity, main_task="", clothing_upper="t-shirt", clothing_lower="jeans")
+
+
+def test_jitter_within_resolution_hits_cache():
+    first = compute_comfort(EnvReading(tdb=25.00, tr=25.00, rh=50.0), _user("a"))
+    second = compute_comfort(EnvReading(tdb=25.01, tr=25.01, rh=50.1), _user("a"))
+    assert first == second
+    assert comfort_calc.comfort_cache.info()["hits"] == 1
+    assert comfort_calc.comfort_cache.info()["misses"] == 1
+
+
+def test_multi_user_shares_cache_with_single_user():
+    env = EnvReading(tdb=24.0, tr=24.0, rh=45.0)
+    compute_comfort(env, _user("a"))
+    rows = get_multi_user_results(env, {"a": _user("a"), "b": _user("b"), "c": _user("c", "standing")})
+    info = comfort_calc.comfort_cache.info()
+    assert info["misses"] == 2  # one per distinct (met, clo) combination
+    assert info["hits"] == 1  # users sharing inputs are looked up once
+    assert rows[0]["PMV"] == rows[1]["PMV"]
+
+
+def test_cache_is_bounded_lru():
+    cache = ComfortCache(maxsize=2)
+    k1, k2, k3 = (cache.key(t, t, 50, 0.1, 1.0, 0.5) for t in (20, 21, 22))
+    cache.put(k1, {"pmv": 1})
+    cache.put(k2, {"pmv": 2})
+    assert cache.get(k1) == {"pmv": 1}
+    cache.put(k3, {"pmv": 3})
+    assert cache.get(k2) is None
+    assert cache.info()["size"] == 2
+
+
+def test_configure_comfort_cache_changes_resolution():
+    configure_comfort_cache(maxsize=10, tdb=0.5, tr=0.5)
+    env_a = EnvReading(tdb=25.0, tr=25.0, rh=50.0)
+    env_b = EnvReading(tdb=25.2, tr=25.2, rh=50.0)
+    assert compute_comfort(env_a, None) == compute_comfort(env_b, None)
+    assert comfort_calc.comfort_cache.maxsize == 10
+    with pytest.raises(ValueError):
+        configure_comfort_cache(humidity=1.0)
+
+
+def test_batch_results_match_scalar_path():
+    env = EnvReading(tdb=22.3, tr=22.3, rh=41.0, v=0.6)
+    users = {
+        "a": _user("a", "sitting relaxed"),
+        "b": UserContext("b", "walking slowly", "", "thick sweater", "warm trousers"),
+        "c": UserContext("c", "standing", "", "long-sleeve shirt", "shorts"),
+        "d": _user("d", "sitting relaxed"),
+    }
+    batch = get_multi_user_results(env, users)
+    assert comfort_calc.comfort_cache.info()["misses"] == 3
+
+    comfort_calc.comfort_cache.clear()
+    for row in batch:
+        single = compute_comfort(env, users[row["User ID"]])
+        for batch_val, single_val in zip((row["PMV"], row["PPD (%)"], row["UTCI (C)"]), (single["pmv"], single["ppd"], single["utci"])):
+            assert batch_val == single_val or (math.isnan(batch_val) and math.isnan(single_val))
+        assert (row["MET"], row["CLO"]) == (single["met"], single["clo"])
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from device_state import DeviceRegistry, parse_device_topic
+
+
+def test_parse_device_topic():
+    assert parse_device_topic("sensors/pico/air_mmwave") == ("pico", "air_mmwave")
+    assert parse_device_topic("sensors/kitchen-2/mtp40f/co2") == ("kitchen-2", "co2")
+    assert parse_device_topic("sensors/pico/unknown") is None
+    assert parse_device_topic("other/pico/air_mmwave") is None
+
+
+def test_room_aggregates():
+    registry = DeviceRegistry()
+    registry.update("a", room="office", comfort={"pmv": 0.5})
+    registry.update("b", room="office", comfort={"pmv": -0.5})
+    registry.update("c", room="lab", comfort={"pmv": 1.0})
+    registry.update("d", room="lab")  # no comfort yet, ignored
+
+    assert registry.aggregate("comfort", "pmv") == {"office": 0.0, "lab": 1.0}
+    assert registry.overall("comfort", "pmv") == pytest.approx(0.5)
+    assert registry.aggregate("comfort", "pmv", reducer=max) == {"office": 0.5, "lab": 1.0}
+    assert sorted(registry.rooms()["lab"]) == ["c", "d"]
+
+
+def test_updates_merge_and_keep_room():
+    registry = DeviceRegistry()
+    registry.update("a", room="office", co2_ppm=500)
+    snap = registry.update("a", environment={"temperature_c": 21.0})
+    assert snap["room"] == "office"
+    assert snap["co2_ppm"] == 500
+    with pytest.raises(TypeError):
+        snap["environment"]["temperature_c"] = 0
+
+
+def test_explicit_none_clears_a_stale_reading():
+    registry = DeviceRegistry()
+    registry.update("a", room="office", environment={"temperature_c": 21.0})
+    snap = registry.update("a", environment=None)  # failed BME680 read
+    assert snap["environment"] is None
+    assert snap["room"] == "office"
+
+
+def test_memory_is_bounded():
+    registry = DeviceRegistry(max_devices=3, history=5)
+    for i in range(10):
+        registry.update("a", co2_ppm=400 + i)
+    assert len(registry.history_of("a")) == 5
+    assert registry.history_of("a")[-1][1]["co2_ppm"] == 409
+
+    for name in "bcd":
+        registry.update(name, co2_ppm=1)
+    assert len(registry.devices()) == 3
+    assert registry.get("a") is None  # least recently updated
+
+
+def test_concurrent_devices():
+    registry = DeviceRegistry()
+
+    def feed(device_id):
+        for i in range(500):
+            registry.update(device_id, co2_ppm=i)
+
+    threads = [threading.Thread(target=feed, args=(f"pico-{n}",)) for n in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(registry.devices()) == 16
+    assert all(s["co2_ppm"] == 499 for s in registry.devices().values())
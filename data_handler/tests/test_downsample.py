@@ -0,0 +1,33 @@
+import time
+
+import numpy as np
+
+from downsample import lttb
+
+
+def test_short_series_unchanged_and_nan_dropped():
+    x, y = lttb([0, 1, 2, 3], [1.0, np.nan, 3.0, 4.0], 10)
+    assert list(x) == [0, 2, 3]
+    assert list(y) == [1.0, 3.0, 4.0]
+
+
+def test_keeps_endpoints_and_spikes():
+    x = np.arange(10_000, dtype="f8")
+    y = np.zeros_like(x)
+    y[1234] = 50.0
+    y[8765] = -50.0
+    dx, dy = lttb(x, y, 100)
+    assert len(dx) == 100
+    assert dx[0] == 0 and dx[-1] == 9999
+    assert np.all(np.diff(dx) > 0)
+    assert 1234 in dx and 8765 in dx
+
+
+def test_month_of_one_hertz_data_is_fast():
+    n = 30 * 24 * 3600
+    x = np.arange(n, dtype="f8")
+    y = np.sin(x / 5000.0)
+    t0 = time.perf_counter()
+    dx, _ = lttb(x, y, 2000)
+    assert len(dx) == 2000
+    assert time.perf_counter() - t0 < 1.0
@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+import pytest
+from pythermalcomfort.models import pmv_ppd_iso
+
+from thermal_comfort_model import comfort_calc
+from thermal_comfort_model.comfort_calc import (
+    ComfortCache,
+    EnvReading,
+    FastComfortModel,
+    UserContext,
+    compute_comfort,
+    get_multi_user_results,
+)
+
+
+@pytest.fixture(scope="module")
+def model(tmp_path_factory):
+    return FastComfortModel(grid_dir=tmp_path_factory.mktemp("grid"))
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch, model):
+    monkeypatch.setattr(comfort_calc, "comfort_cache", ComfortCache())
+    monkeypatch.setattr(comfort_calc, "fast_comfort_model", model)
+
+
+def test_interpolation_within_documented_bound(model):
+    rng = np.random.default_rng(0)
+    n = 5000
+    tdb = rng.uniform(10, 30, n)
+    rh = rng.uniform(0, 100, n)
+    v = rng.uniform(0, 1, n)
+    met = rng.uniform(0.8, 2.6, n)
+    clo = rng.uniform(0, 2, n)
+    exact = np.asarray(
+        pmv_ppd_iso(tdb=tdb, tr=tdb, vr=v, rh=rh, met=met, clo=clo, model="7730-2005",
+                    limit_inputs=False, round_output=False).pmv
+    )
+    fast = model.pmv(tdb, tdb, rh, v, met, clo)
+    usable = np.abs(exact) <= 3
+    assert np.abs(fast - exact)[usable].max() <= FastComfortModel.MAX_PMV_ERROR
+
+
+def test_grid_is_saved_and_reused(model):
+    model.pmv(22, 22, 50, 0.1, 1.2, 0.6)
+    assert model.grid_path.exists()
+    reloaded = FastComfortModel(grid_dir=model.grid_dir)
+    assert reloaded.pmv(22, 22, 50, 0.1, 1.2, 0.6) == pytest.approx(model.pmv(22, 22, 50, 0.1, 1.2, 0.6))
+
+
+def test_outside_grid_is_nan(model):
+    values = model.pmv([35, 22, 22], [35, 22, 25], 50, 0.1, 1.2, 0.6)
+    assert math.isnan(values[0]) and math.isnan(values[2])
+    assert not math.isnan(values[1])
+
+
+def test_fast_mode_close_to_exact_and_falls_back():
+    user = UserContext(uid="a", activity="sitting and typing/talking", main_task="", clothing_upper="t-shirt", clothing_lower="jeans")
+    env = EnvReading(tdb=23.4, tr=23.4, rh=42.0)
+    exact = compute_comfort(env, user)
+    fast = compute_comfort(env, user, mode="fast")
+    assert abs(fast["pmv"] - exact["pmv"]) <= FastComfortModel.MAX_PMV_ERROR
+    assert abs(fast["ppd"] - exact["ppd"]) <= 5
+
+    # Radiant temperature off the grid's tr == tdb plane: exact model answers.
+    sunny = EnvReading(tdb=22.0, tr=26.0, rh=42.0)
+    assert compute_comfort(sunny, user, mode="fast")["pmv"] == compute_comfort(sunny, user)["pmv"]
+
+
+def test_multi_user_fast_mode():
+    users = {
+        uid: UserContext(uid=uid, activity=act, main_task="", clothing_upper="sweater", clothing_lower="trousers")
+        for uid, act in [("a", "sitting relaxed"), ("b", "walking slowly")]
+    }
+    env = EnvReading(tdb=21.0, tr=21.0, rh=55.0)
+    exact = get_multi_user_results(env, users)
+    fast = get_multi_user_results(env, users, mode="fast")
+    for e, f in zip(exact, fast):
+        assert abs(e["PMV"] - f["PMV"]) <= FastComfortModel.MAX_PMV_ERROR
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        compute_comfort(EnvReading(tdb=22, tr=22, rh=50), None, mode="approx")
+
+
+def test_cold_grid_builds_in_background_and_falls_back_to_exact(tmp_path, monkeypatch):
+    cold = FastComfortModel(grid_dir=tmp_path)
+    monkeypatch.setattr(comfort_calc, "fast_comfort_model", cold)
+    user = UserContext(uid="a", activity="sitting relaxed", main_task="", clothing_upper="sweater", clothing_lower="jeans")
+    env = EnvReading(tdb=21.5, tr=21.5, rh=48.0)
+
+    assert math.isnan(cold.pmv(22, 22, 50, 0.1, 1.2, 0.6, wait=False))
+    assert compute_comfort(env, user, mode="fast")["pmv"] == compute_comfort(env, user)["pmv"]
+
+    cold._builder.join()
+    assert cold.grid_path.exists()
+    assert not list(tmp_path.glob("*.tmp.npy"))
+    assert not math.isnan(cold.pmv(22, 22, 50, 0.1, 1.2, 0.6, wait=False))
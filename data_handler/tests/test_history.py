@@ -0,0 +1,22 @@
+import numpy as np
+
+from columnar_store import INT_MISSING
+from uicomponents import history
+
+
+def test_load_series_treats_integer_gaps_as_missing(monkeypatch):
+    ts = np.arange(100, dtype="f8")
+    co2 = np.where(ts < 50, INT_MISSING, 700).astype("i4")
+    calls = []
+
+    def fake_read_history(start, end, columns, points):
+        calls.append(columns)
+        return "raw", {"timestamp": ts, "co2_ppm": co2, "pmv": np.full(100, 0.5, dtype="f4")}
+
+    monkeypatch.setattr(history, "read_history", fake_read_history)
+    frames = history.load_series.__wrapped__(("co2_ppm", "pmv"), 3600, 1700000000)
+
+    assert calls == [["co2_ppm", "pmv"]]
+    assert len(frames["co2_ppm"]) == 50
+    assert frames["co2_ppm"]["co2_ppm"].min() == 700
+    assert len(frames["pmv"]) == 100
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import ingestd
+import state
+from device_state import DeviceRegistry
+from weather_history import WeatherHistory
+
+
+def test_persist_loop_writes_each_device_update_once(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.csv"
+    monkeypatch.setattr(state, "SENSOR_CSV", path)
+    monkeypatch.setattr(state, "METRICS_BACKEND", "csv")
+    monkeypatch.setattr(state, "_metrics_writer", None)
+    monkeypatch.setattr(state, "_weather_history", WeatherHistory(tmp_path / "weather"))
+    monkeypatch.setattr(ingestd, "PERSIST_POLL_S", 0.01)
+    registry = DeviceRegistry()
+
+    stop = threading.Event()
+    t = threading.Thread(target=ingestd.persist_loop, args=(stop, None, registry))
+    t.start()
+    try:
+        registry.update("pico", room="office", co2_ppm=700)
+        time.sleep(0.1)
+        registry.update("pico-2", room="lab", co2_ppm=900)
+        time.sleep(0.1)
+        registry.update("pico", co2_ppm=710)
+        time.sleep(0.1)
+    finally:
+        stop.set()
+        t.join(5)
+        state.close_metrics_writer()
+
+    rows = [line.split(",") for line in path.read_text().splitlines()]
+    header, rows = rows[0], rows[1:]
+    assert len(rows) == 3  # one row per device update, despite many polls
+    device, room, co2 = header.index("device_id"), header.index("room"), header.index("co2_ppm")
+    assert [(r[device], r[room], r[co2]) for r in rows] == [
+        ("pico", "office", "700"),
+        ("pico-2", "lab", "900"),
+        ("pico", "office", "710"),
+    ]
+
+
+def test_publish_loop_shares_the_live_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(state, "SHARED_SNAPSHOT_PATH", tmp_path / "live_snapshot.json")
+    monkeypatch.setattr(state, "SHARED_SNAPSHOT_INTERVAL_S", 0.01)
+    monkeypatch.setattr(ingestd, "PERSIST_POLL_S", 0.01)
+
+    stop = threading.Event()
+    t = threading.Thread(target=ingestd.publish_loop, args=(stop,))
+    t.start()
+    try:
+        state.update_state(co2_ppm=654)
+        deadline = time.monotonic() + 5
+        while state.read_shared_snapshot().get("co2_ppm") != 654 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        stop.set()
+        t.join(5)
+    assert state.read_shared_snapshot()["co2_ppm"] == 654
+
+
+def test_persist_loop_writes_rows_in_timestamp_order(monkeypatch):
+    written = []
+    monkeypatch.setattr(state, "persist_snapshot", lambda snap: written.append(snap["device_id"]))
+    monkeypatch.setattr(ingestd, "PERSIST_POLL_S", 0.01)
+    stop = threading.Event()
+
+    class Registry:
+        version = 0
+
+        def wait_for_update(self, last_version, timeout=None):
+            stop.set()  # one wake is enough
+            return 1
+
+        def devices(self):
+            # Insertion order differs from timestamp order.
+            return {"b": {"device_id": "b", "last_updated": 20.0}, "a": {"device_id": "a", "last_updated": 10.0}}
+
+    ingestd.persist_loop(stop, None, Registry())
+    assert written == ["a", "b"]
@@ -0,0 +1,178 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from data_handler import llm_utils
+
+
+class _ChatStub(BaseHTTPRequestHandler):
+    """Minimal stand-in for the chat completions endpoint."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.calls.append((self.client_address, body))
+        if self.server.release is not None:
+            self.server.release.wait(5)
+        if self.server.status != 200:
+            self.send_response(self.server.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        answer = json.dumps({"choices": [{"message": {"content": "echo: " + body["messages"][-1]["content"]}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(answer)))
+        self.end_headers()
+        self.wfile.write(answer)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatStub)
+    server.calls = []
+    server.status = 200
+    server.release = None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(llm_utils, "_response_cache", {})
+    monkeypatch.setattr(llm_utils, "_inflight", {})
+    monkeypatch.setattr(llm_utils, "_session", None)
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/chat/completions"
+    server.shutdown()
+    server.server_close()
+
+
+def test_background_call_and_cache(stub):
+    server, url = stub
+    first = llm_utils.submit_llm_request("hello", "token", url)
+    assert first.result(5) == "echo: hello"
+    again = llm_utils.submit_llm_request("hello", "token", url)
+    assert again.done() and again.result() == "echo: hello"
+    assert len(server.calls) == 1
+
+    assert llm_utils.submit_llm_request("other", "token", url).result(5) == "echo: other"
+    assert len(server.calls) == 2
+    # Both requests went over the same pooled keep-alive connection.
+    assert server.calls[0][0] == server.calls[1][0]
+
+
+def test_cache_expires(stub, monkeypatch):
+    server, url = stub
+    monkeypatch.setattr(llm_utils, "LLM_CACHE_TTL_S", 0)
+    llm_utils.submit_llm_request("hello", "token", url).result(5)
+    llm_utils.submit_llm_request("hello", "token", url).result(5)
+    assert len(server.calls) == 2
+
+
+def test_identical_inflight_requests_share_one_call(stub):
+    server, url = stub
+    server.release = threading.Event()
+    a = llm_utils.submit_llm_request("slow", "token", url)
+    b = llm_utils.submit_llm_request("slow", "token", url)
+    assert a is b and not a.done()
+    server.release.set()
+    assert a.result(5) == "echo: slow"
+    assert len(server.calls) == 1
+
+
+def test_failures_are_not_cached(stub):
+    server, url = stub
+    server.status = 500
+    failed = llm_utils.submit_llm_request("boom", "token", url)
+    assert failed.exception(5) is not None
+    server.status = 200
+    assert llm_utils.submit_llm_request("boom", "token", url).result(5) == "echo: boom"
+    assert len(server.calls) == 2
+
+
+class _StreamStub(BaseHTTPRequestHandler):
+    """Chat completions stand-in that answers in chunked SSE, pausing mid-stream."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.calls.append(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(data):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def event(text):
+            send(f"data: {json.dumps({'choices': [{'index': 0, 'delta': {'content': text}}]})}\n\n".encode())
+
+        send(b": keep-alive\n\n")
+        send(b'data: {"choices": [], "usage": null}\n\n')
+        event("Hel")
+        event("lo")
+        self.server.release.wait(5)
+        event(" world")
+        send(b"data: [DONE]\n\n")
+        send(b"")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def sse_stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StreamStub)
+    server.calls = []
+    server.release = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(llm_utils, "_response_cache", {})
+    monkeypatch.setattr(llm_utils, "_inflight", {})
+    monkeypatch.setattr(llm_utils, "_session", None)
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/chat/completions"
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_iter_sse_deltas_stops_at_done():
+    lines = [
+        ": comment",
+        "",
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+        'data: {"choices": [{"delta": {"content": "a"}}]}',
+        "data: [DONE]",
+        'data: {"choices": [{"delta": {"content": "ignored"}}]}',
+    ]
+    assert list(llm_utils.iter_sse_deltas(lines)) == ["a"]
+
+
+def test_streaming_job_exposes_partial_text(sse_stub):
+    server, url = sse_stub
+    job = llm_utils.submit_llm_request("hi", "token", url, stream=True)
+    for _ in range(500):
+        if job.partial == "Hello":
+            break
+        threading.Event().wait(0.01)
+    assert job.partial == "Hello"
+    assert not job.done()
+
+    server.release.set()
+    assert job.result(5) == "Hello world"
+    assert server.calls[0]["stream"] is True
+    # The streamed answer is cached like a regular one.
+    assert llm_utils.submit_llm_request("hi", "token", url, stream=True).result() == "Hello world"
+    assert len(server.calls) == 1
+
+
+def test_call_github_llm_stream_callback(sse_stub):
+    server, url = sse_stub
+    server.release.set()
+    deltas = []
+    assert llm_utils.call_github_llm("hi", token="token", url=url, stream=True, on_delta=deltas.append) == "Hello world"
+    assert deltas == ["Hel", "lo", " world"]
@@ -0,0 +1,149 @@
+import threading
+
+import mqtt_service
+
+
+def test_ensure_mqtt_thread_is_process_wide(monkeypatch):
+    started = []
+    running = threading.Event()
+    release = threading.Event()
+
+    def fake_loop(stop_event):
+        started.append(threading.current_thread())
+        running.set()
+        release.wait(5)
+
+    monkeypatch.setattr(mqtt_service, "_mqtt_loop", fake_loop)
+    monkeypatch.setattr(mqtt_service, "_mqtt_thread", None)
+
+    sessions = [{} for _ in range(8)]
+    workers = [threading.Thread(target=mqtt_service.ensure_mqtt_thread, args=(s,)) for s in sessions]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    try:
+        assert running.wait(5)
+        assert len({id(s["mqtt_thread"]) for s in sessions}) == 1
+        assert len(started) == 1
+    finally:
+        release.set()
+        sessions[0]["mqtt_thread"].join(5)
+        monkeypatch.setattr(mqtt_service, "_mqtt_thread", None)
+
+
+def test_comfort_worker_coalesces_to_latest(monkeypatch):
+    from thermal_comfort_model.comfort_calc import EnvReading
+
+    gate = threading.Event()
+    computed = []
+    done = threading.Event()
+
+    def slow_compute(env, user):
+        gate.wait(5)
+        computed.append(env.tdb)
+        return {"pmv": env.tdb}
+
+    updates = []
+
+    def record_update(**kw):
+        # The worker publishes after counting the reading as processed, so this is the last step.
+        updates.append(kw)
+        if kw.get("comfort") == {"pmv": 24.0}:
+            done.set()
+
+    monkeypatch.setattr(mqtt_service, "compute_comfort", slow_compute)
+    monkeypatch.setattr(mqtt_service, "latest_user_context", lambda: None)
+    monkeypatch.setattr(mqtt_service, "update_state", record_update)
+
+    worker = mqtt_service.ComfortWorker()
+    worker.start()
+    worker.submit(EnvReading(tdb=20.0, tr=20.0, rh=50.0))
+    # Wait until the worker holds the first reading, then flood the slot.
+    for _ in range(100):
+        if worker.metrics()["queue_depth"] == 0:
+            break
+        threading.Event().wait(0.01)
+    for tdb in (21.0, 22.0, 23.0, 24.0):
+        worker.submit(EnvReading(tdb=tdb, tr=tdb, rh=50.0))
+    assert worker.metrics()["queue_depth"] == 1
+
+    gate.set()
+    assert done.wait(5)
+    assert computed == [20.0, 24.0]
+    metrics = worker.metrics()
+    assert metrics["submitted"] == 5
+    assert metrics["coalesced"] == 3
+    assert metrics["processed"] == 2
+    assert updates[-1]["comfort"] == {"pmv": 24.0}
+
+
+def test_on_message_does_not_compute_comfort_inline(monkeypatch):
+    submitted = []
+    updates = []
+    monkeypatch.setattr(mqtt_service, "VERBOSE_LOG", False)
+    monkeypatch.setattr(mqtt_service.comfort_worker, "submit", lambda env, device_id: submitted.append((env, device_id)))
+    monkeypatch.setattr(mqtt_service, "update_state", lambda **kw: updates.append(kw))
+
+    class Msg:
+        topic = "sensors/pico/air_mmwave"
+        payload = b'{"radar": {"target_count": 1}, "environment": {"temperature_c": 22.5, "humidity_pct": 40}}'
+
+    mqtt_service.on_message(None, None, Msg())
+    assert submitted[0][0].tdb == 22.5
+    assert submitted[0][1] == "pico"
+    assert "comfort" not in updates[0]
+
+
+def test_on_message_keeps_devices_apart(monkeypatch):
+    from device_state import DeviceRegistry
+
+    registry = DeviceRegistry()
+    monkeypatch.setattr(mqtt_service, "VERBOSE_LOG", False)
+    monkeypatch.setattr(mqtt_service, "devices", registry)
+    monkeypatch.setattr(mqtt_service.comfort_worker, "submit", lambda env, device_id: None)
+    monkeypatch.setattr(mqtt_service, "update_state", lambda **kw: None)
+
+    class Msg:
+        def __init__(self, topic, payload):
+            self.topic = topic
+            self.payload = payload
+
+    mqtt_service.on_message(None, None, Msg("sensors/pico-a/mtp40f/co2", b'{"co2_ppm": 600}'))
+    mqtt_service.on_message(None, None, Msg("sensors/pico-b/mtp40f/co2", b'{"co2_ppm": 900, "room": "lab"}'))
+    assert registry.get("pico-a")["co2_ppm"] == 600
+    assert registry.get("pico-b")["room"] == "lab"
+    assert registry.aggregate("co2_ppm") == {"default": 600.0, "lab": 900.0}
+
+
+def test_on_message_mirrors_only_the_primary_device(monkeypatch):
+    from device_state import DeviceRegistry
+
+    updates = []
+    monkeypatch.setattr(mqtt_service, "VERBOSE_LOG", False)
+    monkeypatch.setattr(mqtt_service, "devices", DeviceRegistry())
+    monkeypatch.setattr(mqtt_service, "PRIMARY_DEVICE", "pico")
+    monkeypatch.setattr(mqtt_service, "update_state", lambda **kw: updates.append(kw))
+
+    class Msg:
+        def __init__(self, topic, payload):
+            self.topic = topic
+            self.payload = payload
+
+    mqtt_service.on_message(None, None, Msg("sensors/kitchen/mtp40f/co2", b'{"co2_ppm": 900}'))
+    assert updates == []
+    mqtt_service.on_message(None, None, Msg("sensors/pico/mtp40f/co2", b'{"co2_ppm": 600}'))
+    assert [u["co2_ppm"] for u in updates] == [600]
+
+
+def test_comfort_worker_coalesces_per_device(monkeypatch):
+    from thermal_comfort_model.comfort_calc import EnvReading
+
+    worker = mqtt_service.ComfortWorker()  # not started: submissions stay pending
+    worker.submit(EnvReading(tdb=20.0, tr=20.0, rh=50.0), "a")
+    worker.submit(EnvReading(tdb=21.0, tr=21.0, rh=50.0), "b")
+    worker.submit(EnvReading(tdb=22.0, tr=22.0, rh=50.0), "a")
+    metrics = worker.metrics()
+    assert metrics["queue_depth"] == 2
+    assert metrics["coalesced"] == 1
@@ -0,0 +1,111 @@
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from rollups import RollupEngine
+
+T0 = datetime(2025, 12, 15, 10, 0).timestamp()
+
+
+def _engine(tmp_path, **kwargs):
+    return RollupEngine(tmp_path / "rollups", metrics=("co2_ppm", "pmv"), **kwargs)
+
+
+def test_tiers_aggregate_incrementally(tmp_path):
+    engine = _engine(tmp_path)
+    # Two hours at one row per 10 s; co2 ramps by one per row, pmv only every other row.
+    for i in range(720):
+        engine.add({"timestamp": T0 + 10 * i, "co2_ppm": 400 + i, "pmv": 0.5 if i % 2 == 0 else None})
+    engine.close()
+
+    minutes = engine.read("1min", metrics=["co2_ppm", "pmv"])
+    assert len(minutes["timestamp"]) == 120
+    assert list(minutes["co2_ppm_count"][:2]) == [6, 6]
+    assert list(minutes["pmv_count"][:2]) == [3, 3]
+    assert minutes["co2_ppm_min"][1] == 406
+    assert minutes["co2_ppm_max"][1] == 411
+    assert minutes["co2_ppm_mean"][1] == pytest.approx(408.5)
+    assert minutes["co2_ppm_last"][1] == 411
+
+    hours = engine.read("1h", stats=("count", "mean", "last"))
+    assert list(hours["timestamp"]) == [T0, T0 + 3600]
+    assert list(hours["co2_ppm_count"]) == [360, 360]
+    assert hours["co2_ppm_mean"][0] == pytest.approx(400 + 359 / 2)
+    assert hours["co2_ppm_last"][1] == 1119
+    assert "co2_ppm_min" not in hours
+
+    quarter = engine.read("15min", start=T0 + 3600, end=T0 + 7200)
+    assert len(quarter["timestamp"]) == 4
+    assert quarter["co2_ppm_count"].sum() == 360
+
+
+def test_flushed_partial_buckets_merge_on_read(tmp_path):
+    engine = _engine(tmp_path)
+    engine.add({"timestamp": T0 + 1, "co2_ppm": 500, "pmv": 1.0})
+    engine.flush()  # e.g. a restart mid-minute
+    engine.add({"timestamp": T0 + 2, "co2_ppm": 700})
+    engine.close()
+
+    for tier in ("1min", "15min", "1h"):
+        data = engine.read(tier)
+        assert list(data["timestamp"]) == [T0]
+        assert data["co2_ppm_count"][0] == 2
+        assert data["co2_ppm_mean"][0] == 600
+        assert data["co2_ppm_min"][0] == 500 and data["co2_ppm_max"][0] == 700
+        assert data["co2_ppm_last"][0] == 700
+        assert data["pmv_count"][0] == 1 and data["pmv_last"][0] == 1.0
+
+
+def test_pick_tier_prefers_coarsest_with_enough_points(tmp_path):
+    engine = _engine(tmp_path)
+    day = 24 * 3600
+    assert engine.pick_tier(0, 30 * day, 500) == "1h"
+    assert engine.pick_tier(0, 30 * day, 2000) == "15min"
+    assert engine.pick_tier(0, 2 * day, 2000) == "1min"
+    assert engine.pick_tier(0, 3600, 2000) is None
+
+
+def test_retention_drops_old_partitions(tmp_path):
+    engine = _engine(tmp_path, retention_days={"1min": 2, "1h": None})
+    for day in (10, 11, 12, 13):
+        engine.add({"timestamp": datetime(2025, 12, day, 12, 0).timestamp(), "co2_ppm": 400})
+    engine.close()
+
+    removed = engine.apply_retention(today=date(2025, 12, 13))
+    assert removed == {"1min": [date(2025, 12, 10)]}
+    assert engine.stores["1min"].partitions() == [date(2025, 12, 11), date(2025, 12, 12), date(2025, 12, 13)]
+    assert len(engine.stores["1h"].partitions()) == 4
+    assert np.all(engine.read("1min")["co2_ppm_count"] == 1)
+
+
+def test_retention_prunes_a_sqlite_raw_store(tmp_path):
+    from sqlite_store import SqliteMetricsStore
+
+    raw = SqliteMetricsStore(tmp_path / "metrics.sqlite3", batch_rows=1)
+    engine = _engine(tmp_path, retention_days={"raw": 2}, raw_store=raw)
+    for day in (10, 11, 12, 13):
+        raw.append({"timestamp": datetime(2025, 12, day, 12, 0).timestamp(), "co2_ppm": 400 + day, "pmv": 0.1})
+    raw.flush()
+
+    removed = engine.apply_retention(today=date(2025, 12, 13))
+    assert removed == {"raw": [date(2025, 12, 10)]}
+    assert list(raw.read_range(columns=["co2_ppm"])["co2_ppm"]) == [411, 412, 413]
+    assert [r["pmv"] for r in raw.range("comfort")] == [0.1, 0.1, 0.1]
+    engine.close()
+    raw.close()
+
+
+def test_read_history_uses_rollups_for_long_ranges(tmp_path, monkeypatch):
+    import state
+
+    engine = _engine(tmp_path)
+    for i in range(48):
+        engine.add({"timestamp": T0 + 3600 * i, "co2_ppm": 400 + i})
+    engine.close()
+    monkeypatch.setattr(state, "_rollup_engine", engine)
+
+    tier, data = state.read_history(T0, T0 + 48 * 3600, ["co2_ppm"], points=40)
+    assert tier == "1h"
+    assert len(data["co2_ppm"]) == 48
+    assert data["co2_ppm"][-1] == 447
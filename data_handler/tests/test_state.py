@@ -0,0 +1,469 @@
+import csv
+
+from data_handler.state import METRICS_HEADERS, MetricsWriter, snapshot_to_row
+
+
+def _snapshot(ts, co2=800):
+    return {
+        "last_updated": ts,
+        "co2_ppm": co2,
+        "environment": {"temperature_c": 22, "humidity_pct": 45},
+        "comfort": {"pmv": 0.1, "ppd": 5},
+        "radar": {"target_count": 1},
+    }
+
+
+def _read_rows(path):
+    with path.open("r", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_metrics_writer_buffers_until_flush_threshold(tmp_path):
+    path = tmp_path / "metrics.csv"
+    writer = MetricsWriter(path, flush_rows=3, flush_interval=60)
+    try:
+        writer.write(snapshot_to_row(_snapshot(1700000000)))
+        writer.write(snapshot_to_row(_snapshot(1700000001)))
+        assert _read_rows(path) == []
+
+        writer.write(snapshot_to_row(_snapshot(1700000002)))
+        assert len(_read_rows(path)) == 3
+    finally:
+        writer.close()
+
+
+def test_metrics_writer_flushes_on_close(tmp_path):
+    path = tmp_path / "metrics.csv"
+    writer = MetricsWriter(path, flush_rows=100, flush_interval=60)
+    writer.write(snapshot_to_row(_snapshot(1700000000, co2=900)))
+    writer.close()
+
+    rows = _read_rows(path)
+    assert len(rows) == 1
+    assert rows[0]["co2_ppm"] == "900"
+
+
+def test_metrics_writer_repairs_missing_header(tmp_path):
+    path = tmp_path / "metrics.csv"
+    path.write_text("2025-01-01T00:00:00,700\r\n")
+
+    writer = MetricsWriter(path, flush_rows=1)
+    writer.write(snapshot_to_row(_snapshot(1700000000)))
+    writer.close()
+
+    with path.open("r", newline="") as f:
+        lines = list(csv.reader(f))
+    assert lines[0] == METRICS_HEADERS
+    assert lines[1] == ["2025-01-01T00:00:00", "700"]
+    assert len(lines) == 3
+
+
+def test_metrics_writer_terminates_partial_last_line(tmp_path):
+    path = tmp_path / "metrics.csv"
+    path.write_text(",".join(METRICS_HEADERS) + "\r\n2025-01-01T00:00:00,70")
+
+    writer = MetricsWriter(path, flush_rows=1)
+    writer.write(snapshot_to_row(_snapshot(1700000000)))
+    writer.close()
+
+    rows = _read_rows(path)
+    assert rows[0]["co2_ppm"] == "70"
+    assert rows[1]["co2_ppm"] == "800"
+
+
+def test_latest_sensor_row_reads_tail(tmp_path, monkeypatch):
+    import data_handler.state as state
+
+    path = tmp_path / "metrics.csv"
+    monkeypatch.setattr(state, "SENSOR_CSV", path)
+    monkeypatch.setattr(state, "METRICS_BACKEND", "csv")
+    monkeypatch.setattr(state, "TAIL_BLOCK_BYTES", 16)  # force multi-block scans
+    assert state.latest_sensor_row() is None
+
+    writer = MetricsWriter(path, flush_rows=1)
+    for i in range(20):
+        writer.write(snapshot_to_row(_snapshot(1700000000 + i, co2=800 + i)))
+    writer.close()
+
+    row = state.latest_sensor_row()
+    assert row["co2_ppm"] == "819"
+    assert set(row) == set(METRICS_HEADERS)
+
+    # A half-written trailing line is ignored until it is complete.
+    with path.open("a") as f:
+        f.write("2025-01-01T00:00:00,999")
+    assert state.latest_sensor_row()["co2_ppm"] == "819"
+
+
+def test_latest_sensor_row_header_only(tmp_path, monkeypatch):
+    import data_handler.state as state
+
+    path = tmp_path / "metrics.csv"
+    path.write_text(",".join(METRICS_HEADERS) + "\r\n")
+    monkeypatch.setattr(state, "SENSOR_CSV", path)
+    monkeypatch.setattr(state, "METRICS_BACKEND", "csv")
+    assert state.latest_sensor_row() is None
+
+
+def test_columnar_store_range_and_latest(tmp_path):
+    from data_handler.columnar_store import INT_MISSING, METRICS_SCHEMA, ColumnarMetricsStore
+
+    store = ColumnarMetricsStore(tmp_path / "store", METRICS_SCHEMA, flush_rows=4)
+    base = 1700000000
+    for i in range(10):
+        snap = _snapshot(base + i * 3600, co2=800 + i)
+        snap["weather"] = {"condition": "Cloudy" if i % 2 else "Sunny", "temperature_c": 7.5}
+        if i == 3:
+            snap["co2_ppm"] = None
+        store.append(snapshot_to_row(snap))
+
+    data = store.read_range(base + 2 * 3600, base + 5 * 3600, ["co2_ppm", "temperature_c", "weather_condition"])
+    assert set(data) == {"timestamp", "co2_ppm", "temperature_c", "weather_condition"}
+    assert data["timestamp"].dtype == "f8"
+    assert data["co2_ppm"].dtype == "i4"
+    assert data["temperature_c"].dtype == "f4"
+    assert list(data["co2_ppm"]) == [802, INT_MISSING, 804]
+    assert [store.categories("weather_condition")[c] for c in data["weather_condition"]] == ["Sunny", "Cloudy", "Sunny"]
+
+    latest = store.latest()
+    assert latest["co2_ppm"] == 809
+    assert latest["weather_condition"] == "Cloudy"
+    assert latest["temperature_c"] == 22.0
+    store.close()
+
+    # Reopening picks up existing partitions and category codes.
+    reopened = ColumnarMetricsStore(tmp_path / "store", METRICS_SCHEMA)
+    assert len(reopened.read_range()["timestamp"]) == 10
+    assert reopened.latest()["weather_condition"] == "Cloudy"
+    reopened.close()
+
+
+def test_columnar_store_ignores_partial_rows(tmp_path):
+    from data_handler.columnar_store import ColumnarMetricsStore
+
+    store = ColumnarMetricsStore(tmp_path / "store", flush_rows=1)
+    store.append(snapshot_to_row(_snapshot(1700000000)))
+    # Simulate a crash that appended to one column but not the timestamp.
+    part = tmp_path / "store" / store.partitions()[0].isoformat()
+    with (part / "co2_ppm.i4").open("ab") as f:
+        f.write(b"\x01\x00\x00\x00")
+    assert len(store.read_range()["co2_ppm"]) == 1
+
+    store.append(snapshot_to_row(_snapshot(1700000001, co2=801)))
+    assert list(store.read_range()["co2_ppm"]) == [800, 801]
+    store.close()
+
+
+def test_columnar_store_pads_columns_added_after_a_partition(tmp_path):
+    from data_handler.columnar_store import INDOOR_SCHEMA, ColumnarMetricsStore
+
+    old_schema = {k: v for k, v in INDOOR_SCHEMA.items() if k not in ("device_id", "room")}
+    old = ColumnarMetricsStore(tmp_path / "store", old_schema, flush_rows=1)
+    old.append(snapshot_to_row(_snapshot(1700000000)))
+    old.close()
+
+    store = ColumnarMetricsStore(tmp_path / "store", INDOOR_SCHEMA, flush_rows=1)
+    assert len(store.read_range(columns=["device_id"])["device_id"]) == 1
+    store.append(snapshot_to_row({**_snapshot(1700000001, co2=801), "device_id": "pico", "room": "lab"}))
+    data = store.read_range(columns=["co2_ppm", "device_id"])
+    assert list(data["co2_ppm"]) == [800, 801]
+    vocab = store.categories("device_id")
+    assert [vocab[c] if 0 <= c < len(vocab) else None for c in data["device_id"]] == [None, "pico"]
+    store.close()
+
+
+def test_metrics_writer_extends_an_older_header_in_place(tmp_path):
+    path = tmp_path / "metrics.csv"
+    old_headers = METRICS_HEADERS[:-2]
+    with path.open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=old_headers)
+        writer.writeheader()
+        writer.writerow({k: v for k, v in snapshot_to_row(_snapshot(1700000000)).items() if k in old_headers})
+
+    writer = MetricsWriter(path, flush_rows=1)
+    writer.write(snapshot_to_row({**_snapshot(1700000001, co2=801), "device_id": "pico", "room": "lab"}))
+    writer.close()
+
+    rows = _read_rows(path)
+    assert list(rows[0]) == METRICS_HEADERS
+    assert [(r["co2_ppm"], r["device_id"]) for r in rows] == [("800", None), ("801", "pico")]
+
+
+def test_read_metrics_range_csv_fallback(tmp_path, monkeypatch):
+    import data_handler.state as state
+
+    path = tmp_path / "metrics.csv"
+    monkeypatch.setattr(state, "SENSOR_CSV", path)
+    monkeypatch.setattr(state, "METRICS_BACKEND", "csv")
+    writer = MetricsWriter(path, flush_rows=1)
+    for i in range(5):
+        writer.write(snapshot_to_row(_snapshot(1700000000 + i, co2=800 + i)))
+    writer.close()
+
+    data = state.read_metrics_range(1700000001, 1700000003, ["co2_ppm", "pmv"])
+    assert list(data["co2_ppm"]) == [801, 802]
+    assert data["pmv"].dtype == "f4"
+
+
+def test_sqlite_store_batches_and_reads(tmp_path):
+    from data_handler.sqlite_store import SqliteMetricsStore
+
+    store = SqliteMetricsStore(tmp_path / "metrics.sqlite3", flush_interval=0.05)
+    base = 1700000000
+    for i in range(5):
+        snap = _snapshot(base + i, co2=800 + i)
+        snap["weather"] = {"temperature_c": 7.5, "condition": "Cloudy", "measured_iso": "2023-11-14T22:00:00+01:00"}
+        store.append(snapshot_to_row(snap))
+    store.flush()
+
+    latest = store.latest()
+    assert latest["co2_ppm"] == 804
+    assert latest["weather_condition"] == "Cloudy"
+    # Weather observations are stored once per Buienradar measurement.
+    assert len(store.range("weather")) == 1
+    assert [r["co2_ppm"] for r in store.range("co2", base + 1, base + 3)] == [801, 802]
+
+    data = store.read_range(base, base + 10, ["co2_ppm", "temperature_c", "weather_condition"])
+    assert list(data["co2_ppm"]) == [800, 801, 802, 803, 804]
+    assert data["temperature_c"].dtype == "f4"
+    assert list(data["weather_condition"]) == ["Cloudy", None, None, None, None]
+    store.close()
+
+
+def test_sqlite_writer_survives_failed_insert(tmp_path, monkeypatch):
+    import sqlite3
+
+    from data_handler.sqlite_store import SqliteMetricsStore
+
+    store = SqliteMetricsStore(tmp_path / "metrics.sqlite3", flush_interval=0.05)
+    real_insert = store._insert_batch
+    calls = []
+
+    def flaky_insert(conn, batch, last_measured):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database or disk is full")
+        return real_insert(conn, batch, last_measured)
+
+    monkeypatch.setattr(store, "_insert_batch", flaky_insert)
+    store.append(snapshot_to_row(_snapshot(1700000000, co2=800)))
+    store.flush()  # returns even though the batch failed
+    assert store.dropped_rows == 1
+
+    store.append(snapshot_to_row(_snapshot(1700000001, co2=801)))
+    store.flush()
+    assert store.latest()["co2_ppm"] == 801
+    assert store._writer.is_alive()
+    store.close()
+
+
+def test_sqlite_store_imports_csv(tmp_path):
+    from data_handler.sqlite_store import SqliteMetricsStore
+
+    path = tmp_path / "metrics.csv"
+    writer = MetricsWriter(path)
+    for i in range(3):
+        writer.write(snapshot_to_row(_snapshot(1700000000 + i, co2=700 + i)))
+    writer.close()
+
+    store = SqliteMetricsStore(tmp_path / "metrics.sqlite3")
+    assert store.import_csv(path) == 3
+    assert store.latest("co2")["co2_ppm"] == 702
+    assert len(store.range("environment")) == 1  # unchanged readings are stored once
+    store.close()
+
+
+def test_sqlite_store_writes_streams_per_device_on_change(tmp_path, monkeypatch):
+    import data_handler.sqlite_store as sqlite_store
+
+    monkeypatch.setattr(sqlite_store, "REPEAT_AFTER_S", 10)
+    store = sqlite_store.SqliteMetricsStore(tmp_path / "metrics.sqlite3", flush_interval=0.05)
+    base = 1700000000
+    for i in range(20):
+        for device, co2 in (("pico", 800), ("pico-2", 900 + (i >= 15))):
+            store.append(snapshot_to_row({**_snapshot(base + i, co2=co2), "device_id": device, "room": "lab"}))
+    store.flush()
+
+    rows = store.range("co2")
+    # Same timestamp, different devices: both kept. Unchanged values repeat only every REPEAT_AFTER_S.
+    assert [(r["ts"] - base, r["device_id"], r["co2_ppm"]) for r in rows] == [
+        (0, "pico", 800), (0, "pico-2", 900), (10, "pico", 800), (10, "pico-2", 900), (15, "pico-2", 901)
+    ]
+    assert len(store.range("device")) == 4
+    store.close()
+
+
+def test_sqlite_store_migrates_ts_keyed_tables(tmp_path):
+    import sqlite3
+
+    from data_handler.sqlite_store import SqliteMetricsStore
+
+    path = tmp_path / "metrics.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE co2 (ts REAL PRIMARY KEY, co2_ppm INTEGER) WITHOUT ROWID")
+    conn.execute("INSERT INTO co2 VALUES (1700000000, 750)")
+    conn.commit()
+    conn.close()
+
+    store = SqliteMetricsStore(path)
+    assert store.range("co2") == [{"ts": 1700000000.0, "device_id": "", "co2_ppm": 750}]
+    store.append(snapshot_to_row({**_snapshot(1700000000, co2=760), "device_id": "pico"}))
+    store.flush()
+    assert len(store.range("co2")) == 2
+    store.close()
+
+
+def test_wait_for_update_wakes_on_change_and_times_out():
+    import threading
+    import time
+
+    import data_handler.state as state
+
+    version = state.state_version
+    assert state.wait_for_update(version, timeout=0.01) == version
+
+    timer = threading.Timer(0.05, state.update_state, kwargs={"status": "connected"})
+    t0 = time.monotonic()
+    timer.start()
+    new_version = state.wait_for_update(version, timeout=5)
+    assert new_version == version + 1
+    assert time.monotonic() - t0 < 1
+    assert state.get_snapshot()["status"] == "connected"
+
+
+def test_snapshots_are_frozen_and_point_in_time():
+    import json
+
+    import pytest
+
+    import data_handler.state as state
+
+    state.update_state(environment={"temperature_c": 21.5, "history": [1, 2]})
+    before = state.get_snapshot()
+    with pytest.raises(TypeError):
+        before["co2_ppm"] = 1
+    with pytest.raises(TypeError):
+        before["environment"]["temperature_c"] = 30
+    with pytest.raises(TypeError):
+        before["environment"]["history"].append(3)
+    assert before["environment"]["history"] == [1, 2]
+    assert json.loads(json.dumps(before))["environment"]["temperature_c"] == 21.5
+
+    state.update_state(environment={"temperature_c": 22.0})
+    assert before["environment"]["temperature_c"] == 21.5
+    assert state.get_snapshot()["environment"]["temperature_c"] == 22.0
+
+
+def test_metric_history_ring_wraps_with_fixed_memory():
+    import numpy as np
+
+    from data_handler.state import MetricHistory
+
+    hist = MetricHistory(metrics=("co2_ppm", "pmv"), capacity=5)
+    buffer = hist.timestamps
+    for i in range(8):
+        hist.append(float(i), {"co2_ppm": 400 + i, "pmv": None if i % 2 else 0.1 * i})
+
+    assert len(hist) == 5
+    assert hist.timestamps is buffer
+    segments = hist.segments()
+    assert [list(ts) for ts, _ in segments] == [[3.0, 4.0], [5.0, 6.0, 7.0]]
+    assert np.shares_memory(segments[0][0], buffer)
+
+    ts, co2 = hist.series("co2_ppm", since=4.5)
+    assert list(ts) == [5.0, 6.0, 7.0]
+    assert list(co2) == [405, 406, 407]
+    ts, pmv = hist.series("pmv")
+    assert list(ts) == [4.0, 6.0]
+
+    stats = hist.stats("co2_ppm", window_s=3, now=7.0)
+    assert stats == {"count": 4, "mean": 405.5, "min": 404.0, "max": 407.0, "last": 407.0}
+    assert hist.stats("pmv", window_s=0.5, now=7.0)["count"] == 0
+
+
+def test_update_state_feeds_history(monkeypatch):
+    import data_handler.state as state
+
+    hist = state.MetricHistory(capacity=10)
+    monkeypatch.setattr(state, "history", hist)
+    state.update_state(status="connected")
+    assert len(hist) == 0
+    state.update_state(environment={"temperature_c": 21.0, "humidity_pct": 40}, radar={"target_count": 2})
+    state.update_state(co2_ppm=650)
+    assert list(hist.series("temperature_c")[1]) == [21.0]
+    assert list(hist.series("people")[1]) == [2]
+    assert list(hist.series("co2_ppm")[1]) == [650]
+
+    # A malformed payload value is recorded as a gap instead of raising under state_lock.
+    state.update_state(co2_ppm="n/a", environment={"temperature_c": "warm", "humidity_pct": 41})
+    assert list(hist.series("co2_ppm")[1]) == [650]
+    assert list(hist.series("humidity_pct")[1]) == [40, 41]
+
+
+def test_metric_history_grows_lazily_up_to_capacity():
+    from data_handler.state import MetricHistory
+
+    hist = MetricHistory(metrics=("co2_ppm",), capacity=10, initial_rows=2)
+    assert len(hist.timestamps) == 2
+    for i in range(7):
+        hist.append(float(i), {"co2_ppm": 400 + i})
+    assert len(hist.timestamps) == 8
+    for i in range(7, 13):
+        hist.append(float(i), {"co2_ppm": 400 + i})
+    assert len(hist.timestamps) == 10
+    assert list(hist.series("co2_ppm")[0]) == [float(i) for i in range(3, 13)]
+
+
+def test_people_count_falls_back_to_radar_targets(monkeypatch):
+    import data_handler.state as state
+    from data_handler.llm_utils import build_prompt_from_snapshot
+
+    monkeypatch.setattr(state, "history", state.MetricHistory(capacity=10))
+    state.update_state(radar={"targets": [{"x": 1}, {"x": 2}, {"x": 3}]})
+    snapshot = state.get_snapshot()
+    assert isinstance(snapshot["radar"]["targets"], list)
+    assert state.snapshot_to_row(snapshot)["people"] == 3
+    assert list(state.history.series("people")[1]) == [3]
+    assert "People (radar): 3" in build_prompt_from_snapshot(snapshot, None)
+
+
+def test_shared_snapshot_round_trip(tmp_path, monkeypatch):
+    import numpy as np
+
+    import data_handler.state as state
+
+    monkeypatch.setattr(state, "SHARED_SNAPSHOT_PATH", tmp_path / "live_snapshot.json")
+    monkeypatch.setattr(state, "SHARED_SNAPSHOT_POLL_S", 0.01)
+    monkeypatch.setattr(state, "_shared_snapshot_watcher", None)
+    assert state.shared_snapshot_version() == 0
+    assert state.wait_for_shared_snapshot(0, timeout=0.05) == 0
+    assert state.read_shared_snapshot() == {}
+
+    state.write_shared_snapshot({"co2_ppm": 700, "comfort": {"pmv": np.float64(0.25)}, "status": "connected"})
+    version = state.shared_snapshot_version()
+    assert state.wait_for_shared_snapshot(0, timeout=5) == version  # woken by the watcher thread
+    snapshot = state.read_shared_snapshot()
+    assert snapshot["comfort"]["pmv"] == 0.25
+    assert isinstance(snapshot, state.FrozenDict)
+    assert state.read_shared_snapshot() is snapshot  # cached until the file changes
+    assert state.wait_for_shared_snapshot(version, timeout=0.05) == version
+    state.get_shared_snapshot_watcher().stop()
+
+
+def test_history_trends_are_json_ready(monkeypatch):
+    import json
+
+    import data_handler.state as state
+
+    history = state.MetricHistory(capacity=1000)
+    monkeypatch.setattr(state, "history", history)
+    monkeypatch.setattr(state, "TREND_POINTS", 10)
+    now = 1700000000.0
+    for i in range(100):
+        history.append(now - 99 + i, {"co2_ppm": 700 + i})
+
+    trends = json.loads(json.dumps(state.history_trends(now=now)))
+    assert trends["co2_ppm"]["stats"]["1h"]["max"] == 799
+    assert len(trends["co2_ppm"]["series"]) == 10
+    assert trends["co2_ppm"]["series"][-1] == [now, 799.0]
+    assert trends["pmv"] == {"stats": trends["pmv"]["stats"], "series": []}
@@ -0,0 +1,64 @@
+from thermal_comfort_model.comfort_calc import UserContextRepository
+
+HEADER = "uid,timestamp_iso,activity,main_task,clothing_upper,clothing_lower\n"
+
+
+def test_repository_reads_only_appended_rows(tmp_path, monkeypatch):
+    path = tmp_path / "responses.csv"
+    path.write_text(HEADER + "u1,2025-01-01,Standing,Meeting,T-shirt,Jeans\n")
+    repo = UserContextRepository(path, stat_interval=0)
+    assert repo.latest().uid == "u1"
+
+    reads = []
+    original_open = type(path).open
+
+    def tracking_open(self, *args, **kwargs):
+        reads.append(self)
+        return original_open(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(path), "open", tracking_open)
+
+    # Unchanged file: no reads at all.
+    repo.all()
+    assert reads == []
+
+    with original_open(path, "a") as f:
+        f.write("u2,2025-01-02,Sitting relaxed,Resting,Thick sweater,Warm trousers\n")
+        f.write("u1,2025-01-03,Exercising,Exercising,T-shirt,Shorts\n")
+        f.write("u3,2025-01-04,Stand")  # partial row still being written
+    users = repo.all()
+    assert len(reads) == 1
+    assert set(users) == {"u1", "u2"}
+    assert users["u1"].activity == "Exercising"
+    assert repo.latest().uid == "u1"
+
+    with original_open(path, "a") as f:
+        f.write("ing,Meeting,T-shirt,Jeans\n")
+    assert repo.get("u3").activity == "Standing"
+
+
+def test_repository_reloads_when_file_is_replaced(tmp_path):
+    path = tmp_path / "responses.csv"
+    path.write_text(HEADER + "u1,2025-01-01,Standing,Meeting,T-shirt,Jeans\nu2,2025-01-01,Standing,Meeting,T-shirt,Jeans\n")
+    repo = UserContextRepository(path, stat_interval=0)
+    assert len(repo.all()) == 2
+
+    path.write_text(HEADER + "u9,2025-01-05,Standing,Meeting,T-shirt,Jeans\n")
+    assert set(repo.all()) == {"u9"}
+
+    path.unlink()
+    assert repo.all() == {}
+    assert repo.latest() is None
+
+
+def test_repository_throttles_stat_calls(tmp_path):
+    path = tmp_path / "responses.csv"
+    path.write_text(HEADER + "u1,2025-01-01,Standing,Meeting,T-shirt,Jeans\n")
+    repo = UserContextRepository(path, stat_interval=60)
+    assert set(repo.all()) == {"u1"}
+
+    with path.open("a") as f:
+        f.write("u2,2025-01-02,Standing,Meeting,T-shirt,Jeans\n")
+    assert set(repo.all()) == {"u1"}  # within the stat interval
+    repo.refresh(force=True)
+    assert set(repo.all()) == {"u1", "u2"}
@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+
+import pytest
+
+from buienradar_data import query_current_state as qcs
+
+
+@pytest.fixture
+def nominatim(monkeypatch):
+    calls = []
+    refreshed = threading.Event()
+
+    def fake_geocode(address, session=None):
+        calls.append(address)
+        refreshed.set()
+        return 51.43, 5.49
+
+    monkeypatch.setattr(qcs, "geocode", fake_geocode)
+    return calls, refreshed
+
+
+def test_geocode_cache_avoids_repeat_lookups(tmp_path, nominatim):
+    calls, _ = nominatim
+    cache = tmp_path / "geocode.json"
+    assert qcs.cached_geocode("Some Street 1", cache_path=cache) == (51.43, 5.49)
+    # A new process start reads the same file: no request at all.
+    assert qcs.cached_geocode("  some street 1 ", cache_path=cache) == (51.43, 5.49)
+    assert calls == ["Some Street 1"]
+
+
+def test_stale_entry_served_immediately_and_refreshed(tmp_path, nominatim):
+    calls, refreshed = nominatim
+    cache = tmp_path / "geocode.json"
+    cache.write_text(json.dumps({"some street 1": {"lat": 1.0, "lon": 2.0, "ts": time.time() - 10}}))
+    assert qcs.cached_geocode("Some Street 1", cache_path=cache, ttl=5) == (1.0, 2.0)
+    assert refreshed.wait(5)
+    for _ in range(100):
+        if json.loads(cache.read_text())["some street 1"]["lat"] == 51.43:
+            break
+        time.sleep(0.01)
+    assert json.loads(cache.read_text())["some street 1"]["lat"] == 51.43
+
+
+def test_stale_entry_survives_nominatim_failure(tmp_path, monkeypatch):
+    cache = tmp_path / "geocode.json"
+    cache.write_text(json.dumps({"some street 1": {"lat": 1.0, "lon": 2.0, "ts": 0}}))
+    failed = threading.Event()
+
+    def broken(address, session=None):
+        failed.set()
+        raise RuntimeError("rate limited")
+
+    monkeypatch.setattr(qcs, "geocode", broken)
+    assert qcs.cached_geocode("Some Street 1", cache_path=cache) == (1.0, 2.0)
+    assert failed.wait(5)
+    assert json.loads(cache.read_text())["some street 1"]["lat"] == 1.0
+
+
+def _feed(timestamp, temperature=7.5):
+    station = {
+        "stationid": 6370, "stationname": "Meetstation Eindhoven", "lat": 51.45, "lon": 5.42,
+        "timestamp": timestamp, "weatherdescription": "Zwaar bewolkt", "iconurl": "", "winddirection": "ZW",
+        "temperature": temperature, "feeltemperature": 5.1, "windgusts": 6.2, "windspeed": 3.4,
+        "windspeedBft": 3, "humidity": 88.0, "precipitation": 0.0, "sunpower": 40.0,
+        "winddirectiondegrees": 225, "airpressure": 1012.3, "visibility": 12000,
+    }
+    return {"actual": {"stationmeasurements": [station]}, "forecast": {"fivedayforecast": []}}
+
+
+class _BuienradarStub:
+    """Local stand-in for the feed and rain endpoints, honouring If-None-Match."""
+
+    def __init__(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        stub = self
+        self.feed = _feed("2025-12-15T10:50:00")
+        self.status = 200
+        self.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests.append((self.path, self.client_address))
+                if self.path.startswith("/rain"):
+                    body = b"000|10:55\n000|11:00\n"
+                    etag = None
+                else:
+                    body = json.dumps(stub.feed).encode()
+                    etag = '"%x"' % hash(body)
+                    if stub.status != 200:
+                        self.send_response(stub.status)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                self.send_response(200)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def poller(monkeypatch):
+    import weather_service
+
+    stub = _BuienradarStub()
+    updates = []
+    monkeypatch.setattr(weather_service, "update_state", lambda **kw: updates.append(kw))
+    p = weather_service.WeatherPoller(
+        feed_url=stub.base + "/feed",
+        rain_url_template=stub.base + "/rain?lat={lat}&lon={lon}",
+        poll_seconds=420,
+        backoff_base=15,
+    )
+    p.coords = (51.43, 5.49)
+    yield p, stub, updates
+    stub.close()
+
+
+def test_poller_publishes_once_per_measurement(poller):
+    p, stub, updates = poller
+    assert p.poll_once()
+    assert updates[-1]["weather"]["temperature_c"] == 7.5
+    assert p.poll_once()  # same ETag -> 304
+    stub.feed = _feed("2025-12-15T10:50:00", temperature=99.0)  # new body, same measured time
+    assert p.poll_once()
+    assert len(updates) == 1
+    assert p.counters == {"fetches": 3, "not_modified": 1, "unchanged": 1, "published": 1, "errors": 0}
+
+    stub.feed = _feed("2025-12-15T11:00:00", temperature=8.0)
+    assert p.poll_once()
+    assert updates[-1]["weather"]["temperature_c"] == 8.0
+    # Every request reused one pooled connection.
+    assert len({client for _, client in stub.requests}) == 1
+
+
+def test_poller_backs_off_and_recovers(poller):
+    p, stub, updates = poller
+    assert p.next_delay() == 420
+    stub.status = 503
+    assert not p.poll_once()
+    assert 12 <= p.next_delay() <= 18
+    assert not p.poll_once()
+    assert 24 <= p.next_delay() <= 36
+    for _ in range(10):
+        p.poll_once()
+    assert p.next_delay() <= 420 * 1.2
+    assert "weather_error" in updates[-1]
+
+    stub.status = 200
+    assert p.poll_once()
+    assert updates[-1]["weather"]["temperature_c"] == 7.5
+    assert p.failures == 0 and p.next_delay() == 420
+
+
+def test_poller_retries_a_failed_parse_without_validators(poller, monkeypatch):
+    import weather_service
+
+    p, stub, updates = poller
+    real_parse = weather_service.parse_data
+    monkeypatch.setattr(weather_service, "parse_data", lambda *a: {"success": False, "msg": "bad feed"})
+    assert not p.poll_once()
+    monkeypatch.setattr(weather_service, "parse_data", real_parse)
+    # Same feed: without the validators of the failed attempt this is a full 200, not a 304.
+    assert p.poll_once()
+    assert updates[-1]["weather"]["temperature_c"] == 7.5
+    assert p.counters["not_modified"] == 0 and p.counters["published"] == 1
+
+
+def test_weather_thread_is_process_wide(monkeypatch):
+    import weather_service
+
+    started = []
+    monkeypatch.setattr(weather_service.WeatherPoller, "run", lambda self, stop: (started.append(self), stop.wait(5)))
+    monkeypatch.setattr(weather_service, "_weather_thread", None)
+    sessions = [{} for _ in range(5)]
+    try:
+        threads = {weather_service.ensure_weather_thread(s) for s in sessions}
+        assert len(threads) == 1
+        assert len(started) == 1
+        assert all(s["weather_thread"] in threads for s in sessions)
+    finally:
+        weather_service.stop_weather_thread()
@@ -0,0 +1,122 @@
+import numpy as np
+
+from columnar_store import INT_MISSING, asof_join
+from weather_history import WeatherHistory
+
+T0 = 1700000000.0
+
+
+def _summary(minutes, temperature, condition="Cloudy"):
+    return {
+        "temperature_c": temperature,
+        "humidity_pct": 80,
+        "precip_timeframe_min": 45,
+        "condition": condition,
+        "measured_iso": T0 + minutes * 60,
+    }
+
+
+def test_asof_join_takes_newest_reading_at_or_before():
+    weather_ts = np.array([T0, T0 + 600, T0 + 1200])
+    weather = {
+        "temp": np.array([5.0, 6.0, 7.0], dtype="f4"),
+        "timeframe": np.array([45, 30, 15], dtype="i4"),
+        "condition": np.array(["a", "b", "c"], dtype=object),
+    }
+    indoor_ts = np.array([T0 - 1, T0, T0 + 599, T0 + 600, T0 + 5000])
+
+    joined = asof_join(indoor_ts, weather_ts, weather)
+    assert np.isnan(joined["temp"][0])
+    assert list(joined["temp"][1:]) == [5.0, 5.0, 6.0, 7.0]
+    assert list(joined["timeframe"]) == [INT_MISSING, 45, 45, 30, 15]
+    assert list(joined["condition"]) == [None, "a", "a", "b", "c"]
+
+    # Readings older than max_age are not attached.
+    stale = asof_join(indoor_ts, weather_ts, weather, max_age=1800)
+    assert np.isnan(stale["temp"][-1])
+
+    empty = asof_join(indoor_ts, np.empty(0), {"temp": np.empty(0, dtype="f4")})
+    assert np.isnan(empty["temp"]).all()
+
+
+def test_weather_history_stores_each_reading_once(tmp_path):
+    history = WeatherHistory(tmp_path / "weather")
+    assert history.record(_summary(0, 5.0))
+    assert not history.record(_summary(0, 5.0))  # same measured time, e.g. from every indoor row
+    assert history.record(_summary(10, 6.0, "Sunny"))
+    assert not history.record({"temperature_c": 9.0})  # no measured time
+    history.close()
+
+    reopened = WeatherHistory(tmp_path / "weather")
+    assert not reopened.record(_summary(10, 6.0))
+    data = reopened.read_range(columns=["weather_temperature_c", "weather_condition"])
+    assert list(data["weather_temperature_c"]) == [5.0, 6.0]
+    assert list(data["weather_condition"]) == ["Cloudy", "Sunny"]
+    assert reopened.latest()["weather_temperature_c"] == 6.0
+
+    indoor_ts = T0 + np.arange(0, 1200, 300)
+    joined = reopened.attach(indoor_ts, ["weather_temperature_c", "weather_measured_iso"])
+    assert list(joined["weather_temperature_c"]) == [5.0, 5.0, 6.0, 6.0]
+    assert list(joined["weather_measured_iso"]) == [T0, T0, T0 + 600, T0 + 600]
+    reopened.close()
+
+
+def test_reader_process_sees_categories_added_later(tmp_path):
+    writer = WeatherHistory(tmp_path / "weather")
+    reader = WeatherHistory(tmp_path / "weather")
+    writer.record(_summary(0, 5.0, "Sunny"))
+    assert reader.latest()["weather_condition"] == "Sunny"
+    writer.record(_summary(10, 6.0, "Rain"))
+    assert reader.latest()["weather_condition"] == "Rain"
+    assert list(reader.read_range()["weather_condition"]) == ["Sunny", "Rain"]
+    writer.close()
+    reader.close()
+
+
+def test_columnar_backend_joins_weather_at_query_time(tmp_path, monkeypatch):
+    import state
+    from columnar_store import ColumnarMetricsStore
+
+    store = ColumnarMetricsStore(tmp_path / "store", flush_rows=1)
+    monkeypatch.setattr(state, "METRICS_BACKEND", "columnar")
+    monkeypatch.setattr(state, "_metrics_store", store)
+    monkeypatch.setattr(state, "_weather_history", WeatherHistory(tmp_path / "weather"))
+
+    for i in range(6):
+        weather = _summary(10 * (i // 3), 5.0 + i // 3)
+        state.persist_snapshot({"last_updated": T0 + 300 * i, "co2_ppm": 800 + i, "weather": weather})
+
+    assert len(state.get_weather_history().read_range()["timestamp"]) == 2
+    data = state.read_metrics_range(T0, T0 + 3600, ["co2_ppm", "weather_temperature_c", "weather_condition"])
+    assert list(data["co2_ppm"]) == [800, 801, 802, 803, 804, 805]
+    assert list(data["weather_temperature_c"]) == [5.0, 5.0, 6.0, 6.0, 6.0, 6.0]
+    assert list(data["weather_condition"]) == ["Cloudy"] * 6
+
+    tier, series = state.read_history(T0, T0 + 3600, ["weather_temperature_c"])
+    assert tier == "weather"
+    assert list(series["weather_temperature_c"]) == [5.0, 6.0]
+
+    assert state.latest_sensor_row()["weather_temperature_c"] == 6.0
+    store.close()
+    state.get_weather_history().close()
+
+
+def test_csv_backend_keeps_weather_in_its_own_rows(tmp_path, monkeypatch):
+    import state
+
+    monkeypatch.setattr(state, "METRICS_BACKEND", "csv")
+    monkeypatch.setattr(state, "SENSOR_CSV", tmp_path / "metrics.csv")
+    monkeypatch.setattr(state, "_metrics_writer", None)
+    monkeypatch.setattr(state, "_weather_history", WeatherHistory(tmp_path / "weather"))
+
+    for i in range(4):
+        weather = {**_summary(10 * (i // 2), 5.0 + i // 2), "measured_iso": str(T0 + 600 * (i // 2))}
+        state.persist_snapshot({"last_updated": T0 + 300 * i, "co2_ppm": 800 + i, "weather": weather})
+    state.close_metrics_writer()
+
+    # Nothing is duplicated into the weather series, and History reads the CSV rows.
+    assert len(state.get_weather_history().read_range()["timestamp"]) == 0
+    tier, series = state.read_history(T0, T0 + 3600, ["weather_temperature_c"])
+    assert tier == "raw"
+    assert list(series["weather_temperature_c"]) == [5.0, 5.0, 6.0, 6.0]
+    state.get_weather_history().close()
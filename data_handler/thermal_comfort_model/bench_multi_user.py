@@ -0,0 +1,92 @@
+"""Benchmark multi-user comfort: per-user scalar models vs the batched path.
+
+Run from data_handler/:
+
+    python thermal_comfort_model/bench_multi_user.py [--sizes 10 100 1000 10000] [--max-scalar 1000]
+
+Columns:
+- scalar:     one pmv_ppd_iso + utci call per user (the previous implementation, no cache)
+- batch-cold: get_multi_user_results with an empty comfort cache
+- batch-warm: get_multi_user_results again, every (MET, CLO) group cached
+- unique:     batch-cold where every user has distinct continuous MET/CLO, so
+              the vectorized model call sees all N rows
+"""
+import argparse
+import random
+import sys
+import time
+import warnings
+from pathlib import Path
+
+PKG_ROOT = Path(__file__).resolve().parent.parent
+if str(PKG_ROOT) not in sys.path:
+    sys.path.append(str(PKG_ROOT))
+
+from thermal_comfort_model import comfort_calc  # noqa: E402
+from thermal_comfort_model.comfort_calc import (  # noqa: E402
+    ACTIVITY_MET,
+    LOWER_CLO_CLO,
+    UPPER_CLO_CLO,
+    EnvReading,
+    UserContext,
+    get_multi_user_results,
+)
+
+
+def make_users(n: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {
+        f"user-{i}": UserContext(
+            uid=f"user-{i}",
+            activity=rng.choice(list(ACTIVITY_MET)),
+            main_task="",
+            clothing_upper=rng.choice(list(UPPER_CLO_CLO)),
+            clothing_lower=rng.choice(list(LOWER_CLO_CLO)),
+        )
+        for i in range(n)
+    }
+
+
+def scalar_loop(env: EnvReading, users: dict) -> None:
+    for user in users.values():
+        met = comfort_calc.estimate_met(user.activity)
+        clo = comfort_calc.estimate_clo(user.clothing_upper, user.clothing_lower)
+        comfort_calc._comfort_models(env.tdb, env.tr, env.rh, env.v, met, clo)
+
+
+def unique_batch(env: EnvReading, n: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    inputs = [
+        {"tdb": env.tdb, "tr": env.tr, "rh": env.rh, "v": env.v, "met": rng.uniform(0.8, 2.5), "clo": rng.uniform(0.2, 1.2)}
+        for _ in range(n)
+    ]
+    comfort_calc._comfort_models_batch(inputs)
+
+
+def timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--max-scalar", type=int, default=1000, help="Skip the slow scalar loop above this size")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")  # pythermalcomfort warns about applicability limits
+    env = EnvReading(tdb=23.4, tr=23.4, rh=42.0, v=0.1)
+    print(f"{'users':>8} {'scalar':>10} {'batch-cold':>11} {'batch-warm':>11} {'unique':>10}")
+    for n in args.sizes:
+        users = make_users(n)
+        scalar = f"{timed(lambda: scalar_loop(env, users)):.4f}s" if n <= args.max_scalar else "skipped"
+        comfort_calc.comfort_cache.clear()
+        cold = timed(lambda: get_multi_user_results(env, users))
+        warm = timed(lambda: get_multi_user_results(env, users))
+        unique = timed(lambda: unique_batch(env, n))
+        print(f"{n:>8} {scalar:>10} {cold:>10.4f}s {warm:>10.4f}s {unique:>9.4f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Render helpers for the History page."""
+from __future__ import annotations
+
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from columnar_store import INT_MISSING
+from downsample import lttb
+import state
+from state import read_history
+
+# Label -> stored column; indoor series come from rollups, weather from its own once-per-reading series.
+HISTORY_SERIES = {
+    "CO₂ (ppm)": "co2_ppm",
+    "Temperature (°C)": "temperature_c",
+    "Humidity (%)": "humidity_pct",
+    "PMV": "pmv",
+    "PPD (%)": "ppd",
+    "People (radar)": "people",
+    "Outdoor temperature (°C)": "weather_temperature_c",
+    "Outdoor humidity (%)": "weather_humidity_pct",
+}
+
+HISTORY_RANGES = {
+    "Last hour": 3600,
+    "Last 24 hours": 24 * 3600,
+    "Last 7 days": 7 * 24 * 3600,
+    "Last 30 days": 30 * 24 * 3600,
+}
+
+# Points sent to the browser per series after LTTB downsampling.
+CHART_POINTS = 2000
+# The range end is rounded to this many seconds so repeated views hit the cache.
+CACHE_STEP_S = 60
+
+
+@st.cache_data(ttl=CACHE_STEP_S, max_entries=64, show_spinner=False)
+def load_series(columns: tuple[str, ...], span_s: int, end_ts: int) -> dict[str, pd.DataFrame]:
+    """Downsampled series for all selected ``columns`` from one ``read_history`` call.
+
+    Cached per (columns, span, range end step).
+    """
+    tier, data = read_history(end_ts - span_s, end_ts, list(columns), points=CHART_POINTS)
+    tz = datetime.now().astimezone().tzinfo
+    frames = {}
+    for column in columns:
+        values = data[column]
+        if values.dtype.kind == "i":
+            # Raw integer columns mark gaps with INT_MISSING; lttb only drops NaN.
+            values = np.where(values == INT_MISSING, np.nan, values.astype("f8"))
+        x, y = lttb(data["timestamp"], values, CHART_POINTS)
+        frame = pd.DataFrame({column: y}, index=pd.to_datetime(x, unit="s", utc=True).tz_convert(tz))
+        frame.attrs["tier"] = tier
+        frames[column] = frame
+    return frames
+
+
+def render_history() -> None:
+    st.subheader("History")
+    range_label = st.selectbox("Range", list(HISTORY_RANGES), index=1, key="history_range")
+    labels = st.multiselect("Series", list(HISTORY_SERIES), default=list(HISTORY_SERIES)[:5], key="history_series")
+
+    if state.METRICS_BACKEND == "csv":
+        st.warning(
+            "History is not supported on the CSV backend: it has no index, so every range change "
+            "parses all of live_metrics.csv. Set THERMAL_GRACE_BACKEND to columnar (the default) "
+            "or sqlite for both ingestd and the dashboard."
+        )
+
+    span_s = HISTORY_RANGES[range_label]
+    end_ts = int(time.time() // CACHE_STEP_S + 1) * CACHE_STEP_S
+    frames = load_series(tuple(HISTORY_SERIES[label] for label in labels), span_s, end_ts) if labels else {}
+    columns = st.columns(2)
+    for i, label in enumerate(labels):
+        frame = frames[HISTORY_SERIES[label]]
+        with columns[i % 2]:
+            st.markdown(f"**{label}**")
+            if frame.empty:
+                st.caption("No data in this range yet.")
+                continue
+            st.line_chart(frame, height=220)
+            st.caption(f"{len(frame)} points · source: {frame.attrs.get('tier', 'raw')}")
@@ -1,12 +1,26 @@
 """Render helpers for the Live Metrics page."""
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Any, Mapping
 
+import pandas as pd
 import streamlit as st
 
+# Metric -> label for the trends published by ingestd (state.history_trends).
+TREND_LABELS = {
+    "co2_ppm": "CO2 ppm",
+    "people": "People (radar)",
+    "temperature_c": "Temperature (°C)",
+    "humidity_pct": "Humidity (%)",
+    "pmv": "PMV",
+    "ppd": "PPD (%)",
+}
 
-def render_live_metrics(snapshot: Mapping[str, Any], table_placeholder, raw_placeholder) -> None:
+
+def render_live_metrics(
+    snapshot: Mapping[str, Any], table_placeholder, raw_placeholder, trend_placeholder=None
+) -> None:
     radar = snapshot.get("radar") or {}
     env = snapshot.get("environment") or {}
     comfort = snapshot.get("comfort") or {}
@@ -128,6 +142,13 @@ def render_live_metrics(snapshot: Mapping[str, Any], table_placeholder, raw_plac
             st.markdown("**Weather (Buienradar)**")
             st.table(weather_rows)
 
+    # Trends change every few seconds, not on every snapshot; only redraw the charts when they do.
+    trends = snapshot.get("trends") or {}
+    drawn = (id(trend_placeholder), trends)
+    if trend_placeholder and trends and st.session_state.get("live_trends_drawn") != drawn:
+        _render_trends(trends, trend_placeholder)
+        st.session_state["live_trends_drawn"] = drawn
+
     if raw_placeholder:
         with raw_placeholder:
             raw = snapshot.get("last_payload")
@@ -135,3 +156,34 @@ def render_live_metrics(snapshot: Mapping[str, Any], table_placeholder, raw_plac
                 st.json(raw)
             else:
                 st.write(raw if raw is not None else "No payload yet")
+
+
+def _fmt(value) -> str:
+    return "—" if value is None else f"{value:.2f}"
+
+
+def _render_trends(trends: Mapping[str, Any], placeholder) -> None:
+    """Rolling stats and last-hour charts from ingestd's in-memory history."""
+    rows = []
+    for metric, label in TREND_LABELS.items():
+        stats = (trends.get(metric) or {}).get("stats") or {}
+        hour, day = stats.get("1h") or {}, stats.get("24h") or {}
+        rows.append({
+            "metric": label,
+            "1 h mean": _fmt(hour.get("mean")),
+            "24 h min": _fmt(day.get("min")),
+            "24 h max": _fmt(day.get("max")),
+        })
+    tz = datetime.now().astimezone().tzinfo
+    with placeholder.container():
+        st.markdown("**Trends**")
+        st.table(rows)
+        columns = st.columns(3)
+        for i, (metric, label) in enumerate(TREND_LABELS.items()):
+            series = (trends.get(metric) or {}).get("series") or []
+            if not series:
+                continue
+            ts, values = zip(*series)
+            frame = pd.DataFrame({label: values}, index=pd.to_datetime(ts, unit="s", utc=True).tz_convert(tz))
+            with columns[i % 3]:
+                st.line_chart(frame, height=140)
@@ -10,11 +10,12 @@ from thermal_comfort_model.comfort_calc import (
     parse_env_from_payload,
 )
 
-from data_handler.llm_utils import build_multi_user_prompt, call_github_llm
-from data_handler.state import get_snapshot, latest_sensor_row
+from data_handler.llm_utils import build_multi_user_prompt, get_llm_token, submit_llm_request
+from data_handler.state import latest_sensor_row, read_shared_snapshot
 
 
-def render_llm_assistant(question: str, ask_button: bool, sensor_box, user_box, llm_status, llm_output) -> None:
+def render_llm_assistant(question: str, ask_button: bool, sensor_box, user_box, llm_status, llm_output) -> bool:
+    """Render the page; returns True while an LLM answer is still pending so the caller keeps polling."""
     sensor_row = latest_sensor_row()
     users = all_users_context()
     user_ctx = latest_user_context()  # still used for single user display if needed
@@ -23,7 +24,7 @@ def render_llm_assistant(question: str, ask_button: bool, sensor_box, user_box,
         if sensor_row:
             sensor_box.table([sensor_row])
         else:
-            sensor_box.info("No sensor CSV data yet. Waiting for first MQTT update...")
+            sensor_box.info("No persisted sensor data yet. Waiting for ingestd to record the first MQTT update...")
 
     if user_box:
         if users:
@@ -39,29 +40,51 @@ def render_llm_assistant(question: str, ask_button: bool, sensor_box, user_box,
         else:
             user_box.info("No user feedback found. Submit feedback in the survey app to see personalized results.")
 
-    # Fire the LLM call once per button press to avoid repeated API hits during reruns.
+    # Submit the LLM call once per button press; it runs on a background executor.
     if ask_button and not st.session_state.get("llm_called"):
+        st.session_state["llm_called"] = True
         # Gather multi-user results for the prompt
-        snapshot = get_snapshot()
+        snapshot = read_shared_snapshot()
         env_reading = parse_env_from_payload(snapshot)
         results = []
         if env_reading and users:
             results = get_multi_user_results(env_reading, users)
-            
+
         prompt = build_multi_user_prompt(sensor_row, results, question)
-        answer = call_github_llm(prompt)
-        st.session_state["llm_answer"] = answer
-        st.session_state["llm_called"] = True
+        token = get_llm_token()
+        if token:
+            st.session_state["llm_future"] = submit_llm_request(prompt, token, stream=True)
+        else:
+            st.session_state["llm_answer"] = "Missing github_models_token in .streamlit/secrets.toml"
     if not ask_button:
         st.session_state["llm_called"] = False
 
+    future = st.session_state.get("llm_future")
+    if future is not None:
+        if not future.done():
+            # Show tokens as they stream in; the caller redraws until the job finishes.
+            partial = future.partial
+            if llm_status:
+                llm_status.info("Model is answering..." if partial else "Waiting for the model...")
+            if partial and llm_output:
+                _show_answer(llm_output, partial)
+            return True
+        exc = future.exception()
+        st.session_state["llm_answer"] = f"LLM call failed: {exc}" if exc else future.result()
+        st.session_state["llm_future"] = None
+
     if "llm_answer" in st.session_state and llm_status and llm_output:
         llm_status.write("LLM result:")
-        st.session_state["llm_render_counter"] = st.session_state.get("llm_render_counter", 0) + 1
-        key = f"llm_resp_{st.session_state['llm_render_counter']}"
-        llm_output.text_area(
-            "Response",
-            value=st.session_state["llm_answer"],
-            height=300,
-            key=key,
-        )
+        _show_answer(llm_output, st.session_state["llm_answer"])
+    return False
+
+
+def _show_answer(llm_output, text: str) -> None:
+    st.session_state["llm_render_counter"] = st.session_state.get("llm_render_counter", 0) + 1
+    key = f"llm_resp_{st.session_state['llm_render_counter']}"
+    llm_output.text_area(
+        "Response",
+        value=text,
+        height=300,
+        key=key,
+    )
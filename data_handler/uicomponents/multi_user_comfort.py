@@ -31,8 +31,8 @@ def render_multi_user_comfort(snapshot: dict, placeholder: st.empty | None = Non
             st.warning("No user feedback context found in responses.csv.")
             return
 
-        # 3. Calculate comfort for each user
-        results = get_multi_user_results(env_reading, users)
+        # 3. Calculate comfort for each user (interpolated PMV, see FastComfortModel)
+        results = get_multi_user_results(env_reading, users, mode="fast")
         
         # Display ID as short UID in table
         display_results = []
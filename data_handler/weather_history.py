@@ -0,0 +1,112 @@
+"""Outdoor weather history: one row per Buienradar reading, joined onto indoor samples at query time.
+
+Buienradar refreshes about every 10 minutes while indoor sensors report
+several times a second, so weather is stored once per ``measured`` time in its
+own small columnar series under ``WEATHER_ROOT`` instead of being copied onto
+every indoor row. ``WeatherHistory.attach`` does a vectorized as-of join
+(``columnar_store.asof_join``) to give any indoor timestamps the reading that
+was current at that moment. Only the columnar backend uses this series; the
+CSV and SQLite backends keep weather in their own rows/table, which is also
+where any history they already hold lives.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+import numpy as np
+
+from columnar_store import COLUMNAR_ROOT, WEATHER_SCHEMA, ColumnarMetricsStore, asof_join, to_epoch
+
+WEATHER_ROOT = COLUMNAR_ROOT.parent / "weather_store"
+
+# A reading is attached to indoor samples up to this many seconds after it was measured.
+WEATHER_MAX_AGE_S = 3600
+
+# Stored column -> key in weather_summary_from_state().
+SUMMARY_FIELDS = {
+    "weather_temperature_c": "temperature_c",
+    "weather_feel_temperature_c": "feel_temperature_c",
+    "weather_humidity_pct": "humidity_pct",
+    "weather_pressure_hpa": "pressure_hpa",
+    "weather_wind_speed_ms": "wind_speed_ms",
+    "weather_wind_gust_ms": "wind_gust_ms",
+    "weather_precip_total_mm": "precip_total_mm",
+    "weather_precip_timeframe_min": "precip_timeframe_min",
+    "weather_condition": "condition",
+}
+
+# Wide-row columns this module can answer; the measured time is the series' own timestamp.
+WEATHER_COLUMNS = tuple(SUMMARY_FIELDS) + ("weather_measured_iso",)
+
+
+def weather_row(summary: Mapping[str, Any] | None) -> Dict[str, Any] | None:
+    """Storage row for one weather summary, or None when it has no measured time."""
+    if not isinstance(summary, Mapping) or to_epoch(summary.get("measured_iso")) is None:
+        return None
+    row = {column: summary.get(key) for column, key in SUMMARY_FIELDS.items()}
+    row["timestamp"] = to_epoch(summary["measured_iso"])
+    return row
+
+
+class WeatherHistory:
+    """Append-once weather series with range reads and as-of joins."""
+
+    def __init__(self, root=WEATHER_ROOT, max_age: float = WEATHER_MAX_AGE_S) -> None:
+        self.store = ColumnarMetricsStore(root, WEATHER_SCHEMA, flush_rows=1)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        latest = self.store.latest()
+        self._last_ts: Optional[float] = to_epoch(latest["timestamp"]) if latest else None
+
+    def record(self, summary: Mapping[str, Any] | None) -> bool:
+        """Store ``summary`` unless its measured time is not newer than the last one stored."""
+        row = weather_row(summary)
+        if row is None:
+            return False
+        with self._lock:
+            if self._last_ts is not None and row["timestamp"] <= self._last_ts:
+                return False
+            self._last_ts = row["timestamp"]
+        self.store.append(row)
+        return True
+
+    def read_range(self, start: Any = None, end: Any = None, columns: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """Stored readings with ``start <= measured < end``; ``weather_condition`` comes back as strings."""
+        wanted = [c for c in (columns or WEATHER_COLUMNS) if c != "timestamp"]
+        stored = [c for c in wanted if c != "weather_measured_iso"]
+        data = self._decode(self.store.read_range(start, end, stored))
+        if "weather_measured_iso" in wanted:
+            data["weather_measured_iso"] = data["timestamp"].copy()
+        return data
+
+    def attach(self, timestamps: np.ndarray, columns: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """``{column: array}`` aligned with ``timestamps``: the newest reading at or before each one."""
+        columns = [c for c in (columns or WEATHER_COLUMNS) if c != "timestamp"]
+        timestamps = np.asarray(timestamps, dtype="f8")
+        if not len(timestamps):
+            return {c: v[:0] for c, v in self.read_range(0, 0, columns).items() if c != "timestamp"}
+        # One reading before the window is needed to cover its first samples.
+        weather = self.read_range(float(timestamps.min()) - self.max_age, float(timestamps.max()) + 1, columns)
+        return asof_join(timestamps, weather.pop("timestamp"), weather, self.max_age)
+
+    def latest(self) -> Dict[str, Any] | None:
+        row = self.store.latest()
+        if row is None:
+            return None
+        row["weather_measured_iso"] = row.pop("timestamp")
+        return row
+
+    def flush(self) -> None:
+        self.store.flush()
+
+    def close(self) -> None:
+        self.store.close()
+
+    def _decode(self, data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        if "weather_condition" in data:
+            vocab = np.array(self.store.categories("weather_condition") + [None], dtype=object)
+            codes = data["weather_condition"].astype(np.int64)
+            data["weather_condition"] = vocab[np.where((codes >= 0) & (codes < len(vocab) - 1), codes, len(vocab) - 1)]
+        return data
+
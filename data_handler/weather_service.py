@@ -1,16 +1,19 @@
 """Background task to poll Buienradar weather and push it into shared state."""
 from __future__ import annotations
 
+import json
+import random
 import threading
-import time
-from typing import MutableMapping
+from typing import Any, Dict, MutableMapping, Optional
 
 import requests
+from buienradar.buienradar import parse_data
+from buienradar.constants import DATA, MESSAGE, SUCCESS
+from buienradar.urls import JSON_FEED_URL, JSON_PRECIPITATION_URL_TEMPLATE
 
 from buienradar_data.query_current_state import (
     DEFAULT_ADDRESS,
-    fetch_current_state,
-    geocode,
+    cached_geocode,
     weather_summary_from_state,
 )
 from state import update_state
@@ -18,31 +21,147 @@ from state import update_state
 POLL_SECONDS = 7 * 60  # refresh every 7 minutes
 TIMEFRAME_MIN = 45  # precipitation lookahead window
 
+# Failed polls retry after BACKOFF_BASE_S, doubling up to POLL_SECONDS, with +/-20 % jitter.
+BACKOFF_BASE_S = 15.0
+BACKOFF_JITTER = 0.2
+HTTP_TIMEOUT_S = 15
 
-def _weather_loop(address: str = DEFAULT_ADDRESS) -> None:
-    session = requests.Session()
-    latitude = longitude = None
+_weather_lock = threading.Lock()
+_weather_thread: threading.Thread | None = None
+_weather_poller: "WeatherPoller | None" = None
+_weather_stop = threading.Event()
 
-    while True:
-        try:
-            if latitude is None or longitude is None:
-                latitude, longitude = geocode(address, session)
 
-            state = fetch_current_state(latitude, longitude, TIMEFRAME_MIN)
-            summary = weather_summary_from_state(state)
-            update_state(weather=summary, weather_error=None)
+def _measured_key(feed: Dict[str, Any]) -> Optional[str]:
+    # Every station in one feed shares the measurement time; it is cheap to read without parse_data.
+    stations = (feed.get("actual") or {}).get("stationmeasurements") or []
+    stamps = [s.get("timestamp") for s in stations if isinstance(s, dict) and s.get("timestamp")]
+    return max(stamps) if stamps else None
+
+
+class WeatherPoller:
+    """Fetches the Buienradar feed over one pooled session and publishes new readings only.
+
+    HTTP validators (ETag/Last-Modified) are sent so an unchanged feed costs a
+    304, and a feed whose ``measured`` time has not moved is not parsed or
+    published again.
+    """
+
+    def __init__(
+        self,
+        address: str = DEFAULT_ADDRESS,
+        feed_url: str = JSON_FEED_URL,
+        rain_url_template: str = JSON_PRECIPITATION_URL_TEMPLATE,
+        poll_seconds: float = POLL_SECONDS,
+        backoff_base: float = BACKOFF_BASE_S,
+    ) -> None:
+        self.address = address
+        self.feed_url = feed_url
+        self.rain_url_template = rain_url_template
+        self.poll_seconds = poll_seconds
+        self.backoff_base = backoff_base
+        self.session = requests.Session()
+        self.coords: tuple[float, float] | None = None
+        self.failures = 0
+        self.counters = {"fetches": 0, "not_modified": 0, "unchanged": 0, "published": 0, "errors": 0}
+        self._validators: Dict[str, str] = {}
+        self._last_measured: Optional[str] = None
+
+    def next_delay(self) -> float:
+        if not self.failures:
+            return self.poll_seconds
+        delay = min(self.backoff_base * 2 ** (self.failures - 1), self.poll_seconds)
+        return delay * random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+
+    def poll_once(self) -> bool:
+        """One fetch; returns True on success (whether or not the reading changed)."""
+        try:
+            published = self._poll()
         except Exception as exc:  # keep running even if Buienradar/Nominatim hiccups
+            self.failures += 1
+            self.counters["errors"] += 1
             update_state(weather_error=str(exc))
+            return False
+        if self.failures:
+            self.failures = 0
+            if not published:
+                update_state(weather_error=None)
+        return True
+
+    def _poll(self) -> bool:
+        if self.coords is None:
+            self.coords = cached_geocode(self.address, self.session)
+        latitude, longitude = self.coords
+
+        self.counters["fetches"] += 1
+        resp = self.session.get(self.feed_url, headers=self._validators, timeout=HTTP_TIMEOUT_S)
+        if resp.status_code == 304:
+            self.counters["not_modified"] += 1
+            return False
+        resp.raise_for_status()
+        # Only remembered once this body has been handled; a failure below must not turn the retry into a 304.
+        validators = {
+            header: resp.headers[source]
+            for header, source in (("If-None-Match", "ETag"), ("If-Modified-Since", "Last-Modified"))
+            if source in resp.headers
+        }
+        content = resp.text
+        measured = _measured_key(json.loads(content))
+        if measured is not None and measured == self._last_measured:
+            self.counters["unchanged"] += 1
+            self._validators = validators
+            return False
+
+        rain = self.session.get(
+            self.rain_url_template.format(lat=round(latitude, 2), lon=round(longitude, 2)),
+            timeout=HTTP_TIMEOUT_S,
+        )
+        raincontent = rain.text if rain.ok else None
+        parsed = parse_data(content, raincontent, latitude, longitude, TIMEFRAME_MIN)
+        if not parsed.get(SUCCESS) or not parsed.get(DATA):
+            raise RuntimeError(parsed.get(MESSAGE) or "Could not parse Buienradar data")
+        update_state(weather=weather_summary_from_state(parsed), weather_error=None)
+        self._validators = validators
+        self._last_measured = measured
+        self.counters["published"] += 1
+        return True
+
+    def run(self, stop_event: threading.Event) -> None:
+        while not stop_event.is_set():
+            self.poll_once()
+            stop_event.wait(self.next_delay())
 
-        time.sleep(POLL_SECONDS)
 
+def ensure_weather_thread(
+    session_state: MutableMapping[str, object] | None = None,
+    address: str = DEFAULT_ADDRESS,
+) -> threading.Thread:
+    """Start the process-wide weather poller if it is not running yet.
 
-def ensure_weather_thread(session_state: MutableMapping[str, object], address: str = DEFAULT_ADDRESS) -> None:
-    """Start the weather polling loop once per Streamlit session."""
+    Every Streamlit session reads the result from ``state``; ``session_state``
+    only records the thread for callers that want it.
+    """
+    global _weather_thread, _weather_poller
+    with _weather_lock:
+        if _weather_thread is None or not _weather_thread.is_alive():
+            _weather_stop.clear()
+            _weather_poller = WeatherPoller(address)
+            _weather_thread = threading.Thread(
+                target=_weather_poller.run, args=(_weather_stop,), name="weather-poller", daemon=True
+            )
+            _weather_thread.start()
+        t = _weather_thread
+    if session_state is not None:
+        session_state["weather_thread"] = t
+    return t
 
-    if session_state.get("weather_thread"):
-        return
 
-    t = threading.Thread(target=_weather_loop, kwargs={"address": address}, daemon=True)
-    t.start()
-    session_state["weather_thread"] = t
+def stop_weather_thread(timeout: float = 5.0) -> None:
+    """Stop the shared poller and wait for its thread to exit."""
+    global _weather_thread
+    with _weather_lock:
+        t = _weather_thread
+        _weather_stop.set()
+        _weather_thread = None
+    if t is not None:
+        t.join(timeout)